@@ -0,0 +1,172 @@
+"""
+Minimal ABI fragments for the ChainMart contracts.
+
+Only the functions the backend actually calls are listed here, so the backend
+does not depend on Hardhat build artifacts being present at runtime.
+"""
+
+REPUTATION_NFT_ABI = [
+    {
+        'name': 'updateReputation',
+        'type': 'function',
+        'stateMutability': 'nonpayable',
+        'inputs': [
+            {'name': '_user', 'type': 'address'},
+            {'name': '_newScore', 'type': 'uint256'},
+        ],
+        'outputs': [],
+    },
+    {
+        'name': 'batchUpdateReputation',
+        'type': 'function',
+        'stateMutability': 'nonpayable',
+        'inputs': [
+            {'name': '_users', 'type': 'address[]'},
+            {'name': '_scores', 'type': 'uint256[]'},
+        ],
+        'outputs': [],
+    },
+    {
+        'name': 'getUserReputation',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '_user', 'type': 'address'}],
+        'outputs': [
+            {
+                'name': '',
+                'type': 'tuple',
+                'components': [
+                    {'name': 'score', 'type': 'uint256'},
+                    {'name': 'level', 'type': 'uint8'},
+                    {'name': 'totalTransactions', 'type': 'uint256'},
+                    {'name': 'lastUpdated', 'type': 'uint256'},
+                ],
+            },
+        ],
+    },
+]
+
+_LISTING_COMPONENTS = [
+    {'name': 'listingId', 'type': 'uint256'},
+    {'name': 'seller', 'type': 'address'},
+    {'name': 'productHash', 'type': 'bytes32'},
+    {'name': 'price', 'type': 'uint256'},
+    {'name': 'paymentToken', 'type': 'address'},
+    {'name': 'isActive', 'type': 'bool'},
+    {'name': 'createdAt', 'type': 'uint256'},
+    {'name': 'totalSales', 'type': 'uint256'},
+]
+
+_ORDER_COMPONENTS = [
+    {'name': 'orderId', 'type': 'uint256'},
+    {'name': 'listingId', 'type': 'uint256'},
+    {'name': 'buyer', 'type': 'address'},
+    {'name': 'seller', 'type': 'address'},
+    {'name': 'amount', 'type': 'uint256'},
+    {'name': 'paymentToken', 'type': 'address'},
+    {'name': 'status', 'type': 'uint8'},
+    {'name': 'disputeStatus', 'type': 'uint8'},
+    {'name': 'createdAt', 'type': 'uint256'},
+    {'name': 'completedAt', 'type': 'uint256'},
+    {'name': 'disputer', 'type': 'address'},
+    {'name': 'disputeReason', 'type': 'string'},
+]
+
+_SELLER_ESCROW_COMPONENTS = [
+    {'name': 'totalEscrow', 'type': 'uint256'},
+    {'name': 'totalEarned', 'type': 'uint256'},
+    {'name': 'totalWithdrawn', 'type': 'uint256'},
+    {'name': 'reputation', 'type': 'uint256'},
+]
+
+MARKETPLACE_ESCROW_ABI = [
+    {
+        'name': 'anchorProductRoot',
+        'type': 'function',
+        'stateMutability': 'nonpayable',
+        'inputs': [
+            {'name': '_root', 'type': 'bytes32'},
+            {'name': '_leafCount', 'type': 'uint256'},
+        ],
+        'outputs': [],
+    },
+    {
+        'name': 'productRoots',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '', 'type': 'bytes32'}],
+        'outputs': [{'name': '', 'type': 'uint256'}],
+    },
+    {
+        'name': 'verifyProductHash',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [
+            {'name': '_productHash', 'type': 'bytes32'},
+            {'name': '_proof', 'type': 'bytes32[]'},
+            {'name': '_root', 'type': 'bytes32'},
+        ],
+        'outputs': [{'name': '', 'type': 'bool'}],
+    },
+    {
+        'name': 'getSellerBalance',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [
+            {'name': '_seller', 'type': 'address'},
+            {'name': '_token', 'type': 'address'},
+        ],
+        'outputs': [{'name': '', 'type': 'uint256'}],
+    },
+    {
+        'name': 'getSellerData',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '_seller', 'type': 'address'}],
+        'outputs': [{'name': '', 'type': 'tuple', 'components': _SELLER_ESCROW_COMPONENTS}],
+    },
+    {
+        'name': 'getListing',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '_listingId', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'tuple', 'components': _LISTING_COMPONENTS}],
+    },
+    {
+        'name': 'getOrder',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '_orderId', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'tuple', 'components': _ORDER_COMPONENTS}],
+    },
+]
+
+# https://github.com/mds1/multicall - deployed at the same address on most EVM chains
+MULTICALL3_ABI = [
+    {
+        'name': 'aggregate3',
+        'type': 'function',
+        'stateMutability': 'payable',
+        'inputs': [
+            {
+                'name': 'calls',
+                'type': 'tuple[]',
+                'components': [
+                    {'name': 'target', 'type': 'address'},
+                    {'name': 'allowFailure', 'type': 'bool'},
+                    {'name': 'callData', 'type': 'bytes'},
+                ],
+            },
+        ],
+        'outputs': [
+            {
+                'name': 'returnData',
+                'type': 'tuple[]',
+                'components': [
+                    {'name': 'success', 'type': 'bool'},
+                    {'name': 'returnData', 'type': 'bytes'},
+                ],
+            },
+        ],
+    },
+]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import BlockchainTransaction
+from .models import BlockchainTransaction, ProductAnchorBatch
 
 
 @admin.register(BlockchainTransaction)
@@ -36,3 +36,16 @@ class BlockchainTransactionAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Prevent deletion of blockchain records
         return False
+
+
+@admin.register(ProductAnchorBatch)
+class ProductAnchorBatchAdmin(admin.ModelAdmin):
+    list_display = ['merkle_root', 'leaf_count', 'status', 'transaction_hash', 'block_number', 'created']
+    list_filter = ['status', 'created']
+    search_fields = ['merkle_root', 'transaction_hash']
+    readonly_fields = ['merkle_root', 'leaf_count', 'transaction_hash', 'block_number', 'created', 'modified']
+    ordering = ['-created']
+    
+    def has_add_permission(self, request):
+        # Batches are created by the anchoring job
+        return False
@@ -0,0 +1,164 @@
+"""
+Batch anchoring of product hashes through a single on-chain Merkle root.
+
+New products get a pending ProductAnchor row. The anchoring job takes up to
+PRODUCT_ANCHOR_MAX_LEAVES pending hashes, builds a Merkle tree, stores each
+product's proof and sends one ``anchorProductRoot`` transaction for the whole
+batch. Any product can later be checked on its own against the anchored root
+with ``verifyProductHash``.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from web3 import Web3
+
+from .client import get_contract, send_transaction
+from .merkle import MerkleTree, leaf_hash
+from .models import ProductAnchor, ProductAnchorBatch
+
+logger = logging.getLogger(__name__)
+
+ANCHOR_LOCK_KEY = 'product_anchor_lock'
+ANCHOR_LOCK_TIMEOUT = 30 * 60
+
+
+def batch_mode_enabled() -> bool:
+    return settings.BLOCKCHAIN_CONFIG.get('PRODUCT_ANCHOR_MODE') == 'batch'
+
+
+def _root_anchored(marketplace, merkle_root: str) -> bool:
+    return marketplace.functions.productRoots(Web3.to_bytes(hexstr=merkle_root)).call() != 0
+
+
+def _release(batch: ProductAnchorBatch) -> None:
+    """Put a batch's products back in the pending pool and mark it failed."""
+    with transaction.atomic():
+        ProductAnchor.objects.filter(batch=batch).update(batch=None, leaf_index=None, proof=[])
+        batch.status = 'failed'
+        batch.save(update_fields=['status', 'modified'])
+
+
+def _confirm(batch: ProductAnchorBatch, receipt=None) -> None:
+    if receipt is not None:
+        batch.transaction_hash = Web3.to_hex(receipt['transactionHash'])
+        batch.block_number = receipt['blockNumber']
+    batch.status = 'confirmed'
+    batch.save(update_fields=['transaction_hash', 'block_number', 'status', 'modified'])
+
+
+def _recover_stranded_batches(marketplace) -> None:
+    """
+    Settle batches that an interrupted run left 'pending'.
+
+    Only the lock holder creates batches, so a pending batch seen here was
+    abandoned before its receipt was recorded: it is confirmed if the root
+    made it on-chain, otherwise its products are released.
+    """
+    for batch in ProductAnchorBatch.objects.filter(status='pending'):
+        if _root_anchored(marketplace, batch.merkle_root):
+            logger.warning(f"Batch {batch.merkle_root} was anchored by an interrupted run, confirming it")
+            _confirm(batch)
+        else:
+            logger.warning(f"Releasing the products of stranded batch {batch.merkle_root}")
+            _release(batch)
+
+
+def _take_pending(max_leaves: int) -> List[Tuple[int, bytes]]:
+    """
+    Collect up to ``max_leaves`` (anchor id, leaf) pairs, oldest first.
+
+    Rows whose hash is not 32 bytes of hex get an error and are left out,
+    so one bad row cannot fail every batch it would land in.
+    """
+    leaves = []
+    last_id = 0
+    while len(leaves) < max_leaves:
+        rows = list(
+            ProductAnchor.objects.filter(batch__isnull=True, error='', id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'product_hash')[:max_leaves - len(leaves)]
+        )
+        if not rows:
+            break
+        for anchor_id, product_hash in rows:
+            try:
+                leaves.append((anchor_id, leaf_hash(product_hash)))
+            except ValueError as e:
+                logger.warning(f"Product anchor {anchor_id} has an invalid hash: {str(e)}")
+                ProductAnchor.objects.filter(id=anchor_id).update(error=str(e)[:255])
+        last_id = rows[-1][0]
+    return leaves
+
+
+def anchor_pending_products(max_leaves: Optional[int] = None) -> Optional[ProductAnchorBatch]:
+    """
+    Anchor the oldest pending product hashes under one Merkle root.
+
+    The batch and its proofs are committed before the transaction is sent.
+    If sending fails the products are released back to the pending pool and
+    the batch is marked failed; the next run rebuilds the same root, reuses
+    that batch row and checks ``productRoots`` first, so a root that was
+    mined after a receipt timeout is confirmed instead of sent again.
+
+    Args:
+        max_leaves: Maximum products per batch (PRODUCT_ANCHOR_MAX_LEAVES by default)
+
+    Returns:
+        The confirmed batch, or None when nothing was pending, sending failed
+        or another run holds the lock
+    """
+    max_leaves = max_leaves or settings.BLOCKCHAIN_CONFIG.get('PRODUCT_ANCHOR_MAX_LEAVES', 100000)
+    if not cache.add(ANCHOR_LOCK_KEY, 1, ANCHOR_LOCK_TIMEOUT):
+        logger.info("Product anchoring already running, skipping")
+        return None
+
+    try:
+        marketplace = get_contract('marketplace')
+        _recover_stranded_batches(marketplace)
+
+        pending = _take_pending(max_leaves)
+        if not pending:
+            return None
+
+        tree = MerkleTree(leaf for _, leaf in pending)
+        merkle_root = Web3.to_hex(tree.root)
+        with transaction.atomic():
+            batch, created = ProductAnchorBatch.objects.get_or_create(
+                merkle_root=merkle_root, defaults={'leaf_count': len(tree)}
+            )
+            if not created:
+                logger.info(f"Retrying batch {merkle_root} (was {batch.status})")
+                batch.status = 'pending'
+                batch.save(update_fields=['status', 'modified'])
+
+            anchors = [
+                ProductAnchor(
+                    id=anchor_id,
+                    batch=batch,
+                    leaf_index=index,
+                    proof=[Web3.to_hex(node) for node in tree.proof(index)],
+                )
+                for index, (anchor_id, _) in enumerate(pending)
+            ]
+            ProductAnchor.objects.bulk_update(anchors, ['batch', 'leaf_index', 'proof'], batch_size=2000)
+
+        try:
+            if _root_anchored(marketplace, merkle_root):
+                logger.info(f"Root {merkle_root} is already on-chain, confirming without a new transaction")
+                _confirm(batch)
+                return batch
+            receipt = send_transaction(marketplace.functions.anchorProductRoot(tree.root, len(tree)))
+        except Exception as e:
+            logger.error(f"Anchoring batch {merkle_root} failed: {str(e)}", exc_info=True)
+            _release(batch)
+            return None
+
+        _confirm(batch, receipt)
+        logger.info(f"Anchored {len(tree)} products under {batch.merkle_root} in {batch.transaction_hash}")
+        return batch
+    finally:
+        cache.delete(ANCHOR_LOCK_KEY)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BlockchainConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.blockchain'
+
+    def ready(self):
+        import apps.blockchain.signals  # noqa: F401
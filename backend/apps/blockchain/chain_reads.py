@@ -0,0 +1,294 @@
+"""
+Batched, block-keyed reads of contract view functions.
+
+Many view calls are folded into a single Multicall3 ``aggregate3`` eth_call
+pinned to one block. Results are cached under (contract, call, block number),
+so a new block naturally invalidates them while repeated reads within the same
+block cost no RPC round trips at all.
+
+Reads at "latest" do not chase every new block: they share a pinned block
+until it falls more than CHAIN_READ_MAX_STALE_BLOCKS behind the head, so the
+cache warmed for that block keeps serving requests in between.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+from web3 import Web3
+from web3.exceptions import ContractLogicError, Web3Exception
+
+from apps.orders.models import Order
+from apps.users.models import UserProfile
+from .client import CONTRACTS, BlockchainError, get_contract, get_web3
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'chain_read'
+READ_BLOCK_KEY = f'{CACHE_PREFIX}:pinned_block'
+MULTICALL_CHUNK_SIZE = 200
+NATIVE_TOKEN = '0x0000000000000000000000000000000000000000'
+
+# Node, RPC and transport failures (requests' errors are OSErrors); surfaced as BlockchainError
+RPC_ERRORS = (Web3Exception, OSError)
+
+_block_number = {'value': None, 'fetched_at': 0.0}
+
+
+class ChainCall(NamedTuple):
+    """A single view call: contract key from client.CONTRACTS, function name, arguments."""
+    contract: str
+    function: str
+    args: tuple = ()
+
+
+def current_block() -> int:
+    """Latest block number, reused in-process for BLOCK_NUMBER_TTL seconds."""
+    ttl = settings.BLOCKCHAIN_CONFIG.get('BLOCK_NUMBER_TTL', 2)
+    now = time.monotonic()
+    if _block_number['value'] is None or now - _block_number['fetched_at'] > ttl:
+        try:
+            _block_number['value'] = get_web3().eth.block_number
+        except RPC_ERRORS as e:
+            raise BlockchainError(f"Cannot read the latest block: {str(e)}") from e
+        _block_number['fetched_at'] = now
+    return _block_number['value']
+
+
+def pin_read_block(block: Optional[int] = None) -> int:
+    """Make ``block`` (latest by default) the block shared by reads at latest."""
+    block = current_block() if block is None else block
+    cache.set(READ_BLOCK_KEY, block, settings.BLOCKCHAIN_CONFIG.get('CHAIN_READ_CACHE_TTL', 120))
+    return block
+
+
+def read_block() -> int:
+    """
+    Block that reads at latest are evaluated at.
+
+    The pinned block is reused while it is at most CHAIN_READ_MAX_STALE_BLOCKS
+    behind the head; after that the head becomes the new pinned block.
+    """
+    latest = current_block()
+    pinned = cache.get(READ_BLOCK_KEY)
+    max_stale = settings.BLOCKCHAIN_CONFIG.get('CHAIN_READ_MAX_STALE_BLOCKS', 30)
+    if pinned is not None and 0 <= latest - pinned <= max_stale:
+        return pinned
+    return pin_read_block(latest)
+
+
+def _abi_type(param: Dict[str, Any]) -> str:
+    if param['type'].startswith('tuple'):
+        inner = ','.join(_abi_type(component) for component in param['components'])
+        return f"({inner}){param['type'][len('tuple'):]}"
+    return param['type']
+
+
+def _to_python(param: Dict[str, Any], value: Any) -> Any:
+    """Turn decoded structs into dicts keyed by component name."""
+    if param['type'] == 'tuple':
+        return {
+            component['name']: _to_python(component, item)
+            for component, item in zip(param['components'], value)
+        }
+    if param['type'] == 'bytes32':
+        return Web3.to_hex(value)
+    return value
+
+
+def _decode(function_abi: Dict[str, Any], data: bytes) -> Any:
+    outputs = function_abi['outputs']
+    values = get_web3().codec.decode([_abi_type(output) for output in outputs], data)
+    decoded = [_to_python(output, value) for output, value in zip(outputs, values)]
+    return decoded[0] if len(decoded) == 1 else decoded
+
+
+def _cache_key(address: str, call: ChainCall, block: int) -> str:
+    args_digest = hashlib.sha1(repr(call.args).encode()).hexdigest()[:16]
+    return f"{CACHE_PREFIX}:{address.lower()}:{call.function}:{args_digest}:{block}"
+
+
+def _multicall_available() -> bool:
+    return bool(settings.BLOCKCHAIN_CONFIG.get('MULTICALL_CONTRACT'))
+
+
+def _raw_call(address: str, data: str, block: int) -> bytes:
+    return get_web3().eth.call({'to': address, 'data': data}, block_identifier=block)
+
+
+def _execute(calls: List[ChainCall], block: int) -> List[Any]:
+    """
+    Run uncached calls, in Multicall3 chunks when available. Calls that revert yield None.
+
+    Raises:
+        BlockchainError: If the node cannot be reached or the multicall itself fails
+    """
+    contracts = {}
+    encoded = []
+    for call in calls:
+        if call.contract not in contracts:
+            contracts[call.contract] = get_contract(call.contract)
+        contract = contracts[call.contract]
+        function_abi = getattr(contract.functions, call.function)(*call.args).abi
+        encoded.append((function_abi, contract.address, contract.encode_abi(call.function, args=call.args)))
+
+    results = []
+    if not _multicall_available():
+        for function_abi, address, data in encoded:
+            try:
+                results.append(_decode(function_abi, _raw_call(address, data, block)))
+            except ContractLogicError as e:
+                logger.warning(f"eth_call {function_abi['name']} reverted: {str(e)}")
+                results.append(None)
+            except RPC_ERRORS as e:
+                raise BlockchainError(f"eth_call {function_abi['name']} failed: {str(e)}") from e
+        return results
+
+    multicall = get_contract('multicall')
+    for start in range(0, len(encoded), MULTICALL_CHUNK_SIZE):
+        chunk = encoded[start:start + MULTICALL_CHUNK_SIZE]
+        payload = [(address, True, data) for _, address, data in chunk]
+        try:
+            responses = multicall.functions.aggregate3(payload).call(block_identifier=block)
+        except RPC_ERRORS as e:
+            raise BlockchainError(f"Multicall of {len(chunk)} calls failed: {str(e)}") from e
+        for (function_abi, _, _), (success, data) in zip(chunk, responses):
+            results.append(_decode(function_abi, data) if success else None)
+    return results
+
+
+def read_many(calls: Iterable[ChainCall], block: Optional[int] = None) -> List[Any]:
+    """
+    Read-through cached batch of view calls, all evaluated at the same block.
+
+    Args:
+        calls: ChainCall entries; results are returned in the same order
+        block: Block to read at (the pinned read_block() by default)
+
+    Returns:
+        list: Decoded results (structs as dicts), None for calls that reverted
+    """
+    calls = list(calls)
+    if not calls:
+        return []
+    block = read_block() if block is None else block
+
+    keys = []
+    for call in calls:
+        address_key = CONTRACTS[call.contract][0]
+        address = settings.BLOCKCHAIN_CONFIG.get(address_key)
+        if not address:
+            raise BlockchainError(f"{address_key} is not configured")
+        keys.append(_cache_key(address, call, block))
+
+    cached = cache.get_many(keys)
+    missing = [index for index, key in enumerate(keys) if key not in cached]
+    if missing:
+        fetched = _execute([calls[index] for index in missing], block)
+        fresh = {keys[index]: value for index, value in zip(missing, fetched) if value is not None}
+        cache.set_many(fresh, settings.BLOCKCHAIN_CONFIG.get('CHAIN_READ_CACHE_TTL', 120))
+        cached.update(fresh)
+
+    return [cached.get(key) for key in keys]
+
+
+def read(contract: str, function: str, *args, block: Optional[int] = None) -> Any:
+    """Single cached view call; see read_many."""
+    return read_many([ChainCall(contract, function, args)], block=block)[0]
+
+
+def _numeric_ids(values: Iterable[str]) -> List[int]:
+    return sorted({int(value) for value in values if value and str(value).isdigit()})
+
+
+def seller_dashboard(seller, block: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Everything the seller dashboard shows from MarketplaceEscrow, in one multicall.
+
+    Covers escrow balances for every token the seller has been paid in, the
+    seller's escrow record, and the on-chain view of their recent orders and
+    the listings behind them.
+
+    Args:
+        seller: UserProfile of the seller
+        block: Block to read at (the pinned read_block() by default)
+
+    Returns:
+        dict or None if the seller has no wallet
+    """
+    if not seller.wallet_address:
+        return None
+    wallet = Web3.to_checksum_address(seller.wallet_address)
+
+    recent = list(
+        Order.objects.filter(seller=seller)
+        .order_by('-created')
+        .values_list('order_id', 'listing_id', 'payment_token')[:20]
+    )
+    tokens = sorted({NATIVE_TOKEN} | {
+        Web3.to_checksum_address(token) for _, _, token in recent if token and Web3.is_address(token)
+    })
+    order_ids = _numeric_ids(order_id for order_id, _, _ in recent)
+    listing_ids = _numeric_ids(listing_id for _, listing_id, _ in recent)
+
+    calls = [ChainCall('marketplace', 'getSellerData', (wallet,))]
+    calls += [ChainCall('marketplace', 'getSellerBalance', (wallet, token)) for token in tokens]
+    calls += [ChainCall('marketplace', 'getOrder', (order_id,)) for order_id in order_ids]
+    calls += [ChainCall('marketplace', 'getListing', (listing_id,)) for listing_id in listing_ids]
+
+    block = read_block() if block is None else block
+    results = read_many(calls, block=block)
+
+    balances_end = 1 + len(tokens)
+    orders_end = balances_end + len(order_ids)
+    return {
+        'block_number': block,
+        'seller': wallet,
+        'seller_data': results[0],
+        'balances': dict(zip(tokens, results[1:balances_end])),
+        'orders': dict(zip(order_ids, results[balances_end:orders_end])),
+        'listings': dict(zip(listing_ids, results[orders_end:])),
+    }
+
+
+def warm_seller_dashboards(limit: Optional[int] = None, hours: int = 24) -> int:
+    """
+    Pre-populate the read cache for the sellers with the most recent orders.
+
+    Dashboards are read at the current head, which is then pinned so requests
+    keep hitting these entries until the block is CHAIN_READ_MAX_STALE_BLOCKS
+    old. With a once-a-minute schedule the default bound covers the ~30 blocks
+    a 2 s chain produces in between.
+
+    Args:
+        limit: Number of sellers (DASHBOARD_WARMUP_SELLERS by default)
+        hours: Activity window used to rank sellers
+
+    Returns:
+        int: Number of dashboards warmed
+    """
+    limit = limit or settings.BLOCKCHAIN_CONFIG.get('DASHBOARD_WARMUP_SELLERS', 200)
+    since = timezone.now() - timedelta(hours=hours)
+    sellers = (
+        UserProfile.objects.filter(sales__created__gte=since, wallet_address__isnull=False)
+        .annotate(recent_orders=Count('sales'))
+        .order_by('-recent_orders')[:limit]
+    )
+
+    block = current_block()
+    warmed = 0
+    for seller in sellers:
+        try:
+            seller_dashboard(seller, block=block)
+            warmed += 1
+        except Exception as e:
+            logger.warning(f"Dashboard warm-up failed for seller {seller.pk}: {str(e)}")
+    # Pin only once the entries exist, so requests never switch to a cold block
+    pin_read_block(block)
+    return warmed
@@ -0,0 +1,126 @@
+"""
+Thin web3 wrapper shared by the blockchain background jobs.
+
+Connection and contract objects are cached per process; transactions are
+signed locally with the platform key from BLOCKCHAIN_CONFIG.
+"""
+
+import logging
+from typing import Any, Optional
+
+from django.conf import settings
+from web3 import Web3
+from web3.middleware import ExtraDataToPOAMiddleware
+
+from .abi import MARKETPLACE_ESCROW_ABI, MULTICALL3_ABI, REPUTATION_NFT_ABI
+
+logger = logging.getLogger(__name__)
+
+# Contract name -> (BLOCKCHAIN_CONFIG address key, ABI)
+CONTRACTS = {
+    'reputation_nft': ('REPUTATION_NFT_CONTRACT', REPUTATION_NFT_ABI),
+    'marketplace': ('MARKETPLACE_CONTRACT', MARKETPLACE_ESCROW_ABI),
+    'multicall': ('MULTICALL_CONTRACT', MULTICALL3_ABI),
+}
+
+_web3_instances = {}
+
+
+class BlockchainError(Exception):
+    """Raised when a contract call cannot be made or a transaction reverts."""
+    pass
+
+
+class TransactionReverted(BlockchainError):
+    """Raised when a mined transaction has a failed status."""
+    pass
+
+
+def get_web3() -> Web3:
+    """
+    Return a cached Web3 connection for the configured RPC endpoint.
+
+    The POA middleware is required on Polygon and harmless on a local
+    Hardhat node, so it is always injected.
+    """
+    rpc_url = settings.BLOCKCHAIN_CONFIG['RPC_URL']
+    w3 = _web3_instances.get(rpc_url)
+    if w3 is None:
+        w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
+        w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+        _web3_instances[rpc_url] = w3
+    return w3
+
+
+def get_contract(name: str):
+    """
+    Build a contract object for one of the known ChainMart contracts.
+
+    Args:
+        name: Key in CONTRACTS (e.g. 'reputation_nft')
+
+    Raises:
+        BlockchainError: If the contract address is not configured
+    """
+    address_key, abi = CONTRACTS[name]
+    address = settings.BLOCKCHAIN_CONFIG.get(address_key)
+    if not address:
+        raise BlockchainError(f"{address_key} is not configured")
+    return get_web3().eth.contract(address=Web3.to_checksum_address(address), abi=abi)
+
+
+def platform_address() -> str:
+    """
+    Address of the platform key that signs backend transactions.
+
+    Raises:
+        BlockchainError: If the key is not configured
+    """
+    private_key = settings.BLOCKCHAIN_CONFIG.get('PRIVATE_KEY')
+    if not private_key:
+        raise BlockchainError("BLOCKCHAIN_PRIVATE_KEY is not configured")
+    return get_web3().eth.account.from_key(private_key).address
+
+
+def send_transaction(contract_function, gas_limit: Optional[int] = None) -> Any:
+    """
+    Sign and submit a contract call with the platform key and wait for the receipt.
+
+    Args:
+        contract_function: A bound web3 ContractFunction (e.g. contract.functions.foo(1))
+        gas_limit: Explicit gas limit; estimated by the node when omitted
+
+    Returns:
+        The transaction receipt
+
+    Raises:
+        BlockchainError: If the key is missing
+        TransactionReverted: If the transaction is mined with a failed status
+        ContractLogicError: If the call already reverts while estimating gas
+    """
+    config = settings.BLOCKCHAIN_CONFIG
+    private_key = config.get('PRIVATE_KEY')
+    if not private_key:
+        raise BlockchainError("BLOCKCHAIN_PRIVATE_KEY is not configured")
+
+    w3 = get_web3()
+    account = w3.eth.account.from_key(private_key)
+    tx_params = {
+        'from': account.address,
+        'nonce': w3.eth.get_transaction_count(account.address, 'pending'),
+        'gasPrice': int(w3.eth.gas_price * config.get('GAS_PRICE_MULTIPLIER', 1)),
+        'chainId': w3.eth.chain_id,
+    }
+    if gas_limit:
+        tx_params['gas'] = gas_limit
+
+    tx = contract_function.build_transaction(tx_params)
+    signed = account.sign_transaction(tx)
+    tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=config.get('RECEIPT_TIMEOUT', 120))
+
+    if receipt['status'] != 1:
+        raise TransactionReverted(f"Transaction {Web3.to_hex(tx_hash)} reverted")
+
+    logger.info(f"Transaction {Web3.to_hex(tx_hash)} mined in block {receipt['blockNumber']} (gas used {receipt['gasUsed']})")
+    return receipt
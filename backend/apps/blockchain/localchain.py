@@ -0,0 +1,198 @@
+"""
+Local Hardhat chain for load tests and benchmarks.
+
+Spawns ``npx hardhat node`` from the repository's smart-contracts project (or
+attaches to an already running node), compiles and deploys MarketplaceEscrow
+and ReputationNFT, and exposes the node's deterministic dev accounts as
+signing keys so transactions go through the same sign-and-send path as
+production.
+
+Requires ``npm install`` to have been run in smart-contracts/.
+"""
+
+import json
+import logging
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from eth_account import Account
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+SMART_CONTRACTS_DIR = Path(settings.BASE_DIR).parent / 'smart-contracts'
+HARDHAT_MNEMONIC = 'test test test test test test test test test test test junk'
+HARDHAT_ACCOUNT_COUNT = 20
+DEPLOY_GAS = 8_000_000
+
+
+class LocalChainError(Exception):
+    """Raised when the local node cannot be started or contracts cannot be deployed."""
+    pass
+
+
+def dev_accounts(count: int = HARDHAT_ACCOUNT_COUNT) -> List[Any]:
+    """Signing accounts for Hardhat's default funded dev wallets."""
+    Account.enable_unaudited_hdwallet_features()
+    return [
+        Account.from_mnemonic(HARDHAT_MNEMONIC, account_path=f"m/44'/60'/0'/0/{index}")
+        for index in range(count)
+    ]
+
+
+def load_artifact(contract_name: str) -> Dict[str, Any]:
+    """ABI and bytecode from Hardhat's build output."""
+    path = SMART_CONTRACTS_DIR / 'artifacts' / 'contracts' / f'{contract_name}.sol' / f'{contract_name}.json'
+    if not path.exists():
+        raise LocalChainError(f"Missing artifact {path}; run `npx hardhat compile` in {SMART_CONTRACTS_DIR}")
+    return json.loads(path.read_text())
+
+
+def compile_contracts() -> None:
+    result = subprocess.run(
+        ['npx', 'hardhat', 'compile', '--quiet'],
+        cwd=SMART_CONTRACTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise LocalChainError(f"hardhat compile failed: {result.stderr.strip()}")
+
+
+class LocalChain:
+    """
+    Context manager around a Hardhat node with the ChainMart contracts deployed.
+
+    Usage:
+        with LocalChain() as chain:
+            chain.send(chain.marketplace.functions.createListing(...), chain.accounts[1])
+    """
+
+    def __init__(self, rpc_url: Optional[str] = None, port: int = 8545, block_time_ms: int = 0):
+        self.port = port
+        self.rpc_url = rpc_url or f'http://127.0.0.1:{port}'
+        self.spawn = rpc_url is None
+        self.block_time_ms = block_time_ms
+        self.process = None
+        self._node_log = None
+        self.w3 = None
+        self.accounts = dev_accounts()
+        self.deployer = self.accounts[0]
+        self.marketplace = None
+        self.reputation_nft = None
+        self.chain_id = None
+        self.gas_price = None
+        self._nonces: Dict[str, int] = {}
+
+    def __enter__(self) -> 'LocalChain':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if self.spawn:
+            compile_contracts()
+            self._node_log = tempfile.TemporaryFile()
+            self.process = subprocess.Popen(
+                ['npx', 'hardhat', 'node', '--hostname', '127.0.0.1', '--port', str(self.port)],
+                cwd=SMART_CONTRACTS_DIR,
+                stdout=subprocess.DEVNULL,
+                stderr=self._node_log,
+            )
+        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url, request_kwargs={'timeout': 60}))
+        self._wait_until_ready()
+        self.chain_id = self.w3.eth.chain_id
+        self.gas_price = self.w3.eth.gas_price
+        if self.block_time_ms:
+            # Emulate real block production instead of mining every transaction instantly
+            self.w3.provider.make_request('evm_setAutomine', [False])
+            self.w3.provider.make_request('evm_setIntervalMining', [self.block_time_ms])
+        self.deploy()
+
+    def stop(self) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+        if self._node_log is not None:
+            self._node_log.close()
+            self._node_log = None
+
+    def _wait_until_ready(self, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                self._node_log.seek(0)
+                raise LocalChainError(f"hardhat node exited: {self._node_log.read().decode().strip()}")
+            try:
+                if self.w3.is_connected():
+                    return
+            except Exception:
+                pass
+            time.sleep(0.5)
+        raise LocalChainError(f"Node at {self.rpc_url} did not come up within {timeout}s")
+
+    def deploy(self) -> None:
+        """Deploy ReputationNFT and MarketplaceEscrow and authorize the escrow as an updater."""
+        nft_artifact = load_artifact('ReputationNFT')
+        escrow_artifact = load_artifact('MarketplaceEscrow')
+
+        nft_factory = self.w3.eth.contract(abi=nft_artifact['abi'], bytecode=nft_artifact['bytecode'])
+        receipt = self.wait(self.send(nft_factory.constructor(), self.deployer, gas=DEPLOY_GAS))
+        self.reputation_nft = self.w3.eth.contract(address=receipt['contractAddress'], abi=nft_artifact['abi'])
+
+        escrow_factory = self.w3.eth.contract(abi=escrow_artifact['abi'], bytecode=escrow_artifact['bytecode'])
+        constructor = escrow_factory.constructor(self.deployer.address, self.reputation_nft.address)
+        receipt = self.wait(self.send(constructor, self.deployer, gas=DEPLOY_GAS))
+        self.marketplace = self.w3.eth.contract(address=receipt['contractAddress'], abi=escrow_artifact['abi'])
+
+        self.wait(self.send(self.reputation_nft.functions.setUpdater(self.marketplace.address, True), self.deployer))
+        logger.info(f"Deployed ReputationNFT at {self.reputation_nft.address}, MarketplaceEscrow at {self.marketplace.address}")
+
+    def sign(self, contract_function, account, value: int = 0, gas: int = 1_000_000) -> Any:
+        """Build and sign a transaction; nonces are tracked locally so sends can be pipelined."""
+        address = account.address
+        if address not in self._nonces:
+            self._nonces[address] = self.w3.eth.get_transaction_count(address, 'pending')
+        tx = contract_function.build_transaction({
+            'from': address,
+            'nonce': self._nonces[address],
+            'gas': gas,
+            'gasPrice': self.gas_price,
+            'value': value,
+            'chainId': self.chain_id,
+        })
+        self._nonces[address] += 1
+        return account.sign_transaction(tx)
+
+    def send(self, contract_function, account, value: int = 0, gas: int = 1_000_000) -> bytes:
+        """Sign and submit without waiting for the receipt."""
+        signed = self.sign(contract_function, account, value=value, gas=gas)
+        return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+    def wait(self, tx_hash: bytes, timeout: float = 120) -> Any:
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout, poll_latency=0.05)
+        if receipt['status'] != 1:
+            raise LocalChainError(f"Transaction {Web3.to_hex(tx_hash)} reverted")
+        return receipt
+
+    def settings_overrides(self) -> Dict[str, Any]:
+        """BLOCKCHAIN_CONFIG values pointing the backend at this chain."""
+        return {
+            'NETWORK': 'localhost',
+            'RPC_URL': self.rpc_url,
+            'MARKETPLACE_CONTRACT': self.marketplace.address,
+            'REPUTATION_NFT_CONTRACT': self.reputation_nft.address,
+            'PLATFORM_WALLET': self.deployer.address,
+            'PRIVATE_KEY': Web3.to_hex(self.deployer.key),
+            'MULTICALL_CONTRACT': '',
+        }
@@ -0,0 +1,318 @@
+import json
+import math
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from eth_utils import keccak
+from web3 import Web3
+from apps.blockchain import anchoring, chain_reads, reputation_sync
+from apps.blockchain.chain_reads import NATIVE_TOKEN, ChainCall
+from apps.blockchain.localchain import LocalChain, LocalChainError
+from apps.blockchain.models import ProductAnchor
+from apps.products.models import Product
+from apps.users.models import UserProfile
+
+RECEIPT_BATCH_SIZE = 100
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class EventLagProbe(threading.Thread):
+    """Polls eth_getLogs like an indexer would and records submit-to-observed lag per transaction"""
+
+    def __init__(self, rpc_url, address, poll_interval):
+        super().__init__(daemon=True)
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.address = address
+        self.poll_interval = poll_interval
+        self.submitted = {}
+        self.lags = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        from_block = self.w3.eth.block_number
+        while not self._stop_event.is_set():
+            latest = self.w3.eth.block_number
+            if latest >= from_block:
+                logs = self.w3.eth.get_logs({'address': self.address, 'fromBlock': from_block, 'toBlock': latest})
+                observed_at = time.perf_counter()
+                for log in logs:
+                    tx_hash = Web3.to_hex(log['transactionHash'])
+                    if tx_hash in self.submitted and tx_hash not in self.lags:
+                        self.lags[tx_hash] = observed_at - self.submitted[tx_hash]
+                from_block = latest + 1
+            self._stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark submission throughput, receipt polling, indexer lag and the backend chain jobs '
+        'against a local Hardhat chain'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rpc-url', default=None, help='Attach to a running node instead of spawning one')
+        parser.add_argument('--port', type=int, default=8545, help='Port for the spawned Hardhat node')
+        parser.add_argument('--block-time', type=int, default=0, help='Interval mining in ms (0 = automine)')
+        parser.add_argument('--listings', type=int, default=200, help='Synthetic listings to create')
+        parser.add_argument('--orders', type=int, default=200, help='Synthetic purchases to place')
+        parser.add_argument('--disputes', type=int, default=50, help='Orders to dispute')
+        parser.add_argument('--rate', type=float, default=0, help='Target submissions per second (0 = as fast as possible)')
+        parser.add_argument('--sellers', type=int, default=5, help='Dev accounts acting as sellers')
+        parser.add_argument('--poll-interval', type=float, default=0.25, help='Indexer log polling interval in seconds')
+        parser.add_argument('--sync-addresses', type=int, default=500, help='Wallets whose scores reputation_sync.flush pushes')
+        parser.add_argument('--anchor-products', type=int, default=1000, help='Products anchor_pending_products anchors')
+        parser.add_argument(
+            '--no-backend', action='store_true',
+            help='Skip the backend jobs; they use the configured Redis and database (database writes are rolled back)',
+        )
+        parser.add_argument('--output', default=None, help='Write the report as JSON to this path')
+
+    def handle(self, *args, **options):
+        if options['disputes'] > options['orders']:
+            raise CommandError('--disputes cannot exceed --orders')
+        try:
+            with LocalChain(rpc_url=options['rpc_url'], port=options['port'], block_time_ms=options['block_time']) as chain:
+                report = self.run_benchmark(chain, options)
+        except LocalChainError as e:
+            raise CommandError(str(e))
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def run_benchmark(self, chain, options):
+        sellers = chain.accounts[1:1 + options['sellers']]
+        buyers = chain.accounts[1 + options['sellers']:]
+        if not sellers or not buyers:
+            raise CommandError('Need at least one seller and one buyer account')
+        price = Web3.to_wei(0.001, 'ether')
+        marketplace = chain.marketplace
+
+        probe = EventLagProbe(chain.rpc_url, marketplace.address, options['poll_interval'])
+        probe.start()
+        phases = {}
+
+        listing_calls = [
+            (marketplace.functions.createListing(keccak(text=f'product-{i}'), price, NATIVE_TOKEN), sellers[i % len(sellers)], 0)
+            for i in range(options['listings'])
+        ]
+        phases['listings'], receipts = self.submit(chain, probe, listing_calls, options['rate'])
+        listing_ids = [
+            event['args']['listingId']
+            for receipt in receipts
+            for event in marketplace.events.ListingCreated().process_receipt(receipt)
+        ]
+
+        order_calls = [
+            (marketplace.functions.purchaseProduct(listing_ids[i % len(listing_ids)]), buyers[i % len(buyers)], price)
+            for i in range(options['orders'])
+        ]
+        phases['orders'], receipts = self.submit(chain, probe, order_calls, options['rate'])
+        buyers_by_address = {account.address: account for account in buyers}
+        placed = [
+            (event['args']['orderId'], buyers_by_address[event['args']['buyer']])
+            for receipt in receipts
+            for event in marketplace.events.OrderPlaced().process_receipt(receipt)
+        ]
+
+        dispute_calls = [
+            (marketplace.functions.raiseDispute(order_id, 'benchmark dispute'), buyer, 0)
+            for order_id, buyer in placed[:options['disputes']]
+        ]
+        phases['disputes'], _ = self.submit(chain, probe, dispute_calls, options['rate'])
+
+        # Give the probe a final polling round for the last block
+        deadline = time.perf_counter() + max(2.0, options['block_time'] / 1000 * 2)
+        while len(probe.lags) < len(probe.submitted) and time.perf_counter() < deadline:
+            time.sleep(options['poll_interval'])
+        probe.stop()
+
+        tx_hashes = list(probe.submitted)
+        lags = list(probe.lags.values())
+        backend = {} if options['no_backend'] else self.run_backend(chain, options, listing_ids, sellers)
+        return {
+            'config': {key: options[key] for key in ('listings', 'orders', 'disputes', 'rate', 'block_time', 'sellers', 'poll_interval')},
+            'submission': phases,
+            'receipt_poll': self.poll_receipts(chain, tx_hashes),
+            'indexer_lag': {
+                'observed': len(lags),
+                'missed': len(tx_hashes) - len(lags),
+                'p50_ms': self.ms(percentile(lags, 50)),
+                'p95_ms': self.ms(percentile(lags, 95)),
+                'p99_ms': self.ms(percentile(lags, 99)),
+                'max_ms': self.ms(max(lags) if lags else None),
+            },
+            'backend': backend,
+        }
+
+    def run_backend(self, chain, options, listing_ids, sellers):
+        """Time the backend jobs against the chain, configured through BLOCKCHAIN_CONFIG as in production."""
+        config = {**settings.BLOCKCHAIN_CONFIG, **chain.settings_overrides()}
+        with override_settings(BLOCKCHAIN_CONFIG=config):
+            return {
+                'reputation_flush': self.bench_reputation_flush(options['sync_addresses']),
+                'anchoring': self.bench_anchoring(options['anchor_products']),
+                'chain_reads': self.bench_chain_reads(chain, listing_ids, sellers),
+            }
+
+    def bench_reputation_flush(self, count):
+        """reputation_sync.flush of ``count`` fresh wallets, in as many batches as it takes."""
+        wallets = [Web3.to_checksum_address(keccak(text=f'benchmark-wallet-{uuid.uuid4()}')[-20:]) for _ in range(count)]
+        reputation_sync.mark_many_dirty((wallet, 100 + index % 900) for index, wallet in enumerate(wallets))
+        batch_size = settings.BLOCKCHAIN_CONFIG.get('REPUTATION_SYNC_BATCH_SIZE', 100)
+        started = time.perf_counter()
+        stats = reputation_sync.flush(max_batches=math.ceil(count / batch_size))
+        elapsed = time.perf_counter() - started
+        return {
+            **stats,
+            'seconds': round(elapsed, 3),
+            'addresses_per_second': round(stats['sent'] / elapsed, 1) if elapsed else None,
+        }
+
+    def bench_anchoring(self, count):
+        """anchoring.anchor_pending_products over ``count`` synthetic products; the rows are rolled back."""
+        with transaction.atomic():
+            seller = UserProfile.objects.create(username=f'chain-benchmark-{uuid.uuid4().hex[:12]}', role='seller')
+            products = Product.objects.bulk_create(
+                Product(
+                    seller=seller, listing_id=f'{seller.username}-{index}', title=f'Benchmark product {index}',
+                    description='', category='other', price=1, product_hash=Web3.to_hex(keccak(text=f'{seller.username}-{index}')),
+                )
+                for index in range(count)
+            )
+            ProductAnchor.objects.bulk_create(
+                ProductAnchor(product=product, product_hash=product.product_hash) for product in products
+            )
+            started = time.perf_counter()
+            batch = anchoring.anchor_pending_products(max_leaves=count)
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        return {
+            'leaves': batch.leaf_count if batch else 0,
+            'status': batch.status if batch else None,
+            'seconds': round(elapsed, 3),
+        }
+
+    def bench_chain_reads(self, chain, listing_ids, sellers):
+        """chain_reads.read_many of every listing and seller: cold at a fresh block, then from the cache."""
+        calls = [ChainCall('marketplace', 'getListing', (listing_id,)) for listing_id in listing_ids]
+        calls += [ChainCall('marketplace', 'getSellerData', (seller.address,)) for seller in sellers]
+        if not calls:
+            return {}
+        block = chain_reads.pin_read_block(chain.w3.eth.block_number)
+
+        started = time.perf_counter()
+        results = chain_reads.read_many(calls, block=block)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        chain_reads.read_many(calls, block=block)
+        warm = time.perf_counter() - started
+        return {
+            'calls': len(calls),
+            'failed': sum(result is None for result in results),
+            'multicall': bool(settings.BLOCKCHAIN_CONFIG.get('MULTICALL_CONTRACT')),
+            'cold_ms': self.ms(cold),
+            'cached_ms': self.ms(warm),
+        }
+
+    def submit(self, chain, probe, calls, rate):
+        """Send calls at the target rate, then wait for every receipt."""
+        hashes = []
+        started = time.perf_counter()
+        for index, (function, account, value) in enumerate(calls):
+            if rate:
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            signed = chain.sign(function, account, value=value)
+            # Register before sending: with automine the event exists as soon as the call returns
+            probe.submitted[Web3.to_hex(signed.hash)] = time.perf_counter()
+            hashes.append(chain.w3.eth.send_raw_transaction(signed.raw_transaction))
+        submitted = time.perf_counter() - started
+        receipts = [chain.wait(tx_hash) for tx_hash in hashes]
+        confirmed = time.perf_counter() - started
+        return {
+            'transactions': len(hashes),
+            'submit_seconds': round(submitted, 3),
+            'submit_tps': round(len(hashes) / submitted, 1) if submitted else None,
+            'confirmed_seconds': round(confirmed, 3),
+            'confirmed_tps': round(len(hashes) / confirmed, 1) if confirmed else None,
+            'gas_used': sum(receipt['gasUsed'] for receipt in receipts),
+        }, receipts
+
+    def poll_receipts(self, chain, tx_hashes):
+        """Receipt lookups per second, one request each vs JSON-RPC batches."""
+        if not tx_hashes:
+            return {}
+        started = time.perf_counter()
+        for tx_hash in tx_hashes:
+            chain.w3.eth.get_transaction_receipt(tx_hash)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for start in range(0, len(tx_hashes), RECEIPT_BATCH_SIZE):
+            with chain.w3.batch_requests() as batch:
+                for tx_hash in tx_hashes[start:start + RECEIPT_BATCH_SIZE]:
+                    batch.add(chain.w3.eth.get_transaction_receipt(tx_hash))
+                batch.execute()
+        batched = time.perf_counter() - started
+
+        return {
+            'receipts': len(tx_hashes),
+            'sequential_per_second': round(len(tx_hashes) / sequential, 1),
+            'batched_per_second': round(len(tx_hashes) / batched, 1),
+            'batch_size': RECEIPT_BATCH_SIZE,
+        }
+
+    @staticmethod
+    def ms(seconds):
+        return None if seconds is None else round(seconds * 1000, 1)
+
+    def print_report(self, report):
+        for phase, stats in report['submission'].items():
+            self.stdout.write(
+                f"{phase:<10} {stats['transactions']:>6} tx  submit {stats['submit_tps']} tx/s  "
+                f"confirmed {stats['confirmed_tps']} tx/s  gas {stats['gas_used']}"
+            )
+        poll = report['receipt_poll']
+        if poll:
+            self.stdout.write(
+                f"receipts   {poll['receipts']:>6}     sequential {poll['sequential_per_second']}/s  "
+                f"batched {poll['batched_per_second']}/s"
+            )
+        lag = report['indexer_lag']
+        self.stdout.write(
+            f"index lag  p50 {lag['p50_ms']} ms  p95 {lag['p95_ms']} ms  p99 {lag['p99_ms']} ms  "
+            f"max {lag['max_ms']} ms  (missed {lag['missed']})"
+        )
+        backend = report['backend']
+        if backend:
+            flush = backend['reputation_flush']
+            self.stdout.write(
+                f"rep flush  {flush['sent']:>6} addr  {flush['transactions']} tx  {flush['seconds']} s  "
+                f"{flush['addresses_per_second']} addr/s  (failed {flush['failed']}, requeued {flush['requeued']})"
+            )
+            anchor = backend['anchoring']
+            self.stdout.write(f"anchoring  {anchor['leaves']:>6} leaves  {anchor['seconds']} s  ({anchor['status']})")
+            reads = backend['chain_reads']
+            if reads:
+                self.stdout.write(
+                    f"reads      {reads['calls']:>6} calls  cold {reads['cold_ms']} ms  cached {reads['cached_ms']} ms  "
+                    f"(multicall {'on' if reads['multicall'] else 'off'}, failed {reads['failed']})"
+                )
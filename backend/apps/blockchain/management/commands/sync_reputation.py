@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from apps.users.models import UserProfile
+from apps.blockchain import reputation_sync
+
+
+class Command(BaseCommand):
+    help = 'Flush pending reputation scores to ReputationNFT (e.g. against a local Hardhat node)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Queue every user with a wallet before flushing')
+        parser.add_argument('--retry-failed', action='store_true', help='Re-queue wallets parked after the contract rejected them')
+        parser.add_argument('--batch-size', type=int, default=None, help='Addresses per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Maximum batches to send')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            users = UserProfile.objects.exclude(wallet_address__isnull=True).values_list('wallet_address', 'reputation_score')
+            queued = reputation_sync.mark_many_dirty(users.iterator(chunk_size=2000))
+            self.stdout.write(f"Queued {queued} wallets")
+        if options['retry_failed']:
+            self.stdout.write(f"Re-queued {reputation_sync.retry_failed()} parked wallets")
+
+        self.stdout.write(f"Pending: {reputation_sync.pending_count()}")
+        stats = reputation_sync.flush(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {stats['sent']} scores in {stats['transactions']} transactions "
+            f"(skipped {stats['skipped']}, parked {stats['failed']}, requeued {stats['requeued']})"
+        ))
@@ -0,0 +1,72 @@
+"""
+Merkle trees over product hashes, compatible with OpenZeppelin's MerkleProof.
+
+Leaves are keccak256(productHash) and inner nodes hash the sorted pair of
+their children, which is what ``MerkleProof.verify`` expects. An odd node at
+the end of a level is carried up unchanged, so its proof is one step shorter.
+"""
+
+from typing import Iterable, List
+
+from eth_hash.auto import keccak
+
+
+def _to_bytes32(value: str) -> bytes:
+    raw = bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    if len(raw) != 32:
+        raise ValueError(f"Expected a 32-byte hash, got {len(raw)} bytes")
+    return raw
+
+
+def leaf_hash(product_hash: str) -> bytes:
+    """Leaf for a sha256 product hash, as computed by verifyProductHash on-chain."""
+    return keccak(_to_bytes32(product_hash))
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    return keccak(a + b) if a < b else keccak(b + a)
+
+
+class MerkleTree:
+    """Full tree kept in memory as a list of levels, leaves first."""
+
+    def __init__(self, leaves: Iterable[bytes]):
+        level = list(leaves)
+        if not level:
+            raise ValueError("Cannot build a Merkle tree without leaves")
+        self.levels: List[List[bytes]] = [level]
+        while len(level) > 1:
+            parents = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+            level = parents
+
+    @classmethod
+    def from_product_hashes(cls, product_hashes: Iterable[str]) -> 'MerkleTree':
+        return cls(leaf_hash(product_hash) for product_hash in product_hashes)
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def proof(self, index: int) -> List[bytes]:
+        """Sibling hashes from leaf ``index`` up to (not including) the root."""
+        proof = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                proof.append(level[sibling])
+            index //= 2
+        return proof
+
+
+def verify(leaf: bytes, proof: Iterable[bytes], root: bytes) -> bool:
+    """Off-chain equivalent of MerkleProof.verify."""
+    computed = leaf
+    for sibling in proof:
+        computed = hash_pair(computed, sibling)
+    return computed == root
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:05
+
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0001_initial'),
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAnchorBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('merkle_root', models.CharField(max_length=66, unique=True)),
+                ('leaf_count', models.IntegerField()),
+                ('transaction_hash', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('block_number', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'blockchain_productanchorbatch',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductAnchor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('product_hash', models.CharField(max_length=100)),
+                ('leaf_index', models.IntegerField(blank=True, null=True)),
+                ('proof', models.JSONField(blank=True, default=list)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='anchor', to='products.product')),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='anchors', to='blockchain.productanchorbatch')),
+            ],
+            options={
+                'db_table': 'blockchain_productanchor',
+                'indexes': [models.Index(condition=models.Q(('batch__isnull', True)), fields=['id'], name='blockchain_anchor_pending_idx')],
+            },
+        ),
+    ]
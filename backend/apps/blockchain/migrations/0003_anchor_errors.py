@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blockchain', '0002_product_anchors'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productanchor',
+            name='blockchain_anchor_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='productanchor',
+            name='error',
+            field=models.CharField(blank=True, help_text='Why the hash cannot be anchored; such rows are left out of batches', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='productanchor',
+            index=models.Index(condition=models.Q(('batch__isnull', True), ('error', '')), fields=['id'], name='blockchain_anchor_pending_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django_extensions.db.models import TimeStampedModel
 from apps.users.models import UserProfile
 from apps.orders.models import Order
+from apps.products.models import Product
 
 class BlockchainTransaction(TimeStampedModel):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='blockchain_tx')
@@ -20,3 +21,35 @@ class BlockchainTransaction(TimeStampedModel):
     
     class Meta:
         db_table = 'blockchain_transaction'
+
+
+class ProductAnchorBatch(TimeStampedModel):
+    """A Merkle root anchoring many product hashes in one transaction"""
+    merkle_root = models.CharField(max_length=66, unique=True)
+    leaf_count = models.IntegerField()
+    transaction_hash = models.CharField(max_length=100, null=True, blank=True, db_index=True)
+    status = models.CharField(
+        max_length=20,
+        choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('failed', 'Failed')],
+        default='pending'
+    )
+    block_number = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'blockchain_productanchorbatch'
+
+
+class ProductAnchor(TimeStampedModel):
+    """Per-product Merkle proof; batch is null while waiting for the next anchoring run"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='anchor')
+    product_hash = models.CharField(max_length=100)
+    batch = models.ForeignKey(ProductAnchorBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='anchors')
+    leaf_index = models.IntegerField(null=True, blank=True)
+    proof = models.JSONField(default=list, blank=True)
+    error = models.CharField(max_length=255, blank=True, help_text="Why the hash cannot be anchored; such rows are left out of batches")
+
+    class Meta:
+        db_table = 'blockchain_productanchor'
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(batch__isnull=True, error=''), name='blockchain_anchor_pending_idx'),
+        ]
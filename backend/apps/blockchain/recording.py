@@ -0,0 +1,161 @@
+"""
+Idempotent bulk recording of blockchain transactions.
+
+Clients and relayers resend transactions after flaky RPC responses, so
+recording is an upsert keyed on ``transaction_hash``: a replay of a known
+transaction is a no-op, and a replay carrying newer receipt data (status,
+block number, gas used) updates the existing row. Orders for the whole batch
+are resolved with one query and rows are written with a single
+``INSERT ... ON CONFLICT`` statement.
+
+Only the buyer or seller of an order (or staff) may record its transaction.
+Orders the caller is not a party to are reported as not found, item by item.
+"""
+
+import logging
+from typing import Any, Dict, List, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.orders.models import Order
+from .models import BlockchainTransaction
+
+logger = logging.getLogger(__name__)
+
+# Fields a replay may change; everything else identifies the transaction
+RECEIPT_FIELDS = ('status', 'block_number', 'gas_used')
+IDENTITY_FIELDS = ('from_address', 'to_address', 'amount', 'token')
+FINAL_STATUSES = {'confirmed', 'failed'}
+
+
+def can_record(user, order: Order) -> bool:
+    """Whether a user may record transactions for an order: its buyer, its seller or staff"""
+    return user.is_staff or user.pk in (order.buyer_id, order.seller_id)
+
+
+def _resolve_orders(items: List[Dict[str, Any]], user) -> Tuple[Dict[int, Order], Dict[str, Order]]:
+    """Orders referenced by primary key or on-chain order id that the user may record, in one query."""
+    pks = {item['order'] for item in items if item.get('order') is not None}
+    chain_ids = {item['order_id'] for item in items if item.get('order_id')}
+    if not pks and not chain_ids:
+        return {}, {}
+    orders = Order.objects.filter(Q(pk__in=pks) | Q(order_id__in=chain_ids)).only('id', 'order_id', 'buyer_id', 'seller_id')
+    orders = [order for order in orders if can_record(user, order)]
+    return {order.pk: order for order in orders}, {order.order_id: order for order in orders}
+
+
+def _same_identity(existing: BlockchainTransaction, item: Dict[str, Any]) -> bool:
+    for field in IDENTITY_FIELDS:
+        current, incoming = getattr(existing, field), item[field]
+        if field in ('from_address', 'to_address', 'token'):
+            current, incoming = current.lower(), incoming.lower()
+        if current != incoming:
+            return False
+    return True
+
+
+def _merge_receipt(existing: BlockchainTransaction, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Receipt fields after applying a replay; a final status is never rolled back to pending."""
+    merged = {field: getattr(existing, field) for field in RECEIPT_FIELDS}
+    if item.get('status') and not (existing.status in FINAL_STATUSES and item['status'] == 'pending'):
+        merged['status'] = item['status']
+    for field in ('block_number', 'gas_used'):
+        if item.get(field) is not None:
+            merged[field] = item[field]
+    return merged
+
+
+def bulk_record_transactions(items: List[Dict[str, Any]], user) -> List[Dict[str, Any]]:
+    """
+    Upsert many transactions keyed on transaction_hash.
+
+    A hash that appears more than once in the batch is recorded from its first
+    entry; later copies are errors.
+
+    Args:
+        items: Validated BulkTransactionItemSerializer data, each referencing its
+            order by primary key (``order``) or on-chain id (``order_id``)
+        user: Caller, who must be a party to each order (see can_record)
+
+    Returns:
+        list: One result per item, in input order, with ``result`` set to
+        created, updated, unchanged or error
+    """
+    by_pk, by_chain_id = _resolve_orders(items, user)
+    hashes = {item['transaction_hash'] for item in items}
+    order_pks = {order.pk for order in by_pk.values()} | {order.pk for order in by_chain_id.values()}
+    existing_rows = BlockchainTransaction.objects.filter(Q(transaction_hash__in=hashes) | Q(order_id__in=order_pks))
+    existing_by_hash = {row.transaction_hash: row for row in existing_rows}
+    hash_by_order = {row.order_id: row.transaction_hash for row in existing_by_hash.values()}
+
+    results = []
+    rows = {}
+    seen = set()
+    for index, item in enumerate(items):
+        tx_hash = item['transaction_hash']
+        result = {'index': index, 'transaction_hash': tx_hash}
+        results.append(result)
+        if tx_hash in seen:
+            result.update(result='error', error='Duplicate transaction_hash in request')
+            continue
+        seen.add(tx_hash)
+
+        order = by_pk.get(item['order']) if item.get('order') is not None else by_chain_id.get(item.get('order_id'))
+        if order is None:
+            result.update(result='error', error='Order not found')
+            continue
+
+        existing = existing_by_hash.get(tx_hash)
+        if existing is not None:
+            if existing.order_id != order.pk or not _same_identity(existing, item):
+                result.update(result='error', error='transaction_hash already recorded with different details')
+                continue
+            merged = _merge_receipt(existing, item)
+            if all(getattr(existing, field) == value for field, value in merged.items()):
+                result.update(result='unchanged', id=existing.pk)
+                continue
+            for field, value in merged.items():
+                setattr(existing, field, value)
+            rows[tx_hash] = existing
+            result.update(result='updated', id=existing.pk)
+            continue
+
+        if hash_by_order.get(order.pk, tx_hash) != tx_hash:
+            result.update(result='error', error='Order already has a different transaction')
+            continue
+        hash_by_order[order.pk] = tx_hash
+        row = BlockchainTransaction(
+            order=order,
+            transaction_hash=tx_hash,
+            **{field: item[field] for field in IDENTITY_FIELDS},
+            status=item.get('status') or 'pending',
+            block_number=item.get('block_number'),
+            gas_used=item.get('gas_used'),
+        )
+        existing_by_hash[tx_hash] = row
+        rows[tx_hash] = row
+        result['result'] = 'created'
+
+    if rows:
+        # Savepoint so a race with a concurrent writer does not poison the request transaction
+        with transaction.atomic():
+            written = BlockchainTransaction.objects.bulk_create(
+                list(rows.values()),
+                update_conflicts=True,
+                unique_fields=['transaction_hash'],
+                update_fields=[*RECEIPT_FIELDS, 'modified'],
+            )
+        ids = {row.transaction_hash: row.pk for row in written}
+        for result in results:
+            if result['result'] != 'error' and result.get('id') is None:
+                result['id'] = ids.get(result['transaction_hash'])
+
+    logger.info(
+        f"Bulk recorded {len(items)} transactions: "
+        f"{sum(1 for r in results if r['result'] == 'created')} created, "
+        f"{sum(1 for r in results if r['result'] == 'updated')} updated, "
+        f"{sum(1 for r in results if r['result'] == 'error')} errors"
+    )
+    return results
+
@@ -0,0 +1,235 @@
+"""
+Coalesced, batched sync of off-chain reputation scores to ReputationNFT.
+
+Score changes are written into a Redis hash keyed by wallet address, so any
+number of updates for the same address between two flushes collapse into a
+single entry holding the latest score. A periodic flush drains the hash and
+pushes it on-chain through ``batchUpdateReputation`` in size-bounded batches,
+one transaction per batch instead of one per review or order.
+
+Addresses the contract keeps rejecting (e.g. a contract wallet that cannot
+receive the level badge) are parked in a separate hash so they do not hold
+back everyone queued behind them.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+
+from .client import BlockchainError, TransactionReverted, get_contract, platform_address, send_transaction
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'chainmart:reputation:dirty'
+FLUSHING_KEY = 'chainmart:reputation:flushing'
+SYNCED_KEY = 'chainmart:reputation:synced'
+FAILED_KEY = 'chainmart:reputation:failed'
+FLUSH_LOCK_KEY = 'reputation_sync_lock'
+WRITE_CHUNK_SIZE = 1000
+
+# A batch can take two transactions: the one that reverted and its retry
+# without the rejected addresses
+TRANSACTIONS_PER_BATCH = 2
+REVERT_ERRORS = (ContractLogicError, TransactionReverted)
+
+
+def _decode_hash(raw: Dict[bytes, bytes]) -> Dict[str, int]:
+    return {key.decode(): int(value) for key, value in raw.items()}
+
+
+def mark_dirty(wallet_address: str, score: int) -> None:
+    """
+    Record the latest score for a wallet; earlier pending scores are overwritten.
+
+    Args:
+        wallet_address: Wallet the score belongs to
+        score: New reputation score
+    """
+    mark_many_dirty([(wallet_address, score)])
+
+
+def mark_many_dirty(updates: Iterable[Tuple[str, int]]) -> int:
+    """
+    Record latest scores for many wallets using chunked multi-field writes.
+
+    Args:
+        updates: (wallet_address, score) pairs; later pairs win for duplicates
+
+    Returns:
+        int: Number of entries written
+    """
+    redis = get_redis_connection('default')
+    written = 0
+    mapping = {}
+    for wallet_address, score in updates:
+        if wallet_address and Web3.is_address(wallet_address):
+            mapping[Web3.to_checksum_address(wallet_address)] = max(int(score), 0)
+        if len(mapping) >= WRITE_CHUNK_SIZE:
+            redis.hset(DIRTY_KEY, mapping=mapping)
+            written += len(mapping)
+            mapping = {}
+    if mapping:
+        redis.hset(DIRTY_KEY, mapping=mapping)
+        written += len(mapping)
+    return written
+
+
+def pending_count() -> int:
+    """Number of addresses waiting to be flushed."""
+    return get_redis_connection('default').hlen(DIRTY_KEY)
+
+
+def failed_count() -> int:
+    """Number of addresses parked after the contract rejected their update."""
+    return get_redis_connection('default').hlen(FAILED_KEY)
+
+
+def retry_failed() -> int:
+    """
+    Move parked addresses back into the dirty set for the next flush.
+
+    Returns:
+        int: Number of addresses re-queued
+    """
+    redis = get_redis_connection('default')
+    entries = _decode_hash(redis.hgetall(FAILED_KEY))
+    _requeue(redis, entries)
+    redis.delete(FAILED_KEY)
+    return len(entries)
+
+
+def _lock_timeout(max_batches: int) -> int:
+    """Long enough for every transaction a flush may send to wait out its receipt."""
+    receipt_timeout = settings.BLOCKCHAIN_CONFIG.get('RECEIPT_TIMEOUT', 120)
+    return max_batches * TRANSACTIONS_PER_BATCH * receipt_timeout + 60
+
+
+def _rejected_addresses(contract, batch: List[str], scores: List[int]) -> List[str]:
+    """
+    Simulate each update of a reverted batch on its own and return the ones that revert.
+
+    Uses eth_call from the platform account, so finding the culprits costs no gas.
+    """
+    sender = platform_address()
+    rejected = []
+    for address, score in zip(batch, scores):
+        try:
+            contract.functions.batchUpdateReputation([address], [score]).call({'from': sender})
+        except ContractLogicError as e:
+            logger.warning(f"Reputation update for {address} is rejected by the contract: {str(e)}")
+            rejected.append(address)
+    return rejected
+
+
+def _requeue(redis, entries: Dict[str, int]) -> None:
+    """Put unsent entries back without clobbering newer scores queued meanwhile."""
+    if not entries:
+        return
+    pipe = redis.pipeline()
+    for address, score in entries.items():
+        pipe.hsetnx(DIRTY_KEY, address, score)
+    pipe.execute()
+
+
+def flush(batch_size: int = None, max_batches: int = None) -> Dict[str, int]:
+    """
+    Push pending scores on-chain in batches.
+
+    The dirty hash is atomically renamed before reading, so updates arriving
+    during a flush land in a fresh hash and are picked up by the next run.
+    Scores equal to the last value synced for an address are dropped without
+    sending. When a batch reverts, each address is simulated on its own; the
+    ones the contract rejects are parked in the failed hash and the rest are
+    sent again at once. If the batch still fails, or another error occurs,
+    the flush stops and anything left unsent is re-queued, as is whatever the
+    max_batches cap leaves over.
+
+    Args:
+        batch_size: Addresses per transaction (REPUTATION_SYNC_BATCH_SIZE by default)
+        max_batches: Upper bound on batches sent by this call
+
+    Returns:
+        dict: Counts of 'sent', 'skipped', 'failed' and 'requeued' addresses and 'transactions'
+    """
+    config = settings.BLOCKCHAIN_CONFIG
+    batch_size = batch_size or config.get('REPUTATION_SYNC_BATCH_SIZE', 100)
+    max_batches = max_batches or config.get('REPUTATION_SYNC_MAX_BATCHES', 10)
+    stats = {'sent': 0, 'skipped': 0, 'failed': 0, 'requeued': 0, 'transactions': 0}
+
+    if not cache.add(FLUSH_LOCK_KEY, 1, _lock_timeout(max_batches)):
+        logger.info("Reputation sync already running, skipping flush")
+        return stats
+
+    redis = get_redis_connection('default')
+    try:
+        # Recover entries from a flush that died half way
+        _requeue(redis, _decode_hash(redis.hgetall(FLUSHING_KEY)))
+        redis.delete(FLUSHING_KEY)
+
+        if not redis.exists(DIRTY_KEY):
+            return stats
+        redis.rename(DIRTY_KEY, FLUSHING_KEY)
+
+        entries = _decode_hash(redis.hgetall(FLUSHING_KEY))
+        addresses = list(entries)
+        synced = redis.hmget(SYNCED_KEY, addresses)
+        pending = []
+        for address, last_synced in zip(addresses, synced):
+            if last_synced is not None and int(last_synced) == entries[address]:
+                stats['skipped'] += 1
+            else:
+                pending.append(address)
+
+        contract = get_contract('reputation_nft')
+        done = 0
+        parked = set()
+        for start in range(0, len(pending), batch_size):
+            if start // batch_size >= max_batches:
+                break
+            batch = pending[start:start + batch_size]
+            scores = [entries[address] for address in batch]
+            try:
+                try:
+                    send_transaction(contract.functions.batchUpdateReputation(batch, scores))
+                except REVERT_ERRORS as e:
+                    logger.warning(f"Reputation batch of {len(batch)} reverted, checking addresses one by one: {str(e)}")
+                    rejected = _rejected_addresses(contract, batch, scores)
+                    if not rejected or (len(rejected) == len(batch) > 1):
+                        # Nothing address-specific to drop: the batch as a whole is failing
+                        raise
+                    redis.hset(FAILED_KEY, mapping={address: entries[address] for address in rejected})
+                    parked.update(rejected)
+                    stats['failed'] += len(rejected)
+                    batch = [address for address in batch if address not in rejected]
+                    scores = [entries[address] for address in batch]
+                    if batch:
+                        send_transaction(contract.functions.batchUpdateReputation(batch, scores))
+            except Exception as e:
+                logger.error(f"Reputation batch of {len(batch)} failed: {str(e)}", exc_info=True)
+                break
+            if batch:
+                redis.hset(SYNCED_KEY, mapping=dict(zip(batch, scores)))
+                redis.hdel(FAILED_KEY, *batch)
+                stats['transactions'] += 1
+                stats['sent'] += len(batch)
+            done = start + batch_size
+
+        leftovers = {address: entries[address] for address in pending[done:] if address not in parked}
+        _requeue(redis, leftovers)
+        stats['requeued'] = len(leftovers)
+        redis.delete(FLUSHING_KEY)
+    except BlockchainError as e:
+        # Not configured: keep the dirty set intact for when it is
+        logger.warning(f"Reputation sync unavailable: {str(e)}")
+        _requeue(redis, _decode_hash(redis.hgetall(FLUSHING_KEY)))
+        redis.delete(FLUSHING_KEY)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+    logger.info(f"Reputation sync flushed: {stats}")
+    return stats
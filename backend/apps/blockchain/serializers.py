@@ -1,7 +1,72 @@
 from rest_framework import serializers
-from .models import BlockchainTransaction
+from .models import BlockchainTransaction, ProductAnchor
 
 class BlockchainTransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlockchainTransaction
         fields = '__all__'
+
+
+class BulkTransactionItemSerializer(serializers.Serializer):
+    """One entry of a bulk record request; the order is resolved later for the whole batch"""
+    order = serializers.IntegerField(required=False, min_value=1)
+    order_id = serializers.CharField(required=False, max_length=100)
+    transaction_hash = serializers.RegexField(r'^0x[0-9a-fA-F]{64}$')
+    from_address = serializers.CharField(max_length=42)
+    to_address = serializers.CharField(max_length=42)
+    amount = serializers.DecimalField(max_digits=20, decimal_places=2)
+    token = serializers.CharField(max_length=42)
+    status = serializers.ChoiceField(choices=['pending', 'confirmed', 'failed'], required=False)
+    block_number = serializers.IntegerField(required=False, allow_null=True)
+    gas_used = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_transaction_hash(self, value):
+        return value.lower()
+
+    def validate(self, attrs):
+        if attrs.get('order') is None and not attrs.get('order_id'):
+            raise serializers.ValidationError('Either order or order_id is required')
+        return attrs
+
+
+class ProductAnchorSerializer(serializers.ModelSerializer):
+    merkle_root = serializers.CharField(source='batch.merkle_root', read_only=True, default=None)
+    transaction_hash = serializers.CharField(source='batch.transaction_hash', read_only=True, default=None)
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductAnchor
+        fields = ['product', 'product_hash', 'merkle_root', 'leaf_index', 'proof', 'transaction_hash', 'status']
+
+    def get_status(self, obj):
+        if obj.error:
+            return 'invalid'
+        return obj.batch.status if obj.batch_id else 'pending'
+
+
+class ChainValueField(serializers.Field):
+    """Read-only field for decoded contract data; uint256 values are sent as strings"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, int):
+            return str(value)
+        if isinstance(value, dict):
+            return {str(key): self.to_representation(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.to_representation(item) for item in value]
+        return value
+
+
+class SellerDashboardSerializer(serializers.Serializer):
+    block_number = serializers.IntegerField(read_only=True)
+    seller = serializers.CharField(read_only=True)
+    seller_data = ChainValueField()
+    balances = ChainValueField()
+    orders = ChainValueField()
+    listings = ChainValueField()
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.products.models import Product
+from apps.users.models import UserProfile
+from .anchoring import batch_mode_enabled
+from .models import ProductAnchor
+from .reputation_sync import mark_dirty
+
+
+@receiver(post_save, sender=UserProfile)
+def queue_reputation_sync(sender, instance, update_fields=None, **kwargs):
+    """Queue the user's score for the next batched on-chain reputation sync"""
+    if update_fields is not None and 'reputation_score' not in update_fields:
+        return
+    if not instance.wallet_address:
+        return
+    wallet_address, score = instance.wallet_address, instance.reputation_score
+    transaction.on_commit(lambda: mark_dirty(wallet_address, score))
+
+
+@receiver(post_save, sender=Product)
+def queue_product_anchor(sender, instance, created, **kwargs):
+    """Add new listings to the pending pool for the next Merkle anchoring batch"""
+    if created and batch_mode_enabled() and instance.product_hash:
+        ProductAnchor.objects.create(product=instance, product_hash=instance.product_hash)
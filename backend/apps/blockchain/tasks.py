@@ -0,0 +1,21 @@
+from celery import shared_task
+from . import anchoring, chain_reads, reputation_sync
+
+
+@shared_task
+def flush_reputation_sync():
+    """Push coalesced reputation score changes to ReputationNFT in batches"""
+    return reputation_sync.flush()
+
+
+@shared_task
+def warm_seller_dashboards():
+    """Pre-load on-chain dashboard reads for the most active sellers"""
+    return chain_reads.warm_seller_dashboards()
+
+
+@shared_task
+def anchor_pending_products():
+    """Anchor pending product hashes on-chain under a single Merkle root"""
+    batch = anchoring.anchor_pending_products()
+    return batch.merkle_root if batch else None
@@ -0,0 +1,332 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import fakeredis
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from web3 import Web3
+from requests.exceptions import ReadTimeout
+from rest_framework.test import APIClient
+from web3.exceptions import ContractLogicError, Web3RPCError
+
+from apps.orders.models import Order
+from apps.products.models import Product
+from apps.users.models import UserProfile
+from . import anchoring, chain_reads, client, reputation_sync
+from .client import BlockchainError
+from .models import BlockchainTransaction, ProductAnchor, ProductAnchorBatch
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeMarketplace:
+    """Stands in for the MarketplaceEscrow contract's productRoots mapping"""
+
+    def __init__(self):
+        self.roots = set()
+        self.functions = SimpleNamespace(
+            productRoots=lambda root: SimpleNamespace(call=lambda: 1 if root in self.roots else 0),
+            anchorProductRoot=lambda root, leaf_count: root,
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AnchorPendingProductsTest(TestCase):
+    def setUp(self):
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.marketplace = FakeMarketplace()
+        patcher = mock.patch.object(anchoring, 'get_contract', return_value=self.marketplace)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for i in range(3):
+            self._add_product(i, f"0x{i + 1:064x}")
+
+    def _add_product(self, i, product_hash):
+        product = Product.objects.create(
+            seller=self.seller, listing_id=f'listing-{i}', title=f'Product {i}', description='',
+            category='other', price=1, product_hash=product_hash,
+        )
+        return ProductAnchor.objects.get(product=product)
+
+    def _send(self, root_sent=False, error=None):
+        def send(root):
+            if root_sent:
+                self.marketplace.roots.add(root)
+            if error:
+                raise error
+            return {'transactionHash': b'\x01' * 32, 'blockNumber': 7}
+        return mock.patch.object(anchoring, 'send_transaction', side_effect=send)
+
+    def test_anchors_pending_products_under_one_root(self):
+        with self._send(root_sent=True) as send:
+            batch = anchoring.anchor_pending_products()
+
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(batch.status, 'confirmed')
+        self.assertEqual(batch.leaf_count, 3)
+        self.assertEqual(batch.block_number, 7)
+        self.assertFalse(ProductAnchor.objects.filter(batch__isnull=True).exists())
+
+    def test_failed_send_is_retried_with_the_same_batch_row(self):
+        with self._send(error=BlockchainError('boom')):
+            self.assertIsNone(anchoring.anchor_pending_products())
+        failed = ProductAnchorBatch.objects.get()
+        self.assertEqual(failed.status, 'failed')
+        self.assertEqual(ProductAnchor.objects.filter(batch__isnull=True).count(), 3)
+
+        with self._send(root_sent=True) as send:
+            batch = anchoring.anchor_pending_products()
+
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(batch.pk, failed.pk)
+        self.assertEqual(batch.status, 'confirmed')
+
+    def test_root_mined_after_receipt_timeout_is_confirmed_without_resending(self):
+        with self._send(root_sent=True, error=BlockchainError('receipt timeout')):
+            self.assertIsNone(anchoring.anchor_pending_products())
+
+        with self._send() as send:
+            batch = anchoring.anchor_pending_products()
+
+        send.assert_not_called()
+        self.assertEqual(batch.status, 'confirmed')
+        self.assertEqual(ProductAnchor.objects.filter(batch=batch).count(), 3)
+
+    def test_stranded_pending_batch_is_released(self):
+        with self._send(root_sent=False):
+            batch = anchoring.anchor_pending_products()
+        self.marketplace.roots.clear()
+        ProductAnchorBatch.objects.filter(pk=batch.pk).update(status='pending')
+        self._add_product(3, f"0x{4:064x}")
+
+        with self._send(root_sent=True):
+            new_batch = anchoring.anchor_pending_products()
+
+        self.assertNotEqual(new_batch.pk, batch.pk)
+        self.assertEqual(new_batch.leaf_count, 4)
+        self.assertEqual(ProductAnchorBatch.objects.get(pk=batch.pk).status, 'failed')
+
+    def test_invalid_hash_is_flagged_and_skipped(self):
+        bad = self._add_product(3, 'QmNotAHexHash')
+
+        with self._send(root_sent=True):
+            batch = anchoring.anchor_pending_products()
+
+        bad.refresh_from_db()
+        self.assertEqual(batch.leaf_count, 3)
+        self.assertIsNone(bad.batch_id)
+        self.assertTrue(bad.error)
+
+
+class FakeReputationNFT:
+    """batchUpdateReputation that rejects a fixed set of addresses"""
+
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.functions = SimpleNamespace(batchUpdateReputation=self._batch_update)
+
+    def _batch_update(self, users, scores):
+        def call(tx=None):
+            if self.rejected.intersection(users):
+                raise ContractLogicError('execution reverted: ERC721InvalidReceiver')
+        return SimpleNamespace(users=list(users), call=call)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReputationSyncFlushTest(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.addresses = [Web3.to_checksum_address(f"0x{i + 1:040x}") for i in range(6)]
+        patcher = mock.patch.object(reputation_sync, 'get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(reputation_sync, 'platform_address', return_value=self.addresses[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _flush(self, contract, **kwargs):
+        def send(function):
+            function.call()
+            return {}
+        with mock.patch.object(reputation_sync, 'get_contract', return_value=contract), \
+                mock.patch.object(reputation_sync, 'send_transaction', side_effect=send) as sent:
+            stats = reputation_sync.flush(**kwargs)
+        return stats, [call.args[0].users for call in sent.call_args_list]
+
+    def test_updates_for_one_address_coalesce(self):
+        reputation_sync.mark_dirty(self.addresses[1], 10)
+        reputation_sync.mark_dirty(self.addresses[1].lower(), 20)
+
+        stats, sent = self._flush(FakeReputationNFT())
+
+        self.assertEqual(sent, [[self.addresses[1]]])
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(int(self.redis.hget(reputation_sync.SYNCED_KEY, self.addresses[1])), 20)
+
+    def test_rejected_address_is_parked_and_the_rest_of_its_batch_sent(self):
+        bad = self.addresses[2]
+        reputation_sync.mark_many_dirty((address, 100) for address in self.addresses)
+
+        stats, sent = self._flush(FakeReputationNFT(rejected=[bad]), batch_size=3)
+
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['sent'], 5)
+        self.assertEqual(stats['requeued'], 0)
+        self.assertNotIn(bad, sent[-1] + sent[-2])
+        self.assertEqual(reputation_sync.failed_count(), 1)
+        self.assertEqual(reputation_sync.pending_count(), 0)
+
+        self.assertEqual(reputation_sync.retry_failed(), 1)
+        stats, _ = self._flush(FakeReputationNFT())
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(reputation_sync.failed_count(), 0)
+
+    def test_batch_wide_revert_requeues_without_parking(self):
+        reputation_sync.mark_many_dirty((address, 100) for address in self.addresses)
+
+        stats, _ = self._flush(FakeReputationNFT(rejected=self.addresses), batch_size=3)
+
+        self.assertEqual(stats['failed'], 0)
+        self.assertEqual(stats['requeued'], 6)
+        self.assertEqual(reputation_sync.pending_count(), 6)
+
+    def test_lock_outlives_every_receipt_wait(self):
+        with override_settings(BLOCKCHAIN_CONFIG={'RECEIPT_TIMEOUT': 120}):
+            self.assertGreater(reputation_sync._lock_timeout(10), 10 * 2 * 120)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ChainReadBlockTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.head = 1000
+        patcher = mock.patch.object(chain_reads, 'current_block', side_effect=lambda: self.head)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_share_the_pinned_block_within_the_staleness_bound(self):
+        self.assertEqual(chain_reads.pin_read_block(), 1000)
+        self.head = 1030
+        self.assertEqual(chain_reads.read_block(), 1000)
+        self.head = 1031
+        self.assertEqual(chain_reads.read_block(), 1031)
+
+    @override_settings(BLOCKCHAIN_CONFIG={**settings.BLOCKCHAIN_CONFIG, 'MARKETPLACE_CONTRACT': '0x' + '22' * 20})
+    def test_warmed_entries_serve_later_reads_at_latest(self):
+        call = chain_reads.ChainCall('marketplace', 'getSellerData', ('0x' + '11' * 20,))
+        with mock.patch.object(chain_reads, '_execute', return_value=[{'reputation': 1}]) as execute:
+            chain_reads.read_many([call], block=chain_reads.pin_read_block())
+            self.head += 5
+            self.assertEqual(chain_reads.read_many([call]), [{'reputation': 1}])
+        self.assertEqual(execute.call_count, 1)
+
+
+MARKETPLACE_CONFIG = {**settings.BLOCKCHAIN_CONFIG, 'MARKETPLACE_CONTRACT': '0x' + '22' * 20, 'MULTICALL_CONTRACT': ''}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BLOCKCHAIN_CONFIG=MARKETPLACE_CONFIG)
+class ChainReadErrorsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = [
+            chain_reads.ChainCall('marketplace', 'getSellerBalance', ('0x' + '11' * 20, chain_reads.NATIVE_TOKEN)),
+            chain_reads.ChainCall('marketplace', 'getListing', (7,)),
+        ]
+
+    def test_reverted_call_yields_none_and_calldata_uses_the_public_encoder(self):
+        contract = client.get_contract('marketplace')
+
+        def eth_call(address, data, block):
+            if data == contract.encode_abi('getListing', args=(7,)):
+                raise ContractLogicError('execution reverted: no listing')
+            return (5).to_bytes(32, 'big')
+
+        with mock.patch.object(chain_reads, '_raw_call', side_effect=eth_call):
+            self.assertEqual(chain_reads.read_many(self.calls, block=10), [5, None])
+
+    def test_rpc_failures_raise_blockchain_error(self):
+        with mock.patch.object(chain_reads, '_raw_call', side_effect=ReadTimeout('timed out')):
+            with self.assertRaises(BlockchainError):
+                chain_reads.read_many(self.calls, block=10)
+
+        multicall_config = {**MARKETPLACE_CONFIG, 'MULTICALL_CONTRACT': '0x' + '33' * 20}
+        aggregate3 = mock.Mock(side_effect=Web3RPCError('header not found'))
+        with override_settings(BLOCKCHAIN_CONFIG=multicall_config), \
+                mock.patch('web3.contract.contract.ContractFunction.call', aggregate3):
+            with self.assertRaises(BlockchainError):
+                chain_reads.read_many(self.calls, block=10)
+
+    def test_dashboard_answers_503_when_the_node_is_down(self):
+        seller = UserProfile.objects.create(username='seller', role='seller', wallet_address='0x' + '11' * 20)
+        api = APIClient()
+        api.force_authenticate(seller)
+
+        with mock.patch.object(chain_reads, '_raw_call', side_effect=ConnectionError('refused')), \
+                mock.patch.object(chain_reads, 'read_block', return_value=10):
+            response = api.get('/api/v1/blockchain/seller_dashboard/')
+
+        self.assertEqual(response.status_code, 503)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecordTransactionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = UserProfile.objects.create(username='buyer')
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.stranger = UserProfile.objects.create(username='stranger')
+        self.orders = [
+            Order.objects.create(
+                order_id=f'order-{i}', listing_id='1', buyer=self.buyer, seller=self.seller,
+                amount=1, currency='ETH', payment_token=chain_reads.NATIVE_TOKEN,
+            )
+            for i in range(2)
+        ]
+        self.api = APIClient()
+
+    def item(self, order, n, **fields):
+        return {
+            'order': order.pk, 'transaction_hash': f"0x{n:064x}", 'from_address': '0x' + '11' * 20,
+            'to_address': '0x' + '22' * 20, 'amount': '1.00', 'token': chain_reads.NATIVE_TOKEN, **fields,
+        }
+
+    def bulk(self, user, items):
+        self.api.force_authenticate(user)
+        response = self.api.post('/api/v1/blockchain/bulk_record_transactions/', {'transactions': items}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [result['result'] for result in response.data['results']]
+
+    def test_only_parties_to_an_order_can_record_it(self):
+        self.assertEqual(self.bulk(self.stranger, [self.item(self.orders[0], 1)]), ['error'])
+        self.assertFalse(BlockchainTransaction.objects.exists())
+
+        self.assertEqual(self.bulk(self.seller, [self.item(self.orders[0], 1)]), ['created'])
+        self.stranger.is_staff = True
+        self.stranger.save()
+        self.assertEqual(self.bulk(self.stranger, [self.item(self.orders[1], 2)]), ['created'])
+
+    def test_single_record_checks_the_order_too(self):
+        self.api.force_authenticate(self.stranger)
+        response = self.api.post('/api/v1/blockchain/record_transaction/', self.item(self.orders[0], 1), format='json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(BlockchainTransaction.objects.exists())
+
+    def test_duplicate_hash_in_one_batch_is_rejected(self):
+        items = [self.item(self.orders[0], 1), self.item(self.orders[0], 1, status='confirmed')]
+
+        self.assertEqual(self.bulk(self.buyer, items), ['created', 'error'])
+        self.assertEqual(BlockchainTransaction.objects.get().status, 'pending')
+
+    def test_partial_failure_records_the_valid_items(self):
+        items = [
+            self.item(self.orders[0], 1),
+            self.item(self.orders[1], 2, transaction_hash='0xnot-a-hash'),
+            {**self.item(self.orders[1], 3), 'order': 999999},
+            self.item(self.orders[1], 4),
+        ]
+
+        self.assertEqual(self.bulk(self.buyer, items), ['created', 'error', 'error', 'created'])
+        self.assertEqual(self.bulk(self.buyer, [self.item(self.orders[0], 1, status='confirmed')]), ['updated'])
+        self.assertEqual(BlockchainTransaction.objects.count(), 2)
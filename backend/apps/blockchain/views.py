@@ -1,9 +1,16 @@
+from django.conf import settings
+from django.db import IntegrityError
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import BlockchainTransaction
-from .serializers import BlockchainTransactionSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from . import chain_reads
+from .client import BlockchainError
+from .models import BlockchainTransaction, ProductAnchor
+from .recording import bulk_record_transactions, can_record
+from .serializers import (
+    BlockchainTransactionSerializer, BulkTransactionItemSerializer, ProductAnchorSerializer, SellerDashboardSerializer,
+)
 
 class BlockchainTransactionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = BlockchainTransaction.objects.all()
@@ -14,5 +21,57 @@ class BlockchainTransactionViewSet(viewsets.ReadOnlyModelViewSet):
     def record_transaction(self, request):
         serializer = BlockchainTransactionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        if not can_record(request.user, serializer.validated_data['order']):
+            return Response({'error': 'Not a party to this order'}, status=status.HTTP_403_FORBIDDEN)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def bulk_record_transactions(self, request):
+        """Idempotent upsert of many transactions keyed on transaction_hash, with a result per item"""
+        items = request.data.get('transactions') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of transactions'}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = settings.BLOCKCHAIN_CONFIG.get('BULK_RECORD_MAX_ITEMS', 1000)
+        if len(items) > max_items:
+            return Response({'error': f'At most {max_items} transactions per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BulkTransactionItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'result': 'error', 'errors': serializer.errors}
+
+        if valid:
+            try:
+                recorded = bulk_record_transactions([data for _, data in valid], request.user)
+            except IntegrityError:
+                # A concurrent request recorded a conflicting transaction for one of the orders
+                return Response({'error': 'Conflicting concurrent write, retry the request'}, status=status.HTTP_409_CONFLICT)
+            for (index, _), result in zip(valid, recorded):
+                result['index'] = index
+                results[index] = result
+
+        return Response({'results': results})
+
+    @action(detail=False, methods=['get'])
+    def seller_dashboard(self, request):
+        """On-chain balances, escrow record, orders and listings for the current seller"""
+        try:
+            dashboard = chain_reads.seller_dashboard(request.user)
+        except BlockchainError as e:
+            return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if dashboard is None:
+            return Response({'error': 'Wallet not connected'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(SellerDashboardSerializer(dashboard).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny], url_path=r'product-proof/(?P<product_id>\d+)')
+    def product_proof(self, request, product_id=None):
+        """Merkle proof tying a product's hash to its anchored on-chain root"""
+        anchor = ProductAnchor.objects.select_related('batch').filter(product_id=product_id).first()
+        if anchor is None:
+            return Response({'error': 'Product is not queued for anchoring'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ProductAnchorSerializer(anchor).data)
@@ -0,0 +1,82 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages of a queryset ordered on several keys ending in a unique one.
+
+    DRF's CursorPagination positions on the first ordering field only and
+    falls back to offsets for ties, which is most rows when the sort key is
+    a counter few rows have moved off zero. This cursor carries every key,
+    so each page is one range scan of the matching index however deep it is.
+
+    ``ordering`` fixes the keys; left unset, the queryset's own order_by is
+    used, so a view can pick the sort per request.
+    """
+    ordering = None
+    page_size = 20
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, cursor, fields):
+        """Cursor values converted by their model fields; NotFound for anything malformed"""
+        try:
+            values = json.loads(b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if self.ordering:
+            queryset = queryset.order_by(*self.ordering)
+        self.keys = [key.lstrip('-') for key in queryset.query.order_by]
+        try:
+            fields = [queryset.model._meta.get_field(key) for key in self.keys]
+        except FieldDoesNotExist as e:
+            raise ValueError(f"{type(self).__name__} orders on model fields only: {str(e)}")
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            values = self.decode_cursor(cursor, fields)
+            # Rows after the cursor: equal on a prefix of the keys and past it on the next one
+            after = Q()
+            for index, key in enumerate(queryset.query.order_by):
+                lookup = 'lt' if key.startswith('-') else 'gt'
+                ties = {self.keys[i]: values[i] for i in range(index)}
+                after |= Q(**ties, **{f'{self.keys[index]}__{lookup}': values[index]})
+            queryset = queryset.filter(after)
+
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        self.fields = fields
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = [field.value_to_string(last) for field in self.fields]
+        cursor = b64encode(json.dumps(values).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), 'cursor', cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,59 @@
+"""
+Chunked repair of denormalized columns.
+
+Counters kept up to date with F() deltas drift when rows change behind
+the signals (queryset updates, bulk deletes, raw SQL, historical data).
+``reconcile_in_chunks`` walks the rows holding them in primary key order,
+recounts each chunk from the source tables and writes back the rows that
+differ. Each chunk is locked while it is counted, so a change written
+concurrently is either counted here or applied after the chunk commits.
+"""
+
+from typing import Callable, Dict, List
+
+from django.db import transaction
+
+
+def _differs(current, expected) -> bool:
+    if isinstance(current, float) and isinstance(expected, (int, float)):
+        return abs(current - expected) > 1e-9
+    return current != expected
+
+
+def reconcile_in_chunks(
+    queryset,
+    fields: List[str],
+    expected: Callable[[list], List[Dict]],
+    chunk_size: int,
+) -> Dict[str, int]:
+    """
+    Recount ``fields`` of every row in ``queryset`` and repair the rows that drifted.
+
+    Args:
+        queryset: Rows to check, with any extra columns ``expected`` reads loaded
+        fields: Denormalized fields to compare and rewrite
+        expected: Called with each locked chunk, returns the true values of ``fields`` per row in the same order
+        chunk_size: Rows locked and counted per transaction
+
+    Returns:
+        dict: Numbers of rows 'checked' and 'repaired'
+    """
+    queryset = queryset.order_by('pk')
+    stats = {'checked': 0, 'repaired': 0}
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(queryset.filter(pk__gt=last_pk).select_for_update()[:chunk_size])
+            if not chunk:
+                break
+            repaired = []
+            for row, values in zip(chunk, expected(chunk)):
+                if any(_differs(getattr(row, field), values[field]) for field in fields):
+                    for field in fields:
+                        setattr(row, field, values[field])
+                    repaired.append(row)
+            queryset.model.objects.bulk_update(repaired, fields)
+        stats['checked'] += len(chunk)
+        stats['repaired'] += len(repaired)
+        last_pk = chunk[-1].pk
+    return stats
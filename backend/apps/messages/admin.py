@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message
+from .models import Conversation, Message
 
 
 @admin.register(Message)
@@ -22,3 +22,12 @@ class MessageAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ['user_low', 'user_high', 'order', 'last_sender', 'last_activity']
+    search_fields = ['user_low__username', 'user_high__username']
+    raw_id_fields = ['user_low', 'user_high', 'order', 'last_message', 'last_sender']
+    readonly_fields = ['created', 'modified']
+    ordering = ['-last_activity']
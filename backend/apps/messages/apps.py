@@ -5,3 +5,6 @@ class MessagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.messages'
     label = 'chat_messages'  # Use a different label to avoid conflict with django.contrib.messages
+
+    def ready(self):
+        import apps.messages.signals  # noqa: F401
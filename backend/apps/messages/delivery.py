@@ -0,0 +1,112 @@
+"""
+Realtime delivery for messages.
+
+New messages and read receipts are queued on the realtime outbox in the same
+transaction as the rows they describe, so sockets hear about them only after
+commit. Delivery receipts and typing indicators come from clients over
+Socket.io and are relayed to the other participant without any write.
+Membership of a conversation never changes, so each node looks it up once
+per conversation and keeps it in a bounded in-process cache.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from apps.realtime.outbox import enqueue
+from apps.realtime.rooms import user_room
+
+from .models import Conversation, Message
+
+MEMBERSHIP_CACHE_SIZE = 10000
+TYPING_STATE_LIMIT = 50000
+
+
+def message_payload(message: Message) -> Dict[str, Any]:
+    return {
+        'id': message.id,
+        'conversation_id': message.conversation_id,
+        'sender': message.sender_id,
+        'recipient': message.recipient_id,
+        'content': message.content,
+        'created_at': message.created.isoformat(),
+    }
+
+
+def queue_new_message(message: Message) -> None:
+    """Deliver a message to the recipient's sockets and the sender's other devices after commit"""
+    enqueue('new_message', message_payload(message), room=[user_room(message.recipient_id), user_room(message.sender_id)])
+
+
+def queue_read_receipt(conversation: Conversation, reader_id, up_to: Optional[int]) -> None:
+    """Tell the other participant that the reader has read up to a message (None: everything)"""
+    other_id = conversation.user_high_id if reader_id == conversation.user_low_id else conversation.user_low_id
+    enqueue(
+        'messages_read',
+        {'conversation_id': conversation.id, 'reader': reader_id, 'up_to': up_to},
+        room=[user_room(other_id), user_room(reader_id)],
+    )
+
+
+def fetch_members(conversation_id) -> Optional[Tuple]:
+    return Conversation.objects.filter(pk=conversation_id).values_list('user_low_id', 'user_high_id').first()
+
+
+class ConversationMembers:
+    """Participants of conversations, looked up once per node"""
+
+    def __init__(self, max_size: int = MEMBERSHIP_CACHE_SIZE):
+        self.max_size = max_size
+        self.members = OrderedDict()
+
+    async def recipient(self, conversation_id, user_id) -> Optional[int]:
+        """
+        The other participant of a conversation.
+
+        Returns:
+            int: Other participant's id, or None if the user is not a participant
+        """
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            return None
+        members = self.members.get(conversation_id)
+        if members is None:
+            members = await sync_to_async(fetch_members)(conversation_id)
+            if members is None:
+                return None
+            self.members[conversation_id] = members
+            if len(self.members) > self.max_size:
+                self.members.popitem(last=False)
+        else:
+            self.members.move_to_end(conversation_id)
+        low, high = members
+        if str(user_id) == str(low):
+            return high
+        if str(user_id) == str(high):
+            return low
+        return None
+
+
+class TypingLimiter:
+    """Lets a typing indicator through when its state changes or after TYPING_INTERVAL seconds"""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else settings.SOCKETIO_CONFIG.get('TYPING_INTERVAL', 2)
+        # (user, conversation) -> (typing, monotonic time it was last relayed)
+        self.last = {}
+
+    def allow(self, user_id, conversation_id, typing: bool) -> bool:
+        now = time.monotonic()
+        key = (user_id, conversation_id)
+        previous = self.last.get(key)
+        if previous is not None and previous[0] == typing and now - previous[1] < self.interval:
+            return False
+        self.last[key] = (typing, now)
+        if len(self.last) > TYPING_STATE_LIMIT:
+            cutoff = now - self.interval
+            self.last = {k: v for k, v in self.last.items() if v[1] > cutoff}
+        return True
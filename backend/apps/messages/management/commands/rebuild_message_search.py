@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from apps.messages import search
+from apps.messages.models import Message
+
+
+class Command(BaseCommand):
+    help = 'Backfill message search vectors in primary-key batches, one UPDATE per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--all', action='store_true', help='Rebuild every message, not only those without a vector')
+
+    def handle(self, *args, **options):
+        messages = Message.objects.order_by('pk')
+        if not options['all']:
+            messages = messages.filter(search_vector__isnull=True)
+        last_pk, updated = 0, 0
+        while True:
+            batch = list(messages.filter(pk__gt=last_pk).values_list('pk', flat=True)[:options['batch_size']])
+            if not batch:
+                break
+            updated += search.update_search_vectors(batch)
+            last_pk = batch[-1]
+            self.stdout.write(f"Indexed {updated} messages (up to id {last_pk})")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {updated} messages"))
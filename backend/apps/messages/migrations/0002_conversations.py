@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:45
+
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_conversations(apps, schema_editor):
+    """One conversation per pair of users who exchanged messages, with its latest message and unread counts"""
+    Message = apps.get_model('chat_messages', 'Message')
+    Conversation = apps.get_model('chat_messages', 'Conversation')
+    ConversationParticipant = apps.get_model('chat_messages', 'ConversationParticipant')
+
+    pairs = set()
+    for sender_id, recipient_id in Message.objects.values_list('sender_id', 'recipient_id').distinct().iterator():
+        pairs.add(tuple(sorted((sender_id, recipient_id))))
+    for low, high in pairs:
+        thread = Message.objects.filter(Q(sender_id=low, recipient_id=high) | Q(sender_id=high, recipient_id=low))
+        last = thread.order_by('-created', '-id').first()
+        conversation = Conversation.objects.create(
+            user_low_id=low,
+            user_high_id=high,
+            last_message=last,
+            last_message_preview=last.content[:200],
+            last_sender_id=last.sender_id,
+        )
+        # last_activity is auto_now_add, so create() would stamp the migration time instead
+        Conversation.objects.filter(pk=conversation.pk).update(last_activity=last.created)
+        thread.update(conversation=conversation)
+        unread = dict(thread.filter(is_read=False).values_list('recipient_id').annotate(count=Count('id')))
+        ConversationParticipant.objects.bulk_create([
+            ConversationParticipant(
+                conversation=conversation, user_id=user_id, unread_count=unread.get(user_id, 0), last_activity=last.created
+            )
+            for user_id in {low, high}
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_messages', '0001_initial'),
+        ('orders', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'messages_conversation_participant',
+            },
+        ),
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('last_message_preview', models.CharField(blank=True, max_length=200)),
+                ('last_activity', models.DateTimeField(auto_now_add=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat_messages.message')),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='orders.order')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'messages_conversation',
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='chat_messages.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-created'], name='messages_thread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', '-created'], name='messages_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['recipient', '-created'], name='messages_recipient_idx'),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='chat_messages.conversation'),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', True)), fields=('user_low', 'user_high'), name='messages_conversation_pair_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('order__isnull', False)), fields=('user_low', 'user_high', 'order'), name='messages_conversation_order_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='conversationparticipant',
+            index=models.Index(fields=['user', '-last_activity'], name='messages_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversationparticipant',
+            constraint=models.UniqueConstraint(fields=('conversation', 'user'), name='messages_participant_uniq'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,94 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django_extensions.db.models import TimeStampedModel
 from apps.users.models import UserProfile
+from apps.orders.models import Order
+
+# Length of the last-message text kept on a conversation for inbox rows
+PREVIEW_LENGTH = 200
+
+
+class ConversationManager(models.Manager):
+    def between(self, user_a, user_b, order=None):
+        """The conversation of two users (optionally about an order), created on first use"""
+        low, high = sorted([getattr(user_a, 'pk', user_a), getattr(user_b, 'pk', user_b)])
+        conversation, created = self.get_or_create(user_low_id=low, user_high_id=high, order=order)
+        if created:
+            ConversationParticipant.objects.bulk_create([
+                ConversationParticipant(conversation=conversation, user_id=user_id, last_activity=conversation.last_activity)
+                for user_id in {low, high}
+            ])
+        return conversation
+
+
+class Conversation(TimeStampedModel):
+    """Thread between two users, with its latest message denormalized for the inbox"""
+    # Participants in id order, so each pair maps to one row
+    user_low = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    user_high = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True, related_name='conversations')
+
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    last_sender = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity = models.DateTimeField(auto_now_add=True)
+
+    objects = ConversationManager()
+
+    class Meta:
+        db_table = 'messages_conversation'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high'], condition=models.Q(order__isnull=True), name='messages_conversation_pair_uniq'
+            ),
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high', 'order'], condition=models.Q(order__isnull=False), name='messages_conversation_order_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_low_id}-{self.user_high_id}"
+
+    def other_user(self, user_id):
+        return self.user_high if user_id == self.user_low_id else self.user_low
+
+
+class ConversationParticipant(TimeStampedModel):
+    """A user's view of a conversation: its inbox position and unread count"""
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='conversation_memberships')
+    unread_count = models.PositiveIntegerField(default=0)
+    # Copy of conversation.last_activity so the inbox is one index range scan
+    last_activity = models.DateTimeField()
+
+    class Meta:
+        db_table = 'messages_conversation_participant'
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'user'], name='messages_participant_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_activity'], name='messages_inbox_idx'),
+        ]
+
 
 class Message(TimeStampedModel):
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, related_name='messages')
     sender = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='sent_messages')
     recipient = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='received_messages')
     content = models.TextField()
     is_read = models.BooleanField(default=False)
-    
+    search_vector = SearchVectorField(null=True, blank=True)
+
     class Meta:
         db_table = 'messages_message'
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['conversation', '-created'], name='messages_thread_idx'),
+            models.Index(fields=['sender', '-created'], name='messages_sender_idx'),
+            models.Index(fields=['recipient', '-created'], name='messages_recipient_idx'),
+            # Unread messages are a small fraction; mark-read and reconcile only touch these
+            models.Index(fields=['recipient', 'conversation'], condition=models.Q(is_read=False), name='messages_unread_idx'),
+            # btree_gin lets the conversation filter and the text match share one index scan
+            GinIndex(fields=['conversation', 'search_vector'], name='messages_search_idx'),
+        ]
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class InboxPagination(CursorPagination):
+    """Conversations by latest activity; each page is one range scan of the inbox index"""
+    ordering = '-last_activity'
+    page_size = 20
+
+
+class ThreadPagination(CursorPagination):
+    """Messages of one conversation, newest first, on the (conversation, -created) index"""
+    ordering = '-created'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,67 @@
+"""
+Full-text search over a user's messages.
+
+Each message carries a tsvector of its content, written when the message is
+saved and backfilled in batches by ``rebuild_message_search``. The GIN index
+covers (conversation, search_vector) through btree_gin. A search joins the
+user's participant rows to messages on conversation_id. The planner can then
+drive a nested loop from the inbox index and probe the composite index with
+``conversation_id = <participant's conversation> AND search_vector @@ query``
+for each conversation. Its cost follows the number of matches in the user's
+conversations, not the size of the table or of the user's history. An
+``IN (subquery)`` filter gives the planner no such parameterised probe and
+usually ends in a scan of every text match.
+"""
+
+from typing import Iterable, Optional
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, QuerySet
+
+from .models import Message
+
+SEARCH_CONFIG = 'english'
+MAX_RESULTS = 50
+HEADLINE_OPTIONS = {'start_sel': '<mark>', 'stop_sel': '</mark>', 'max_words': 25, 'min_words': 10, 'max_fragments': 2}
+
+
+def update_search_vectors(message_ids: Iterable[int]) -> int:
+    """
+    Recompute the search vector of the given messages in one UPDATE.
+
+    Returns:
+        int: Number of messages updated
+    """
+    return Message.objects.filter(pk__in=list(message_ids)).update(
+        search_vector=SearchVector('content', config=SEARCH_CONFIG),
+    )
+
+
+def search_messages(user, text: str, conversation_id: Optional[int] = None) -> QuerySet:
+    """
+    Messages in the user's conversations matching a web-style query, best matches first.
+
+    Args:
+        user: User whose conversations are searched
+        text: Query, e.g. ``refund "tracking number" -cancelled``
+        conversation_id: Restrict to one of the user's conversations
+
+    Returns:
+        QuerySet: Messages annotated with ``rank`` and a ``headline`` snippet; slice before evaluating
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    # A join, not IN (subquery): participant rows are unique per (conversation, user), so no duplicates
+    messages = Message.objects.filter(conversation__participants__user=user, search_vector=query)
+    if conversation_id is not None:
+        messages = messages.filter(conversation_id=conversation_id)
+    return (
+        messages
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            # Computed by PostgreSQL only for the rows that survive the LIMIT
+            headline=SearchHeadline('content', query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+        )
+        .select_related('sender')
+        .only('conversation_id', 'sender_id', 'recipient_id', 'created', 'sender__display_name')
+        .order_by('-rank', '-created')
+    )
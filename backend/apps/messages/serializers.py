@@ -1,9 +1,48 @@
 from rest_framework import serializers
-from .models import Message
+from .models import ConversationParticipant, Message
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source='sender.display_name', read_only=True)
+    created_at = serializers.DateTimeField(source='created', read_only=True)
     
     class Meta:
         model = Message
-        fields = ['id', 'sender', 'sender_name', 'recipient', 'content', 'is_read', 'created_at']
+        fields = ['id', 'conversation', 'sender', 'sender_name', 'recipient', 'content', 'is_read', 'created_at']
+        read_only_fields = ['conversation', 'sender', 'is_read']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """Inbox row: one conversation as seen by the requesting participant"""
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
+    other_user = serializers.SerializerMethodField()
+    last_message = serializers.SerializerMethodField()
+    order = serializers.IntegerField(source='conversation.order_id', read_only=True)
+
+    class Meta:
+        model = ConversationParticipant
+        fields = ['id', 'other_user', 'order', 'last_message', 'last_activity', 'unread_count']
+
+    def get_other_user(self, obj):
+        other = obj.conversation.other_user(obj.user_id)
+        return {'id': other.pk, 'username': other.username, 'display_name': other.display_name}
+
+    def get_last_message(self, obj):
+        conversation = obj.conversation
+        if conversation.last_message_id is None:
+            return None
+        return {
+            'id': conversation.last_message_id,
+            'sender': conversation.last_sender_id,
+            'preview': conversation.last_message_preview,
+        }
+
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    sender_name = serializers.CharField(source='sender.display_name', read_only=True)
+    created_at = serializers.DateTimeField(source='created', read_only=True)
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ['id', 'conversation', 'sender', 'sender_name', 'recipient', 'headline', 'rank', 'created_at']
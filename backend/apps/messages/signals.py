@@ -0,0 +1,42 @@
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.messages import delivery, search, unread
+from apps.messages.models import PREVIEW_LENGTH, Conversation, ConversationParticipant, Message
+
+
+@receiver(post_save, sender=Message)
+def message_created(sender, instance, created, **kwargs):
+    """Move the conversation to the top of both inboxes and count the message as unread for the recipient"""
+    if not created or instance.conversation_id is None:
+        return
+    Conversation.objects.filter(pk=instance.conversation_id).update(
+        last_message=instance,
+        last_message_preview=instance.content[:PREVIEW_LENGTH],
+        last_sender=instance.sender_id,
+        last_activity=instance.created,
+    )
+    ConversationParticipant.objects.filter(conversation_id=instance.conversation_id).update(
+        last_activity=instance.created,
+        unread_count=Case(
+            When(user_id=instance.recipient_id, then=F('unread_count') + 1),
+            default=F('unread_count'),
+            output_field=PositiveIntegerField(),
+        ),
+    )
+    unread.message_created(instance)
+    delivery.queue_new_message(instance)
+
+
+@receiver(post_save, sender=Message)
+def index_message(sender, instance, update_fields=None, **kwargs):
+    """Keep the message's search vector in step with its content"""
+    if update_fields is None or 'content' in update_fields:
+        search.update_search_vectors([instance.pk])
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    """Deleting an unread message leaves the recipient's counters high until reconciled"""
+    if not instance.is_read:
+        unread.mark_dirty([instance.recipient_id])
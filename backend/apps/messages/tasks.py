@@ -0,0 +1,8 @@
+from celery import shared_task
+from . import unread
+
+
+@shared_task
+def reconcile_unread_counters():
+    """Recount unread messages of users whose counters changed since the last run"""
+    return unread.reconcile()
@@ -0,0 +1,236 @@
+import asyncio
+from unittest import mock, skipUnless
+
+import fakeredis
+from django.db import connection, transaction
+from django.db.models.sql import Query
+from django.db.models.sql.constants import INNER
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.realtime.models import RealtimeEvent
+from apps.users.models import UserProfile
+from apps.realtime.outbox import split_targets
+from . import delivery, search, unread
+from .models import Conversation, ConversationParticipant, Message
+
+
+class MessagesTestCase(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(unread, 'get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The search vector UPDATE is Postgres full text search
+        patcher = mock.patch.object(search, 'update_search_vectors')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.buyer = UserProfile.objects.create(username='buyer')
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.conversation = Conversation.objects.between(self.buyer, self.seller)
+
+    def send(self, sender=None, recipient=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(
+                conversation=self.conversation, sender=sender or self.buyer, recipient=recipient or self.seller, content='hi',
+            )
+
+    def column(self, user):
+        return ConversationParticipant.objects.get(conversation=self.conversation, user=user).unread_count
+
+
+class UnreadCounterTest(MessagesTestCase):
+    def test_messages_count_for_their_recipient_only(self):
+        self.send()
+        self.send()
+
+        self.assertEqual(unread.counts(self.seller.pk), {'total': 2, 'conversations': {str(self.conversation.pk): 2}})
+        self.assertEqual(unread.counts(self.buyer.pk), {'total': 0, 'conversations': {}})
+        self.assertEqual((self.column(self.seller), self.column(self.buyer)), (2, 0))
+
+    def test_cached_counts_follow_new_messages_and_are_pushed(self):
+        self.assertEqual(unread.counts(self.seller.pk)['total'], 0)
+
+        self.send()
+
+        self.assertEqual(int(self.redis.hget(unread.counter_key(self.seller.pk), unread.TOTAL_FIELD)), 1)
+        event = RealtimeEvent.objects.filter(event_type='unread_updated').latest('id')
+        self.assertEqual(event.data, {'conversation_id': self.conversation.pk, 'unread': 1, 'total': 1})
+
+    def test_mark_read_up_to_a_message(self):
+        self.send()
+        second = self.send()
+        self.send()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(unread.mark_read(self.seller.pk, self.conversation.pk, up_to=second.pk), 2)
+
+        self.assertEqual(unread.counts(self.seller.pk)['total'], 1)
+        self.assertEqual(self.column(self.seller), 1)
+        self.assertEqual(Message.objects.filter(is_read=False).count(), 1)
+
+    def test_counters_never_go_below_zero(self):
+        self.send()
+        unread.counts(self.seller.pk)
+
+        self.assertEqual(unread.apply_delta(self.seller.pk, self.conversation.pk, -5), (0, 0))
+
+    def test_reconcile_repairs_counts_after_a_delete(self):
+        self.send()
+        message = self.send()
+        unread.reconcile()
+        unread.counts(self.seller.pk)
+
+        message.delete()
+
+        self.assertEqual(unread.counts(self.seller.pk)['total'], 2)
+        self.assertEqual(unread.reconcile(), {'users': 1, 'repaired': 1})
+        self.assertEqual(unread.counts(self.seller.pk)['total'], 1)
+        self.assertEqual(self.column(self.seller), 1)
+
+    def test_missing_hash_is_rebuilt_from_the_column(self):
+        self.send()
+        self.redis.flushall()
+
+        self.assertEqual(unread.counts(self.seller.pk)['total'], 1)
+        self.assertTrue(self.redis.exists(unread.counter_key(self.seller.pk)))
+
+
+class ConversationApiTest(MessagesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = UserProfile.objects.create(username='other')
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_inbox_lists_the_users_conversations_by_latest_activity(self):
+        self.send()
+        later = Conversation.objects.between(self.buyer, self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(conversation=later, sender=self.other, recipient=self.buyer, content='hello')
+
+        response = self.client.get('/api/v1/messages/conversations/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [later.pk, self.conversation.pk])
+
+    def test_threads_are_newest_first_and_private_to_participants(self):
+        first, second = self.send(), self.send(sender=self.seller, recipient=self.buyer)
+
+        response = self.client.get(f'/api/v1/messages/conversations/{self.conversation.pk}/messages/')
+        self.assertEqual([row['id'] for row in response.data['results']], [second.pk, first.pk])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/v1/messages/conversations/{self.conversation.pk}/messages/').status_code, 404)
+
+    def test_read_and_unread_endpoints(self):
+        first = self.send(sender=self.seller, recipient=self.buyer)
+        self.send(sender=self.seller, recipient=self.buyer)
+        self.assertEqual(self.client.get('/api/v1/messages/conversations/unread/').data['total'], 2)
+
+        url = f'/api/v1/messages/conversations/{self.conversation.pk}/read/'
+        self.assertEqual(self.client.post(url, {'up_to': 'x'}).status_code, 400)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url, {'up_to': first.pk}).data, {'marked': 1})
+        self.assertEqual(self.client.get('/api/v1/messages/conversations/unread/').data, {
+            'total': 1, 'conversations': {str(self.conversation.pk): 1},
+        })
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+class MessageDeliveryTest(MessagesTestCase):
+    def events(self, event_type):
+        return list(RealtimeEvent.objects.filter(event_type=event_type).order_by('id'))
+
+    def test_new_messages_go_to_the_recipient_and_the_senders_other_devices(self):
+        message = self.send()
+
+        event, = self.events('new_message')
+        self.assertEqual(split_targets(event.room), [f'user_{self.seller.pk}', f'user_{self.buyer.pk}'])
+        self.assertEqual((event.data['id'], event.data['content']), (message.pk, 'hi'))
+
+    def test_messages_rolled_back_are_never_announced(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.send()
+            raise RuntimeError
+        self.assertEqual(self.events('new_message'), [])
+
+    def test_marking_read_sends_a_receipt_to_the_sender(self):
+        first = self.send()
+        self.send()
+        with self.captureOnCommitCallbacks(execute=True):
+            unread.mark_read(self.seller.pk, self.conversation.pk, up_to=first.pk)
+            unread.mark_read(self.seller.pk, self.conversation.pk, up_to=first.pk)
+
+        event, = self.events('messages_read')
+        self.assertEqual(split_targets(event.room), [f'user_{self.buyer.pk}', f'user_{self.seller.pk}'])
+        self.assertEqual(event.data, {'conversation_id': self.conversation.pk, 'reader': self.seller.pk, 'up_to': first.pk})
+
+    def test_conversation_members_are_looked_up_once_per_conversation(self):
+        members = delivery.ConversationMembers()
+        members_of = {self.conversation.pk: (self.buyer.pk, self.seller.pk)}
+        with mock.patch.object(delivery, 'fetch_members', side_effect=members_of.get) as fetch:
+
+            async def run():
+                return [
+                    await members.recipient(self.conversation.pk, self.buyer.pk),
+                    await members.recipient(str(self.conversation.pk), str(self.seller.pk)),
+                    await members.recipient(self.conversation.pk, 999),
+                    await members.recipient('x', self.buyer.pk),
+                    await members.recipient(self.conversation.pk + 1, self.buyer.pk),
+                ]
+            self.assertEqual(asyncio.run(run()), [self.seller.pk, self.buyer.pk, None, None, None])
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_typing_indicators_pass_on_changes_and_are_throttled_otherwise(self):
+        limiter = delivery.TypingLimiter(interval=60)
+        self.assertEqual(
+            [limiter.allow(1, 5, typing) for typing in (True, True, False, False, True)],
+            [True, False, True, False, True],
+        )
+        self.assertTrue(limiter.allow(2, 5, True))
+        # Once the interval has passed the same state is repeated
+        unthrottled = delivery.TypingLimiter(interval=0)
+        self.assertEqual([unthrottled.allow(1, 5, True) for _ in range(2)], [True, True])
+
+
+class MessageSearchTest(TestCase):
+    def setUp(self):
+        self.buyer = UserProfile.objects.create(username='buyer')
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.other = UserProfile.objects.create(username='other')
+        self.conversation = Conversation.objects.between(self.buyer, self.seller)
+
+    def send(self, conversation, sender, recipient, content):
+        # Vectors are written after commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return Message.objects.create(conversation=conversation, sender=sender, recipient=recipient, content=content)
+
+    def subqueries(self, node):
+        if isinstance(getattr(node, 'rhs', None), Query):
+            return [node]
+        return [found for child in getattr(node, 'children', []) for found in self.subqueries(child)]
+
+    def test_conversations_are_joined_on_the_indexed_column(self):
+        query = search.search_messages(self.seller, 'refund', self.conversation.pk).query
+
+        joins = {alias.table_name: alias.join_type for alias in query.alias_map.values()}
+        self.assertEqual(joins[ConversationParticipant._meta.db_table], INNER)
+        self.assertFalse(self.subqueries(query.where))
+
+    def test_search_requires_a_query(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        self.assertEqual(client.get('/api/v1/messages/search/').status_code, 400)
+        self.assertEqual(client.get('/api/v1/messages/search/?q=refund&offset=x').status_code, 400)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_matches_in_the_users_conversations_are_ranked(self):
+        other_conversation = Conversation.objects.between(self.buyer, self.other)
+        best = self.send(self.conversation, self.buyer, self.seller, 'Refund please, the refund is late')
+        self.send(self.conversation, self.seller, self.buyer, 'Your refund was cancelled')
+        weaker = self.send(self.conversation, self.seller, self.buyer, 'A refund is on its way')
+        self.send(other_conversation, self.buyer, self.other, 'Refund for the other order')
+
+        results = list(search.search_messages(self.seller, 'refund -cancelled'))
+        self.assertEqual([message.pk for message in results], [best.pk, weaker.pk])
+        self.assertIn('<mark>Refund</mark>', results[0].headline)
+        self.assertEqual(list(search.search_messages(self.other, 'refund', self.conversation.pk)), [])
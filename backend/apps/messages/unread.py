@@ -0,0 +1,204 @@
+"""
+Unread message counters.
+
+Each user has a Redis hash holding one field per conversation with unread
+messages plus a ``total`` field, so badge reads are a single HGETALL. The
+durable copy is ConversationParticipant.unread_count, changed with F()
+expressions in the same transaction as the messages. Redis is adjusted only
+after commit, and the new values are pushed to the user's sockets through
+the realtime outbox.
+
+Every adjustment also puts the user in a dirty set. A periodic reconcile
+recounts their unread messages from the messages table, repairs the column
+and rewrites their hash, so drift from deleted messages, failed Redis calls
+or writes racing the reconcile itself is corrected on the next run. A hash
+that is missing (evicted, expired or never built) is rebuilt from the column
+on first read.
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from django_redis import get_redis_connection
+
+from apps.realtime.outbox import enqueue
+from apps.realtime.rooms import user_room
+
+from . import delivery
+from .models import Conversation, ConversationParticipant, Message
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'chainmart:unread:dirty'
+TOTAL_FIELD = 'total'
+# Idle users' hashes expire and are rebuilt from the database when next read
+COUNTER_TTL = 7 * 24 * 3600
+RECONCILE_BATCH_SIZE = 500
+
+# Apply a delta to one conversation and the total, never below zero, and only if the
+# hash exists: a partial hash would report a wrong total. Returns {conversation, total}.
+_APPLY_DELTA = """
+redis.call('SADD', KEYS[2], ARGV[3])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local conversation = math.max(tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0') + tonumber(ARGV[2]), 0)
+local total = math.max(tonumber(redis.call('HGET', KEYS[1], 'total') or '0') + tonumber(ARGV[2]), 0)
+if conversation == 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+else
+    redis.call('HSET', KEYS[1], ARGV[1], conversation)
+end
+redis.call('HSET', KEYS[1], 'total', total)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {conversation, total}
+"""
+
+
+def counter_key(user_id) -> str:
+    return f'chainmart:unread:{user_id}'
+
+
+def _store(redis, user_id, conversations: Dict[int, int]) -> Dict[str, int]:
+    """Replace a user's hash with the given per-conversation counts"""
+    mapping = {str(conversation_id): count for conversation_id, count in conversations.items() if count > 0}
+    mapping[TOTAL_FIELD] = sum(mapping.values())
+    pipe = redis.pipeline()
+    pipe.delete(counter_key(user_id))
+    pipe.hset(counter_key(user_id), mapping=mapping)
+    pipe.expire(counter_key(user_id), COUNTER_TTL)
+    pipe.execute()
+    return mapping
+
+
+def counts(user_id) -> Dict[str, int]:
+    """
+    Unread counts of a user.
+
+    Returns:
+        dict: 'total' and a mapping of conversation id (as a string) to unread count
+    """
+    redis = get_redis_connection('default')
+    raw = redis.hgetall(counter_key(user_id))
+    if raw:
+        values = {key.decode(): int(value) for key, value in raw.items()}
+    else:
+        values = _store(redis, user_id, dict(
+            ConversationParticipant.objects.filter(user_id=user_id, unread_count__gt=0)
+            .values_list('conversation_id', 'unread_count')
+        ))
+    total = values.pop(TOTAL_FIELD, 0)
+    return {'total': total, 'conversations': values}
+
+
+def apply_delta(user_id, conversation_id, delta: int) -> Optional[Tuple[int, int]]:
+    """
+    Adjust a user's cached counters after a commit and mark the user for reconciliation.
+
+    Returns:
+        tuple: (conversation unread, total unread), or None if the user has no cached hash
+    """
+    result = get_redis_connection('default').eval(
+        _APPLY_DELTA, 2, counter_key(user_id), DIRTY_KEY, str(conversation_id), delta, str(user_id), COUNTER_TTL,
+    )
+    return (int(result[0]), int(result[1])) if result else None
+
+
+def publish(user_id, conversation_id, delta: int) -> None:
+    """Apply a committed change to the cache and push the new counts to the user's sockets"""
+    updated = apply_delta(user_id, conversation_id, delta)
+    if updated is None:
+        current = counts(user_id)
+        updated = (current['conversations'].get(str(conversation_id), 0), current['total'])
+    enqueue(
+        'unread_updated',
+        {'conversation_id': conversation_id, 'unread': updated[0], 'total': updated[1]},
+        room=user_room(user_id),
+    )
+
+
+def message_created(message: Message) -> None:
+    """Count a new message as unread for its recipient once the transaction commits"""
+    transaction.on_commit(lambda: publish(message.recipient_id, message.conversation_id, 1), robust=True)
+
+
+def mark_read(user_id, conversation_id, up_to: Optional[int] = None) -> int:
+    """
+    Mark the user's unread messages in a conversation read, up to and including a message.
+
+    One UPDATE flips the messages and one adjusts the participant's column; the
+    read receipt is queued in the same transaction and the cached counters
+    follow after commit.
+
+    Args:
+        user_id: Reader, who must be the messages' recipient
+        conversation_id: Conversation to mark
+        up_to: Id of the last message read; None marks every message
+
+    Returns:
+        int: Number of messages marked read
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.only('user_low_id', 'user_high_id', 'last_message_id').get(pk=conversation_id)
+        messages = Message.objects.filter(conversation_id=conversation_id, recipient_id=user_id, is_read=False)
+        if up_to is not None:
+            messages = messages.filter(id__lte=up_to)
+        marked = messages.update(is_read=True)
+        if marked:
+            ConversationParticipant.objects.filter(conversation_id=conversation_id, user_id=user_id).update(
+                unread_count=Greatest(F('unread_count') - marked, Value(0)),
+            )
+            delivery.queue_read_receipt(conversation, user_id, up_to if up_to is not None else conversation.last_message_id)
+            transaction.on_commit(lambda: publish(user_id, conversation_id, -marked), robust=True)
+    return marked
+
+
+def reconcile(batch_size: int = RECONCILE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Recount unread messages of users whose counters changed since the last run.
+
+    Users are popped from the dirty set before counting, so a change committed
+    while this runs marks its user dirty again for the next run.
+
+    Returns:
+        dict: Numbers of 'users' reconciled and participant rows 'repaired'
+    """
+    redis = get_redis_connection('default')
+    user_ids = [int(user_id) for user_id in redis.spop(DIRTY_KEY, batch_size) or []]
+    if not user_ids:
+        return {'users': 0, 'repaired': 0}
+
+    actual = {
+        (user_id, conversation_id): count
+        for user_id, conversation_id, count in Message.objects.filter(recipient_id__in=user_ids, is_read=False)
+        .values_list('recipient_id', 'conversation_id').annotate(count=Count('id')).order_by()
+        if conversation_id is not None
+    }
+    participants = ConversationParticipant.objects.filter(user_id__in=user_ids).filter(
+        Q(unread_count__gt=0) | Q(conversation_id__in={conversation_id for _, conversation_id in actual})
+    )
+    repaired = []
+    per_user: Dict[int, Dict[int, int]] = {user_id: {} for user_id in user_ids}
+    for participant in participants.only('id', 'user_id', 'conversation_id', 'unread_count'):
+        count = actual.get((participant.user_id, participant.conversation_id), 0)
+        per_user[participant.user_id][participant.conversation_id] = count
+        if participant.unread_count != count:
+            participant.unread_count = count
+            repaired.append(participant)
+    ConversationParticipant.objects.bulk_update(repaired, ['unread_count'], batch_size=RECONCILE_BATCH_SIZE)
+
+    for user_id, conversations in per_user.items():
+        _store(redis, user_id, conversations)
+    if repaired:
+        logger.info(f"Repaired {len(repaired)} unread counters for {len(user_ids)} users")
+    return {'users': len(user_ids), 'repaired': len(repaired)}
+
+
+def mark_dirty(user_ids: Iterable) -> None:
+    """Queue users for the next reconcile, e.g. after deleting their messages"""
+    user_ids = list(user_ids)
+    if user_ids:
+        get_redis_connection('default').sadd(DIRTY_KEY, *user_ids)
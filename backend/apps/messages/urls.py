@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import MessageViewSet
+from .views import ConversationViewSet, MessageViewSet
 
 router = DefaultRouter()
+# Registered before the empty prefix, whose detail route would otherwise match 'conversations/'
+router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'', MessageViewSet, basename='message')
 
 urlpatterns = [
@@ -1,7 +1,12 @@
-from rest_framework import viewsets
+from django.db.models import Q
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
-from .models import Message
-from .serializers import MessageSerializer
+from rest_framework.response import Response
+from . import search, unread
+from .models import Conversation, ConversationParticipant, Message
+from .pagination import InboxPagination, ThreadPagination
+from .serializers import ConversationSerializer, MessageSearchResultSerializer, MessageSerializer
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
@@ -9,4 +14,65 @@ class MessageViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        return Message.objects.filter(recipient=user) | Message.objects.filter(sender=user)
+        return Message.objects.select_related('sender').filter(Q(recipient=user) | Q(sender=user))
+
+    def perform_create(self, serializer):
+        sender = self.request.user
+        recipient = serializer.validated_data['recipient']
+        serializer.save(sender=sender, conversation=Conversation.objects.between(sender, recipient))
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked full-text search over the user's conversations: ?q=...&conversation=&offset="""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            conversation_id = request.query_params.get('conversation')
+            conversation_id = int(conversation_id) if conversation_id else None
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), search.MAX_RESULTS)
+        except ValueError:
+            return Response({'error': 'conversation, offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search.search_messages(request.user, text, conversation_id)[offset:offset + limit]
+        return Response({'results': MessageSearchResultSerializer(results, many=True).data, 'offset': offset, 'limit': limit})
+
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Inbox of the requesting user and the message thread of each conversation"""
+    serializer_class = ConversationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = InboxPagination
+    lookup_field = 'conversation_id'
+    lookup_url_kwarg = 'pk'
+
+    def get_queryset(self):
+        return ConversationParticipant.objects.filter(user=self.request.user).select_related(
+            'conversation__user_low', 'conversation__user_high'
+        )
+
+    @action(detail=True, methods=['get'])
+    def messages(self, request, pk=None):
+        participant = self.get_object()
+        queryset = Message.objects.select_related('sender').filter(conversation_id=participant.conversation_id)
+        paginator = ThreadPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(MessageSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        """Mark messages up to ``up_to`` (default: all) read"""
+        participant = self.get_object()
+        up_to = request.data.get('up_to')
+        if up_to is not None:
+            try:
+                up_to = int(up_to)
+            except (TypeError, ValueError):
+                return Response({'error': 'up_to must be a message id'}, status=status.HTTP_400_BAD_REQUEST)
+        marked = unread.mark_read(request.user.pk, participant.conversation_id, up_to)
+        return Response({'marked': marked})
+
+    @action(detail=False, methods=['get'], url_path='unread')
+    def unread_counts(self, request):
+        """Unread totals for badges, from the counter cache"""
+        return Response(unread.counts(request.user.pk))
@@ -48,6 +48,8 @@ class Order(TimeStampedModel):
             models.Index(fields=['buyer', '-created']),
             models.Index(fields=['seller', '-created']),
             models.Index(fields=['status']),
+            # Incremental seller reputation runs scan orders changed since the last run
+            models.Index(fields=['modified'], name='orders_modified_idx'),
         ]
     
     def __str__(self):
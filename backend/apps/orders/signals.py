@@ -1,25 +1,49 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from apps.orders.models import Order
-import asyncio
-from config.socketio_config import emit_order_update
+from apps.realtime.outbox import enqueue
+
+# Only changes to these fields are pushed to the buyer
+WATCHED_FIELDS = ('status', 'dispute_status', 'amount', 'currency', 'payment_token', 'transaction_hash')
+
+
+def _snapshot(instance):
+    # Read from __dict__ so deferred fields are not fetched just to be watched
+    return {field: instance.__dict__[field] for field in WATCHED_FIELDS if field in instance.__dict__}
+
+
+@receiver(post_init, sender=Order)
+def remember_watched_fields(sender, instance, **kwargs):
+    instance._realtime_snapshot = _snapshot(instance)
+
 
 @receiver(post_save, sender=Order)
-def order_status_changed(sender, instance, created, **kwargs):
-    """Emit order update when status changes"""
-    try:
-        order_data = {
-            'id': instance.id,
-            'status': instance.status,
-            'total_price': str(instance.total_price),
-            'updated_at': instance.updated_at.isoformat(),
-        }
-        
-        # Run async function
-        loop = asyncio.new_event_loop()
-        loop.run_until_complete(emit_order_update(instance.buyer_id, order_data))
-        loop.close()
-        
-        print(f"[v0] Emitted order update for user {instance.buyer_id}")
-    except Exception as e:
-        print(f"[v0] Error emitting order update: {str(e)}")
+def order_status_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Queue an order update for the buyer when the order is placed or its status or payment changes"""
+    previous = getattr(instance, '_realtime_snapshot', {})
+    instance._realtime_snapshot = _snapshot(instance)
+    if not created:
+        if update_fields is not None and not set(update_fields) & set(WATCHED_FIELDS):
+            return
+        changed = [
+            field for field in WATCHED_FIELDS
+            if (previous[field] != getattr(instance, field) if field in previous
+                else update_fields is None or field in update_fields)
+        ]
+        if not changed:
+            return
+
+    order_data = {
+        'id': instance.id,
+        'order_id': instance.order_id,
+        'status': instance.status,
+        'dispute_status': instance.dispute_status,
+        'amount': str(instance.amount),
+        'currency': instance.currency,
+        'modified': instance.modified.isoformat(),
+    }
+    enqueue(
+        'order_updated', order_data,
+        room=f'user_orders_{instance.buyer_id}',
+        channel_group=f'orders_{instance.buyer_id}',
+    )
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.realtime.models import RealtimeEvent
+from apps.users.models import UserProfile
+from .models import Order
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class OrderEventTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = UserProfile.objects.create(username='buyer')
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.order = Order.objects.create(
+            order_id='order-1', listing_id='listing', buyer=self.buyer, seller=self.seller,
+            amount=1, currency='USDC', payment_token='0x' + '00' * 20,
+        )
+
+    def events(self):
+        return list(RealtimeEvent.objects.order_by('id').values_list('event_type', 'room'))
+
+    def test_a_new_order_notifies_the_buyer_only(self):
+        self.assertEqual(self.events(), [('order_updated', f'user_orders_{self.buyer.pk}')])
+
+    def test_saves_that_leave_status_and_payment_alone_are_silent(self):
+        self.order.dispute_reason = 'late'
+        self.order.save()
+        Order.objects.get(pk=self.order.pk).save()
+        self.order.save(update_fields=['dispute_reason'])
+        self.assertEqual(len(self.events()), 1)
+
+    def test_status_and_payment_changes_are_pushed(self):
+        self.order.status = 'COMPLETED'
+        self.order.save()
+        order = Order.objects.only('id', 'buyer_id', 'transaction_hash').get(pk=self.order.pk)
+        order.transaction_hash = '0xabc'
+        order.save(update_fields=['transaction_hash'])
+        self.assertEqual(len(self.events()), 3)
+        self.assertEqual(RealtimeEvent.objects.latest('id').data['status'], 'COMPLETED')
@@ -13,7 +13,10 @@ class ProductAdmin(admin.ModelAdmin):
     list_display = ['title', 'seller', 'category', 'price', 'currency', 'stock', 'rating', 'is_active', 'created']
     list_filter = ['category', 'currency', 'is_active', 'created']
     search_fields = ['title', 'description', 'seller__username', 'listing_id']
-    readonly_fields = ['listing_id', 'product_hash', 'rating', 'review_count', 'sale_count', 'created', 'modified']
+    readonly_fields = [
+        'listing_id', 'product_hash', 'rating', 'review_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count', 'sale_count', 'created', 'modified',
+    ]
     list_editable = ['is_active']
     ordering = ['-created']
     
@@ -31,7 +34,10 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('product_hash',)
         }),
         ('Statistics', {
-            'fields': ('rating', 'review_count', 'sale_count')
+            'fields': (
+                'rating', 'review_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+                'rating_3_count', 'rating_4_count', 'rating_5_count', 'sale_count',
+            )
         }),
         ('Status', {
             'fields': ('is_active',)
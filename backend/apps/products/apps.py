@@ -1,2 +1,9 @@
-def ready(self):
-    import apps.products.signals
+from django.apps import AppConfig
+
+
+class ProductsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.products'
+
+    def ready(self):
+        import apps.products.signals  # noqa: F401
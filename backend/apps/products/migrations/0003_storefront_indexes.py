@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['seller', '-sale_count', '-id'], name='products_seller_top_idx'),
+        ),
+    ]
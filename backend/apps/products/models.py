@@ -40,6 +40,13 @@ class Product(TimeStampedModel):
     # Stats
     rating = models.FloatField(default=0.0)
     review_count = models.IntegerField(default=0)
+    # Maintained by apps.reviews.aggregates; rating is rating_sum / review_count
+    rating_sum = models.BigIntegerField(default=0)
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
     sale_count = models.IntegerField(default=0)
     
     is_active = models.BooleanField(default=True, db_index=True)
@@ -49,6 +56,8 @@ class Product(TimeStampedModel):
         db_table = 'products_product'
         indexes = [
             models.Index(fields=['seller', '-created']),
+            # Best sellers of a storefront
+            models.Index(fields=['seller', '-sale_count', '-id'], condition=models.Q(is_active=True), name='products_seller_top_idx'),
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
             GinIndex(fields=['search_vector']),
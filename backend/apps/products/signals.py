@@ -1,25 +1,50 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
 from apps.products.models import Product
-import asyncio
-from config.socketio_config import emit_product_update
+from apps.realtime.outbox import enqueue
+from apps.realtime.rooms import rooms_for_product
+
+# Only changes to these fields are pushed to subscribers
+WATCHED_FIELDS = ('stock', 'price', 'is_active')
+
+
+def _snapshot(instance):
+    # Read from __dict__ so deferred fields are not fetched just to be watched
+    return {field: instance.__dict__[field] for field in WATCHED_FIELDS if field in instance.__dict__}
+
+
+@receiver(post_init, sender=Product)
+def remember_watched_fields(sender, instance, **kwargs):
+    instance._realtime_snapshot = _snapshot(instance)
+
 
 @receiver(post_save, sender=Product)
-def product_inventory_changed(sender, instance, **kwargs):
-    """Emit product update when inventory changes"""
-    try:
-        product_data = {
-            'id': instance.id,
-            'name': instance.name,
-            'stock': instance.stock,
-            'price': str(instance.price),
-            'updated_at': instance.updated_at.isoformat(),
-        }
-        
-        loop = asyncio.new_event_loop()
-        loop.run_until_complete(emit_product_update(product_data))
-        loop.close()
-        
-        print(f"[v0] Emitted product update for product {instance.id}")
-    except Exception as e:
-        print(f"[v0] Error emitting product update: {str(e)}")
+def product_inventory_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Queue a product update for subscribers when stock, price or availability changes"""
+    previous = getattr(instance, '_realtime_snapshot', {})
+    instance._realtime_snapshot = _snapshot(instance)
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(WATCHED_FIELDS):
+        return
+
+    changed = [
+        field for field in WATCHED_FIELDS
+        if (previous[field] != getattr(instance, field) if field in previous
+            else update_fields is None or field in update_fields)
+    ]
+    if not changed:
+        return
+
+    product_data = {
+        'id': instance.id,
+        'seller_id': instance.seller_id,
+        'category': instance.category,
+        'stock': instance.stock,
+        'price': str(instance.price),
+        'is_active': instance.is_active,
+        'changed': changed,
+        'modified': instance.modified.isoformat(),
+    }
+    rooms = rooms_for_product(instance)
+    enqueue('product_updated', product_data, room=rooms, channel_group=rooms)
@@ -4,18 +4,18 @@ from .models import RealtimeEvent
 
 @admin.register(RealtimeEvent)
 class RealtimeEventAdmin(admin.ModelAdmin):
-    list_display = ['event_type', 'timestamp']
+    list_display = ['event_type', 'room', 'timestamp', 'dispatched_at']
     list_filter = ['event_type', 'timestamp']
     search_fields = ['event_type', 'data']
-    readonly_fields = ['timestamp']
+    readonly_fields = ['timestamp', 'claimed_at', 'dispatched_at']
     ordering = ['-timestamp']
     
     fieldsets = (
         ('Event Information', {
-            'fields': ('event_type', 'data')
+            'fields': ('event_type', 'data', 'room', 'channel_group')
         }),
         ('Timestamp', {
-            'fields': ('timestamp',)
+            'fields': ('timestamp', 'claimed_at', 'dispatched_at')
         }),
     )
     
@@ -0,0 +1,219 @@
+"""
+Connection authentication for the Socket.io process.
+
+Each token is decoded once: the result, keyed by a SHA-256 of the token, is
+kept in process until the token expires. A reconnect storm after a deploy
+therefore costs one decode per distinct token, not one per attempt. Whether
+a user may connect (exists, active, not suspended) is a database question.
+Concurrent connects queue their user ids and one worker-thread query
+answers a whole batch, so the event loop never waits on the database. The
+answer is cached for USER_STATUS_TTL seconds.
+
+Long-lived sockets are re-checked every REAUTH_INTERVAL seconds. Clients
+whose token is about to expire get ``reauth_required`` and can send a fresh
+token with the ``reauth`` event. Sockets with expired tokens, and sockets of
+users who have since been suspended or deactivated, are disconnected.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+# Invalid tokens are remembered briefly so retry loops do not re-decode them
+INVALID_TOKEN_TTL = 60
+USER_BATCH_SIZE = 500
+# Connects arriving within this window share one user lookup
+USER_BATCH_WINDOW = 0.005
+
+
+class AuthenticationError(Exception):
+    pass
+
+
+def token_hash(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def extract_token(auth, environ) -> Optional[str]:
+    """Token from the Socket.io auth payload or a Bearer Authorization header"""
+    if isinstance(auth, dict) and auth.get('token'):
+        return auth['token']
+    header = environ.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        return header[7:]
+    return None
+
+
+def fetch_allowed_users(user_ids: Iterable) -> Set[str]:
+    """Ids (as strings) among user_ids of users who exist, are active and are not suspended"""
+    return {
+        str(pk) for pk in get_user_model().objects
+        .filter(pk__in=list(user_ids), is_active=True, is_suspended=False)
+        .values_list('pk', flat=True)
+    }
+
+
+class ConnectionAuthenticator:
+    """Token cache, batched user checks and periodic re-auth for one Socket.io node"""
+
+    def __init__(self, sio=None):
+        config = settings.SOCKETIO_CONFIG
+        self.sio = sio
+        self.max_tokens = config.get('AUTH_CACHE_SIZE', 50000)
+        self.user_status_ttl = config.get('USER_STATUS_TTL', 30)
+        self.reauth_interval = config.get('REAUTH_INTERVAL', 60)
+        self.tokens = OrderedDict()
+        self.user_status: Dict = {}
+        # sid -> (user_id, token expiry) for sockets on this node
+        self.connections: Dict[str, Tuple] = {}
+        self._pending: Dict = {}
+        self._batch_task = None
+        self._running = False
+
+    def decode(self, token: str) -> Tuple:
+        """
+        User id and expiry of an access token, decoding it at most once.
+
+        Raises:
+            AuthenticationError: If the token is invalid or expired
+        """
+        key = token_hash(token)
+        now = time.time()
+        cached = self.tokens.get(key)
+        if cached is not None:
+            user_id, expires_at = cached
+            if expires_at > now:
+                if user_id is None:
+                    raise AuthenticationError('Invalid token')
+                return user_id, expires_at
+            del self.tokens[key]
+            if user_id is not None:
+                raise AuthenticationError('Token expired')
+
+        try:
+            validated = AccessToken(token)
+            user_id = validated[api_settings.USER_ID_CLAIM]
+            expires_at = validated['exp']
+        except (TokenError, KeyError):
+            self._remember(key, None, now + INVALID_TOKEN_TTL)
+            raise AuthenticationError('Invalid token')
+        self._remember(key, user_id, expires_at)
+        return user_id, expires_at
+
+    def _remember(self, key, user_id, expires_at):
+        self.tokens[key] = (user_id, expires_at)
+        if len(self.tokens) > self.max_tokens:
+            self.tokens.popitem(last=False)
+
+    async def is_allowed(self, user_id) -> bool:
+        """Whether the user may hold a socket; concurrent calls share one query"""
+        cached = self.user_status.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.user_status_ttl:
+            return cached[0]
+        future = self._pending.get(user_id)
+        if future is None:
+            future = self._pending[user_id] = asyncio.get_running_loop().create_future()
+            if self._batch_task is None:
+                self._batch_task = asyncio.create_task(self._lookup_pending())
+        return await asyncio.shield(future)
+
+    async def _lookup_pending(self):
+        await asyncio.sleep(USER_BATCH_WINDOW)
+        self._batch_task = None
+        pending, self._pending = self._pending, {}
+        user_ids = list(pending)
+        try:
+            allowed = await self.refresh_users(user_ids)
+        except Exception as e:
+            logger.error(f"Socket.io user lookup failed for {len(user_ids)} users: {str(e)}")
+            for future in pending.values():
+                future.set_exception(AuthenticationError('User lookup failed'))
+            return
+        for user_id, future in pending.items():
+            future.set_result(str(user_id) in allowed)
+
+    async def refresh_users(self, user_ids) -> Set:
+        """Look up users in batches off the event loop and refresh their cached status"""
+        allowed = set()
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            chunk = user_ids[start:start + USER_BATCH_SIZE]
+            allowed |= await sync_to_async(fetch_allowed_users)(chunk)
+        checked_at = time.monotonic()
+        for user_id in user_ids:
+            self.user_status[user_id] = (str(user_id) in allowed, checked_at)
+        return allowed
+
+    async def authenticate(self, token: Optional[str]) -> Tuple:
+        """
+        Authenticate a connecting socket.
+
+        Returns:
+            tuple: (user_id, token expiry as a unix timestamp)
+
+        Raises:
+            AuthenticationError: If the token is missing or invalid, or the user may not connect
+        """
+        if not token:
+            raise AuthenticationError('Missing token')
+        user_id, expires_at = self.decode(token)
+        if not await self.is_allowed(user_id):
+            raise AuthenticationError('User is suspended or inactive')
+        return user_id, expires_at
+
+    def register(self, sid: str, user_id, expires_at) -> None:
+        self.connections[sid] = (user_id, expires_at)
+
+    def forget(self, sid: str) -> None:
+        self.connections.pop(sid, None)
+
+    async def reauthenticate(self) -> int:
+        """
+        Re-check every socket on this node; returns the number disconnected.
+
+        Sockets with expired tokens or disallowed users are disconnected; sockets
+        whose token expires before the next check are asked for a new one.
+        """
+        now = time.time()
+        # Statuses of users without sockets here are only needed for reconnects within the TTL
+        fresh_after = time.monotonic() - self.user_status_ttl
+        self.user_status = {user_id: status for user_id, status in self.user_status.items() if status[1] > fresh_after}
+        user_ids = list({user_id for user_id, _ in self.connections.values()})
+        allowed = await self.refresh_users(user_ids) if user_ids else set()
+
+        closing = []
+        for sid, (user_id, expires_at) in list(self.connections.items()):
+            if str(user_id) not in allowed:
+                closing.append((sid, 'user suspended or inactive'))
+            elif expires_at <= now:
+                closing.append((sid, 'token expired'))
+            elif expires_at <= now + self.reauth_interval:
+                await self.sio.emit('reauth_required', {'expires_at': expires_at}, to=sid)
+        for sid, reason in closing:
+            self.forget(sid)
+            logger.info(f"Disconnecting Socket.io client {sid}: {reason}")
+            await self.sio.disconnect(sid)
+        return len(closing)
+
+    async def run(self) -> None:
+        self._running = True
+        while self._running:
+            await asyncio.sleep(self.reauth_interval)
+            try:
+                await self.reauthenticate()
+            except Exception as e:
+                logger.error(f"Socket.io re-authentication failed: {str(e)}")
+
+    def stop(self) -> None:
+        self._running = False
@@ -0,0 +1,234 @@
+"""
+Bounded per-connection send queues for Socket.io fan-out.
+
+python-socketio hands every emitted packet straight to the Engine.IO socket,
+whose queue is unbounded, so a slow reader makes the server buffer without
+limit. ``BackpressureRedisManager`` routes local deliveries through a small
+queue per connection instead. Packets only move on to the socket while its
+Engine.IO queue is nearly empty, and each event type has an overflow policy:
+
+- ``coalesce``: a newer event for the same object replaces the queued one
+- ``drop_oldest``: the oldest droppable event is discarded to make room
+- ``keep`` (default): never dropped; if the queue is full of these, or the
+  socket has not drained for SLOW_CONSUMER_SECONDS, the client is
+  disconnected and can resume with its last sequence numbers (see streams)
+
+Connections that negotiated the compact wire mode get their queued events
+packed into msgpack batches as they drain (see wire).
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+import socketio
+from django.conf import settings
+from engineio import packet as eio_packet
+from socketio import packet
+from socketio.async_manager import AsyncManager
+
+from . import wire
+
+logger = logging.getLogger(__name__)
+
+# Packets allowed in the Engine.IO queue before the transport counts as busy
+ENGINEIO_HIGH_WATER = 2
+# Frames packed into one compact message when a connection has a backlog
+COMPACT_BATCH_SIZE = 50
+
+metrics = Counter()
+dropped_by_event = Counter()
+
+# payload is the single event argument (None for multi-argument emits); version identifies it for deltas
+QueuedEvent = namedtuple('QueuedEvent', ['event', 'payload', 'packets', 'policy', 'version'])
+
+
+class SendQueue:
+    """Pending packets for one connection, oldest first"""
+
+    __slots__ = ('entries', 'task', 'stalled_since')
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.task = None
+        self.stalled_since = None
+
+    def push(self, key, entry, max_depth):
+        """Returns queued, coalesced, dropped (an older event made room) or overflow."""
+        if entry.policy == 'coalesce' and key in self.entries:
+            self.entries[key] = entry
+            return 'coalesced'
+        outcome = 'queued'
+        if len(self.entries) >= max_depth:
+            # Plain droppable events go first; a coalesced event is the latest state of its object
+            victim = next((k for k, e in self.entries.items() if e.policy == 'drop_oldest'), None)
+            if victim is None:
+                victim = next((k for k, e in self.entries.items() if e.policy == 'coalesce'), None)
+            if victim is None:
+                return 'overflow'
+            dropped_by_event[self.entries.pop(victim).event] += 1
+            outcome = 'dropped'
+        self.entries[key] = entry
+        return outcome
+
+
+class BoundedDeliveryManager(AsyncManager):
+    """Local delivery half of the manager; sits below the pub/sub layer in the MRO"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        config = settings.SOCKETIO_CONFIG
+        self.max_depth = config.get('SEND_QUEUE_DEPTH', 100)
+        self.slow_consumer_seconds = config.get('SLOW_CONSUMER_SECONDS', 30)
+        self.policies = config.get('SEND_POLICIES', {})
+        self.queues = {}
+        self.disconnecting = set()
+        # Delta bases per compact connection, keyed by eio_sid
+        self.compact = {}
+        self.wire = wire.DeltaEncoder()
+        self._keys = itertools.count()
+
+    def _coalesce_key(self, event, data):
+        first = data[0] if data else None
+        object_id = first.get('id') if isinstance(first, dict) else None
+        return (event, object_id) if object_id is not None else next(self._keys)
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        if callback is not None:
+            # Acks need a unique packet per recipient; leave those to the stock path
+            return await super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                                      callback=callback, to=to, **kwargs)
+        room = to or room
+        if namespace not in self.rooms:
+            return
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+
+        encoded = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data).encode()
+        if not isinstance(encoded, list):
+            encoded = [encoded]
+        packets = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+        policy = self.policies.get(event, 'keep')
+        key = self._coalesce_key(event, data) if policy == 'coalesce' else next(self._keys)
+        entry = QueuedEvent(event, data[0] if len(data) == 1 else None, packets, policy, self.wire.new_version())
+
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            self.enqueue(eio_sid, sid, namespace, key, entry)
+
+    def enable_compact(self, sid, namespace):
+        """Deliver wire.EVENT_CODES events to this connection as msgpack frames"""
+        self.compact[self.eio_sid_from_sid(sid, namespace)] = {}
+
+    def enqueue(self, eio_sid, sid, namespace, key, entry):
+        if eio_sid in self.disconnecting:
+            metrics['discarded_on_disconnect'] += 1
+            return
+        queue = self.queues.get(eio_sid)
+        if queue is None:
+            queue = self.queues[eio_sid] = SendQueue()
+        outcome = queue.push(key, entry, self.max_depth)
+        metrics[outcome] += 1
+        if outcome == 'overflow':
+            self.disconnect_slow(eio_sid, sid, namespace, 'queue full')
+            return
+        if queue.task is None:
+            queue.task = asyncio.create_task(self.drain(eio_sid, sid, namespace, queue))
+
+    async def drain(self, eio_sid, sid, namespace, queue):
+        try:
+            while queue.entries:
+                socket = self.server.eio.sockets.get(eio_sid)
+                if socket is None or socket.closed:
+                    break
+                if socket.queue.qsize() >= ENGINEIO_HIGH_WATER:
+                    queue.stalled_since = queue.stalled_since or time.monotonic()
+                    remaining = self.slow_consumer_seconds - (time.monotonic() - queue.stalled_since)
+                    try:
+                        # The Engine.IO writer marks each packet done as it takes it off the queue
+                        await asyncio.wait_for(socket.queue.join(), timeout=max(remaining, 0))
+                    except asyncio.TimeoutError:
+                        self.disconnect_slow(eio_sid, sid, namespace, 'not draining')
+                        return
+                    continue
+                queue.stalled_since = None
+                packets, count = self.next_packets(eio_sid, namespace, queue)
+                for pkt in packets:
+                    await socket.send(pkt)
+                    metrics['bytes_sent'] += len(pkt.data)
+                metrics['sent'] += count
+        finally:
+            queue.task = None
+            if not queue.entries or self.server.eio.sockets.get(eio_sid) is None:
+                self.queues.pop(eio_sid, None)
+
+    def next_packets(self, eio_sid, namespace, queue):
+        """Packets for the oldest queued event, or a compact batch of several; returns (packets, events)"""
+        bases = self.compact.get(eio_sid)
+        frames = []
+        if bases is not None:
+            while queue.entries and len(frames) < COMPACT_BATCH_SIZE:
+                entry = next(iter(queue.entries.values()))
+                frame = self.wire.pack(bases, entry.event, entry.payload, entry.version)
+                if frame is None:
+                    break
+                queue.entries.popitem(last=False)
+                frames.append(frame)
+        if not frames:
+            return queue.entries.popitem(last=False)[1].packets, 1
+
+        metrics['compact_batches'] += 1
+        encoded = self.server.packet_class(
+            packet.EVENT, namespace=namespace, data=[wire.COMPACT_EVENT, wire.pack_batch(frames)],
+        ).encode()
+        return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded], len(frames)
+
+    async def disconnect(self, sid, namespace, **kwargs):
+        eio_sid = self.eio_sid_from_sid(sid, namespace)
+        self.disconnecting.discard(eio_sid)
+        self.compact.pop(eio_sid, None)
+        queue = self.queues.pop(eio_sid, None)
+        if queue is not None and queue.task is not None:
+            queue.task.cancel()
+        return await super().disconnect(sid, namespace, **kwargs)
+
+    def disconnect_slow(self, eio_sid, sid, namespace, reason):
+        if eio_sid in self.disconnecting:
+            return
+        self.disconnecting.add(eio_sid)
+        queue = self.queues.pop(eio_sid, None)
+        if queue is not None:
+            metrics['discarded_on_disconnect'] += len(queue.entries)
+            queue.entries.clear()
+            if queue.task is not None and queue.task is not asyncio.current_task():
+                queue.task.cancel()
+        metrics['slow_disconnects'] += 1
+        logger.warning(f"Disconnecting slow Socket.io consumer {sid}: {reason}")
+        asyncio.ensure_future(self.server.disconnect(sid, namespace=namespace))
+
+
+class BackpressureRedisManager(socketio.AsyncRedisManager, BoundedDeliveryManager):
+    """Redis pub/sub across nodes, bounded queues for local sockets"""
+    pass
+
+
+def queue_metrics(manager) -> dict:
+    """Current queue depth plus cumulative counters for a manager."""
+    depths = [len(queue.entries) for queue in manager.queues.values()]
+    return {
+        'queues': len(depths),
+        'queued_packets': sum(depths),
+        'max_queue_depth': max(depths, default=0),
+        'compact_connections': len(manager.compact),
+        'counters': dict(metrics),
+        'dropped_by_event': dict(dropped_by_event),
+    }
@@ -1,32 +1,122 @@
 import json
 import asyncio
+from collections import deque
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from . import wire
+from .rooms import MAX_SUBSCRIPTIONS, subscription_rooms
+from .streams import get_stream_store
+
+# Shared by every consumer in this process, so identical deltas are packed once
+delta_encoder = wire.DeltaEncoder()
+
+
+async def accept_with_wire_mode(consumer):
+    """Accept the socket and switch to compact frames if the client asked for them"""
+    await consumer.accept()
+    consumer.wire_bases = None
+    if wire.requested_mode(query_string=consumer.scope.get('query_string', b'')) == wire.COMPACT_MODE:
+        consumer.wire_bases = {}
+        await consumer.send(text_data=json.dumps({'type': 'wire', **wire.describe()}))
+
+
+async def send_event(consumer, event_type, event):
+    """Send a channel layer event as JSON, or as a compact frame in compact mode"""
+    if consumer.wire_bases is not None:
+        frame = delta_encoder.pack(consumer.wire_bases, event_type, event['data'], event.get('event_id'))
+        if frame is not None:
+            await consumer.send(bytes_data=wire.pack_batch([frame]))
+            return
+    await consumer.send(text_data=json.dumps(event['data']))
+
+
+async def send_replay(consumer, message, allowed):
+    """Answer {"action": "resume", "channels": {room: last_seq}} with missed events or resync_required"""
+    positions = message.get('channels')
+    if not isinstance(positions, dict):
+        await consumer.send(text_data=json.dumps({'error': 'Expected {"channels": {room: last_seq}}'}))
+        return
+    for result in await get_stream_store().replay_many(positions, allowed=allowed):
+        result['type'] = 'resync_required' if result.get('resync_required') else 'replay'
+        await consumer.send(text_data=json.dumps(result))
+
 
 class OrderConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        self.room_name = f"orders_{self.scope['user'].id}"
-        self.room_group_name = f"orders_{self.scope['user'].id}"
+        self.room_group_name = None
+        user = self.scope.get('user')
+        # Only the owner may follow the orders in the URL
+        if user is None or not user.is_authenticated or str(user.id) != str(self.scope['url_route']['kwargs']['user_id']):
+            await self.close()
+            return
+        self.room_name = f"orders_{user.id}"
+        self.room_group_name = f"orders_{user.id}"
         
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        await accept_with_wire_mode(self)
     
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if self.room_group_name:
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or '{}')
+        except ValueError:
+            return
+        if message.get('action') == 'resume':
+            # Sequence numbers are kept per Socket.io room name
+            await send_replay(self, message, allowed=[f"user_orders_{self.scope['user'].id}"])
     
     async def order_update(self, event):
-        await self.send(text_data=json.dumps(event['data']))
+        await send_event(self, 'order_updated', event)
 
 class ProductConsumer(AsyncWebsocketConsumer):
+    """
+    Product updates for the products, categories and sellers a client subscribes to.
+
+    Clients send ``{"action": "subscribe", "product_ids": [...], "categories": [...], "seller_ids": [...]}``
+    (or ``"unsubscribe"``) after connecting.
+    """
+
     async def connect(self):
-        self.room_name = f"products"
-        self.room_group_name = "products"
-        
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        self.groups_joined = set()
+        self.recent_event_ids = deque(maxlen=64)
+        await accept_with_wire_mode(self)
     
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        for group in self.groups_joined:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            message = json.loads(text_data or '{}')
+            if message.get('action') == 'resume':
+                await send_replay(self, message, allowed=self.groups_joined)
+                return
+            rooms = subscription_rooms(message)
+        except ValueError as e:
+            await self.send(text_data=json.dumps({'error': str(e)}))
+            return
+
+        if message.get('action') == 'unsubscribe':
+            for group in rooms:
+                await self.channel_layer.group_discard(group, self.channel_name)
+                self.groups_joined.discard(group)
+            await self.send(text_data=json.dumps({'unsubscribed': rooms}))
+            return
+
+        if len(self.groups_joined | set(rooms)) > MAX_SUBSCRIPTIONS:
+            await self.send(text_data=json.dumps({'error': f'At most {MAX_SUBSCRIPTIONS} product subscriptions per connection'}))
+            return
+        for group in rooms:
+            await self.channel_layer.group_add(group, self.channel_name)
+            self.groups_joined.add(group)
+        await self.send(text_data=json.dumps({'subscribed': rooms}))
     
     async def product_update(self, event):
-        await self.send(text_data=json.dumps(event['data']))
+        # The same event is sent to the product, category and seller groups
+        if event.get('event_id') in self.recent_event_ids:
+            return
+        self.recent_event_ids.append(event.get('event_id'))
+        await send_event(self, 'product_updated', event)
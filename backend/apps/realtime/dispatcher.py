@@ -0,0 +1,119 @@
+"""
+Async dispatcher draining the realtime outbox.
+
+Runs as a background task inside the Socket.io process. Each round claims a
+batch of committed events and fans every event out to its Socket.io rooms and
+Channels groups, then marks the batch dispatched. A full batch is followed
+immediately by the next one; otherwise the dispatcher sleeps for
+POLL_INTERVAL.
+
+Product updates are coalesced: changes to the same product are merged and
+delivered at most once per COALESCE_WINDOW, with ``changed`` listing every
+field that changed in the window. Every delivered event is sequenced per room
+(see streams) so reconnecting clients can replay what they missed; public
+catalog events are also sequenced on the catalog channel that feeds SSE. Coalesced rows are marked dispatched when
+claimed, so a crash loses at most one window of product updates.
+"""
+
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+
+from . import outbox
+from .rooms import CATALOG_CHANNEL, PUBLIC_CATALOG_EVENTS
+from .streams import get_stream_store
+
+logger = logging.getLogger(__name__)
+
+# Event types merged per object id within the coalescing window
+COALESCED_EVENTS = {'product_updated'}
+
+
+class OutboxDispatcher:
+    def __init__(self, sio, batch_size=None, poll_interval=None, coalesce_window=None):
+        self.sio = sio
+        self.batch_size = batch_size or outbox.outbox_setting('BATCH_SIZE', 500)
+        self.poll_interval = poll_interval or outbox.outbox_setting('POLL_INTERVAL', 0.5)
+        self.coalesce_window = coalesce_window or outbox.outbox_setting('COALESCE_WINDOW', 1.0)
+        self.channel_layer = get_channel_layer()
+        self.streams = get_stream_store()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._running = False
+
+    async def sequence(self, rooms, event):
+        """Payload with per-room sequence numbers, recorded for replay on reconnect"""
+        if event['event_type'] in PUBLIC_CATALOG_EVENTS:
+            # Also sequenced on the catalog channel, which feeds the public SSE stream
+            rooms = rooms + [CATALOG_CHANNEL]
+        try:
+            seqs = await self.streams.append(rooms, event['event_type'], event['data'])
+        except Exception as e:
+            logger.error(f"Failed to sequence realtime event {event['id']}: {str(e)}")
+            return event['data']
+        return {**event['data'], '_seq': seqs}
+
+    async def deliver(self, event):
+        rooms = outbox.split_targets(event['room'])
+        data = await self.sequence(rooms, event) if rooms else event['data']
+        if rooms:
+            await self.sio.emit(event['event_type'], data, room=rooms if len(rooms) > 1 else rooms[0])
+        handler = outbox.CHANNELS_HANDLERS.get(event['event_type'])
+        if handler and self.channel_layer is not None:
+            message = {'type': handler, 'data': data, 'event_id': event['id']}
+            for group in outbox.split_targets(event['channel_group']):
+                await self.channel_layer.group_send(group, message)
+
+    def coalesce(self, event):
+        key = (event['event_type'], event['data'].get('id'))
+        previous = self._pending.get(key)
+        if previous is not None and 'changed' in event['data']:
+            changed = list(dict.fromkeys(previous['data'].get('changed', []) + event['data']['changed']))
+            event['data'] = {**event['data'], 'changed': changed}
+        self._pending[key] = event
+
+    async def flush_coalesced(self):
+        pending, self._pending = self._pending, {}
+        self._last_flush = time.monotonic()
+        for event in pending.values():
+            await self.deliver_safely(event)
+
+    async def deliver_safely(self, event):
+        try:
+            await self.deliver(event)
+        except Exception as e:
+            # Realtime updates are hints; a failed delivery is dropped rather than retried forever
+            logger.error(f"Failed to deliver realtime event {event['id']} ({event['event_type']}): {str(e)}")
+
+    async def dispatch_once(self):
+        """Deliver one batch; returns the number of events claimed."""
+        events = await sync_to_async(outbox.claim_batch)(self.batch_size)
+        for event in events:
+            if event['event_type'] in COALESCED_EVENTS:
+                self.coalesce(event)
+            else:
+                await self.deliver_safely(event)
+        await sync_to_async(outbox.mark_dispatched)([event['id'] for event in events])
+        if self._pending and time.monotonic() - self._last_flush >= self.coalesce_window:
+            await self.flush_coalesced()
+        return len(events)
+
+    async def run(self):
+        self._running = True
+        logger.info(f"Realtime outbox dispatcher started (batch {self.batch_size}, poll {self.poll_interval}s)")
+        while self._running:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Realtime outbox dispatch failed: {str(e)}")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+        if self._pending:
+            await self.flush_coalesced()
+
+    def stop(self):
+        self._running = False
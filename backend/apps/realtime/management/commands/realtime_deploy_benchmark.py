@@ -0,0 +1,240 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.realtime.rooms import product_room
+from config.socketio_config import get_external_emitter
+from .socketio_cluster_check import USER_ID_BASE, create_check_users, delete_check_users, make_token
+
+BENCH_PRODUCT_ID = 10_000_002
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def process_tree(root_pid):
+    """The root process and all of its descendants, from /proc"""
+    children = {}
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # The command name may contain spaces; fields after it are fixed
+            ppid = int((entry / 'stat').read_text().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry.name))
+    pids, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def resource_usage(root_pids):
+    """Processes, total RSS and open sockets of several process trees"""
+    processes = rss_kb = sockets = 0
+    for root_pid in root_pids:
+        for pid in process_tree(root_pid):
+            try:
+                status = Path(f'/proc/{pid}/status').read_text()
+                rss_kb += next((int(line.split()[1]) for line in status.splitlines() if line.startswith('VmRSS:')), 0)
+                sockets += sum(1 for fd in os.scandir(f'/proc/{pid}/fd') if os.readlink(fd.path).startswith('socket:'))
+                processes += 1
+            except OSError:
+                continue
+    return {'processes': processes, 'rss_mb': round(rss_kb / 1024, 1), 'sockets': sockets}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the split deployment (Django under uvicorn plus manage_socketio.py) with the unified '
+        'config.asgi application: HTTP throughput, Socket.io connect and fan-out rates, memory and sockets'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['split', 'unified', 'both'], default='both')
+        parser.add_argument('--workers', type=int, default=2, help='uvicorn workers serving HTTP')
+        parser.add_argument('--base-port', type=int, default=8301)
+        parser.add_argument('--http-path', default='/api/v1/products/')
+        parser.add_argument('--http-concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds of HTTP load')
+        parser.add_argument('--clients', type=int, default=500, help='Socket.io clients held open during the run')
+        parser.add_argument('--events', type=int, default=200, help='Events fanned out to every client')
+
+    def handle(self, *args, **options):
+        modes = ['split', 'unified'] if options['mode'] == 'both' else [options['mode']]
+        user_ids = [USER_ID_BASE + index for index in range(options['clients'])]
+        create_check_users(user_ids)
+        results = {}
+        try:
+            for mode in modes:
+                self.stdout.write(f"Benchmarking {mode} deployment...")
+                results[mode] = self.run_mode(mode, options)
+        finally:
+            delete_check_users(user_ids)
+
+        self.stdout.write(json.dumps(results, indent=2))
+        if len(results) == 2:
+            split, unified = results['split'], results['unified']
+            for label, path in [
+                ('HTTP requests/s', ('http', 'requests_per_second')),
+                ('Socket.io deliveries/s', ('socketio', 'deliveries_per_second')),
+                ('Total RSS (MB)', ('resources', 'rss_mb')),
+                ('Open sockets', ('resources', 'sockets')),
+            ]:
+                self.stdout.write(f"{label:<24} split {split[path[0]][path[1]]:>10}   unified {unified[path[0]][path[1]]:>10}")
+
+    def spawn(self, mode, options):
+        port = options['base_port']
+        uvicorn = [sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--workers', str(options['workers']), '--log-level', 'warning']
+        if mode == 'unified':
+            commands = [uvicorn + ['--port', str(port), 'config.asgi:application']]
+            http_url = socket_url = f'http://127.0.0.1:{port}'
+        else:
+            commands = [
+                uvicorn + ['--port', str(port), '--lifespan', 'off', 'config.asgi:django_asgi_app'],
+                [sys.executable, 'manage_socketio.py', '--host', '127.0.0.1', '--port', str(port + 1)],
+            ]
+            http_url, socket_url = f'http://127.0.0.1:{port}', f'http://127.0.0.1:{port + 1}'
+        # Throughput is the point here, so the servers must not answer with 429s
+        env = {**os.environ, 'THROTTLE_ANON_RATE': '1000000/second', 'THROTTLE_USER_RATE': '1000000/second'}
+        processes = [
+            # stderr is shared with this command so a server that fails to start shows its traceback
+            subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+            for command in commands
+        ]
+        return processes, http_url, socket_url
+
+    def run_mode(self, mode, options):
+        processes, http_url, socket_url = self.spawn(mode, options)
+        try:
+            return asyncio.run(self.measure(processes, http_url, socket_url, options))
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    async def wait_ready(self, session, url, processes):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            exited = [process for process in processes if process.poll() is not None]
+            if exited:
+                raise CommandError(f'{" ".join(exited[0].args[1:])} exited with code {exited[0].returncode}')
+            await asyncio.sleep(0.5)
+        raise CommandError(f'Server at {url} did not come up')
+
+    async def socket_client(self, session, url, user_id, inbox, ready):
+        ws_url = url.replace('http', 'ws', 1) + '/socket.io/?EIO=4&transport=websocket'
+        try:
+            async with session.ws_connect(ws_url, max_msg_size=0) as ws:
+                await ws.receive()  # Engine.IO open
+                await ws.send_str('40' + json.dumps({'token': make_token(user_id)}))
+                reply = await ws.receive()
+                if not str(reply.data).startswith('40'):
+                    return
+                await ws.send_str('42' + json.dumps(['subscribe_products', {'product_ids': [BENCH_PRODUCT_ID]}]))
+                ready.append(time.perf_counter())
+                async for message in ws:
+                    if message.data == '2':
+                        await ws.send_str('3')
+                    elif isinstance(message.data, str) and message.data.startswith('42["bench"'):
+                        inbox.append(time.time() - json.loads(message.data[2:])[1]['sent_at'])
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+    async def http_worker(self, session, url, until, latencies, errors):
+        while time.monotonic() < until:
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors.append(response.status)
+                        continue
+            except aiohttp.ClientError:
+                errors.append('connection')
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    async def measure(self, processes, http_url, socket_url, options):
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            await self.wait_ready(session, http_url + options['http_path'], processes)
+            await self.wait_ready(session, socket_url + '/socket.io/?EIO=4&transport=polling', processes)
+            idle = resource_usage([process.pid for process in processes])
+
+            # Socket.io: connect every client, then fan events out to all of them
+            inbox, ready = [], []
+            started = time.perf_counter()
+            tasks = [
+                asyncio.create_task(self.socket_client(session, socket_url, USER_ID_BASE + index, inbox, ready))
+                for index in range(options['clients'])
+            ]
+            deadline = time.monotonic() + 60
+            while len(ready) < options['clients'] and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            connect_seconds = (max(ready) - started) if ready else None
+
+            emitter = get_external_emitter()
+            expected = len(ready) * options['events']
+            fanout_started = time.perf_counter()
+            for seq in range(options['events']):
+                await asyncio.to_thread(emitter.emit, 'bench', {'seq': seq, 'sent_at': time.time()}, room=product_room(BENCH_PRODUCT_ID))
+            deadline = time.monotonic() + 30
+            while len(inbox) < expected and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            fanout_seconds = time.perf_counter() - fanout_started
+
+            # HTTP load while the sockets stay open
+            latencies, errors = [], []
+            until = time.monotonic() + options['duration']
+            await asyncio.gather(*[
+                self.http_worker(session, http_url + options['http_path'], until, latencies, errors)
+                for _ in range(options['http_concurrency'])
+            ])
+            loaded = resource_usage([process.pid for process in processes])
+            for task in tasks:
+                task.cancel()
+
+        return {
+            'http': {
+                'requests_per_second': round(len(latencies) / options['duration'], 1),
+                'p50_ms': round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+                'errors': len(errors),
+            },
+            'socketio': {
+                'clients_connected': len(ready),
+                'connects_per_second': round(len(ready) / connect_seconds, 1) if connect_seconds else None,
+                'deliveries': len(inbox),
+                'deliveries_expected': expected,
+                'deliveries_per_second': round(len(inbox) / fanout_seconds, 1),
+                'p50_latency_ms': round(percentile(inbox, 0.5) * 1000, 1) if inbox else None,
+                'p99_latency_ms': round(percentile(inbox, 0.99) * 1000, 1) if inbox else None,
+            },
+            'resources': loaded,
+            'resources_idle': idle,
+        }
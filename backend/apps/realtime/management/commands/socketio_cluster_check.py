@@ -0,0 +1,168 @@
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import socketio
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.realtime.presence import online_users
+from apps.realtime.rooms import product_room
+from config.socketio_config import get_external_emitter, user_room
+
+# Synthetic user and product ids, well clear of real rows
+USER_ID_BASE = 10_000_000
+CHECK_PRODUCT_ID = 10_000_000
+
+
+def make_token(user_id):
+    token = AccessToken()
+    token[api_settings.USER_ID_CLAIM] = user_id
+    return str(token)
+
+
+def create_check_users(user_ids):
+    """Temporary accounts for the synthetic ids, which have to pass the connect-time user check"""
+    User = get_user_model()
+    User.objects.bulk_create(
+        [User(pk=user_id, username=f'socketio-check-{user_id}') for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def delete_check_users(user_ids):
+    get_user_model().objects.filter(pk__in=user_ids, username__startswith='socketio-check-').delete()
+
+
+class Command(BaseCommand):
+    help = 'Start several local Socket.io nodes sharing Redis and verify cross-node delivery and presence'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=3, help='Socket.io processes to start')
+        parser.add_argument('--clients-per-node', type=int, default=2)
+        parser.add_argument('--base-port', type=int, default=8101)
+        parser.add_argument('--timeout', type=float, default=5.0, help='Seconds to wait for deliveries')
+
+    def handle(self, *args, **options):
+        ports = [options['base_port'] + index for index in range(options['nodes'])]
+        user_ids = [USER_ID_BASE - 1] + [USER_ID_BASE + index for index in range(options['nodes'] * options['clients_per_node'])]
+        create_check_users(user_ids)
+        processes = [
+            subprocess.Popen(
+                [sys.executable, str(Path(settings.BASE_DIR) / 'manage_socketio.py'), '--host', '127.0.0.1', '--port', str(port)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for port in ports
+        ]
+        try:
+            failures = asyncio.run(self.run_checks(ports, options['clients_per_node'], options['timeout']))
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=10)
+            delete_check_users(user_ids)
+
+        if failures:
+            for failure in failures:
+                self.stderr.write(failure)
+            raise CommandError(f"{len(failures)} cross-node checks failed")
+        self.stdout.write(self.style.SUCCESS('All cross-node checks passed'))
+
+    async def connect(self, port, user_id, inbox, deadline):
+        client = socketio.AsyncClient(reconnection=False)
+
+        @client.on('*')
+        async def any_event(event, data=None):
+            inbox.append((event, data, time.perf_counter()))
+
+        while True:
+            try:
+                await client.connect(f'http://127.0.0.1:{port}', auth={'token': make_token(user_id)}, transports=['websocket'])
+                return client
+            except socketio.exceptions.ConnectionError:
+                if time.monotonic() > deadline:
+                    raise CommandError(f"Could not connect to node on port {port}")
+                await asyncio.sleep(0.5)
+
+    async def run_checks(self, ports, clients_per_node, timeout):
+        deadline = time.monotonic() + 30
+        clients = []
+        for node, port in enumerate(ports):
+            for index in range(clients_per_node):
+                user_id = USER_ID_BASE + node * clients_per_node + index
+                inbox = []
+                client = await self.connect(port, user_id, inbox, deadline)
+                await client.emit('subscribe_products', {'product_ids': [CHECK_PRODUCT_ID]})
+                clients.append({'node': node, 'user_id': user_id, 'client': client, 'inbox': inbox})
+        self.stdout.write(f"Connected {len(clients)} clients across {len(ports)} nodes")
+        await asyncio.sleep(0.5)
+
+        failures = []
+        user_ids = [entry['user_id'] for entry in clients]
+        online = online_users(user_ids)
+        if online != {str(user_id) for user_id in user_ids}:
+            failures.append(f"Presence mismatch after connect: {len(online)}/{len(user_ids)} online")
+
+        # Targeted emits from a process that hosts no sockets at all
+        emitter = get_external_emitter()
+        sent_at = time.perf_counter()
+        for entry in clients:
+            emitter.emit('cluster_check', {'user_id': entry['user_id']}, room=user_room(entry['user_id']))
+        emitter.emit('cluster_broadcast', {'sent': True}, room=product_room(CHECK_PRODUCT_ID))
+
+        expected = 2
+        wait_until = time.monotonic() + timeout
+        while time.monotonic() < wait_until:
+            if all(len([e for e in entry['inbox'] if e[0].startswith('cluster_')]) >= expected for entry in clients):
+                break
+            await asyncio.sleep(0.05)
+
+        latencies = []
+        for entry in clients:
+            events = [e for e in entry['inbox'] if e[0].startswith('cluster_')]
+            targeted = [e for e in events if e[0] == 'cluster_check']
+            broadcast = [e for e in events if e[0] == 'cluster_broadcast']
+            if len(targeted) != 1 or targeted[0][1]['user_id'] != entry['user_id']:
+                failures.append(f"User {entry['user_id']} on node {entry['node']} got {len(targeted)} targeted events")
+            if len(broadcast) != 1:
+                failures.append(f"User {entry['user_id']} on node {entry['node']} got {len(broadcast)} broadcasts")
+            latencies.extend(e[2] - sent_at for e in events)
+        if latencies:
+            self.stdout.write(f"Delivery latency: max {max(latencies) * 1000:.1f} ms over {len(latencies)} events")
+
+        # Users on the first node go offline, everyone else stays online
+        leaving = [entry for entry in clients if entry['node'] == 0]
+        for entry in leaving:
+            await entry['client'].disconnect()
+        await asyncio.sleep(0.5)
+        online = online_users(user_ids)
+        still_online = {str(entry['user_id']) for entry in leaving} & online
+        if still_online:
+            failures.append(f"Disconnected users still online: {sorted(still_online)}")
+        if len(online) != len(clients) - len(leaving):
+            failures.append(f"Expected {len(clients) - len(leaving)} users online, found {len(online)}")
+
+        # One user on two nodes stays online until the last device disconnects
+        if len(ports) > 1:
+            user_id = USER_ID_BASE - 1
+            devices = [await self.connect(port, user_id, [], deadline) for port in ports[:2]]
+            await devices[0].disconnect()
+            await asyncio.sleep(0.5)
+            if not online_users([user_id]):
+                failures.append('Multi-device user went offline while a second device was connected')
+            await devices[1].disconnect()
+            await asyncio.sleep(0.5)
+            if online_users([user_id]):
+                failures.append('Multi-device user still online after all devices disconnected')
+
+        for entry in clients:
+            if entry['client'].connected:
+                await entry['client'].disconnect()
+        return failures
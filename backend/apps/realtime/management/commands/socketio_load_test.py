@@ -0,0 +1,376 @@
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from pathlib import Path
+
+import aiohttp
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.realtime.rooms import category_room, product_room, rooms_for_product_data
+from config.socketio_config import get_external_emitter, user_room
+from .realtime_deploy_benchmark import percentile, resource_usage
+from .socketio_cluster_check import USER_ID_BASE, create_check_users, delete_check_users, make_token
+
+# Synthetic product ids start here so real product rooms never receive load-test events
+PRODUCT_ID_BASE = 20_000_000
+# Latencies kept per client process; beyond this a uniform sample is kept
+LATENCY_SAMPLE_SIZE = 200_000
+EVENT_KINDS = ('product', 'order', 'sale', 'user')
+
+
+def zipf_weights(count, exponent):
+    """Popularity weights for ranks 1..count: a few hot items and a long tail"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def product_data(product_id, categories):
+    """product_updated payload of a synthetic product; its category and seller derive from the id"""
+    return {'id': product_id, 'category': f'load-{product_id % categories}', 'seller_id': PRODUCT_ID_BASE + product_id % 97}
+
+
+def plan_clients(options):
+    """Deterministic subscriptions for every client: (index, user_id, subscribe messages, rooms)"""
+    rng = random.Random(options['seed'])
+    product_ids = list(range(PRODUCT_ID_BASE, PRODUCT_ID_BASE + options['products']))
+    weights = zipf_weights(len(product_ids), options['zipf'])
+    plans = []
+    for index in range(options['clients']):
+        user_id = USER_ID_BASE + index
+        rooms = {user_room(user_id), f'user_orders_{user_id}'}
+        messages = [['subscribe_orders', {}]]
+        products = set(rng.choices(product_ids, cum_weights=weights, k=options['products_per_client']))
+        categories = [f'load-{rng.randrange(options["categories"])}'] if rng.random() < options['category_ratio'] else []
+        messages.append(['subscribe_products', {'product_ids': sorted(products), 'categories': categories}])
+        rooms |= {product_room(product_id) for product_id in products}
+        rooms |= {category_room(category) for category in categories}
+        if rng.random() < options['seller_ratio']:
+            messages.append(['subscribe_seller_sales', {}])
+            rooms.add(f'seller_sales_{user_id}')
+        plans.append((index, user_id, messages, rooms))
+    return plans
+
+
+def run_client_process(worker, plans, urls, connect_rate, results, stop):
+    """Entry point of one client process; reports readiness and then its results to the parent"""
+    asyncio.run(ClientWorker(worker, plans, urls, connect_rate, results, stop).run())
+
+
+class ClientWorker:
+    """Raw Engine.IO websocket clients, cheap enough to run thousands per process"""
+
+    def __init__(self, worker, plans, urls, connect_rate, results, stop):
+        self.worker = worker
+        self.plans = plans
+        self.urls = urls
+        self.connect_rate = connect_rate
+        self.results = results
+        self.stop = stop
+        self.connected = []
+        self.connect_seconds = []
+        self.failures = Counter()
+        self.received = Counter()
+        self.duplicates = 0
+        self.latencies = []
+        self.seen = 0
+        self.rng = random.Random(worker)
+
+    def record_latency(self, latency):
+        # Reservoir sampling keeps memory flat however many events arrive
+        self.seen += 1
+        if len(self.latencies) < LATENCY_SAMPLE_SIZE:
+            self.latencies.append(latency)
+        else:
+            slot = self.rng.randrange(self.seen)
+            if slot < LATENCY_SAMPLE_SIZE:
+                self.latencies[slot] = latency
+
+    async def client(self, session, index, user_id, messages, url):
+        ws_url = url.replace('http', 'ws', 1) + '/socket.io/?EIO=4&transport=websocket'
+        started = time.perf_counter()
+        seen = set()
+        try:
+            async with session.ws_connect(ws_url, max_msg_size=0, heartbeat=None) as ws:
+                await ws.receive()  # Engine.IO open
+                await ws.send_str('40' + json.dumps({'token': make_token(user_id)}))
+                reply = await ws.receive()
+                if not str(reply.data).startswith('40'):
+                    self.failures['rejected'] += 1
+                    return
+                for message in messages:
+                    await ws.send_str('42' + json.dumps(message))
+                self.connect_seconds.append(time.perf_counter() - started)
+                self.connected.append(index)
+                async for message in ws:
+                    if message.data == '2':
+                        await ws.send_str('3')
+                        continue
+                    if not isinstance(message.data, str) or not message.data.startswith('42'):
+                        continue
+                    event = json.loads(message.data[2:])
+                    data = event[1] if len(event) > 1 else None
+                    if not isinstance(data, dict) or 'lt_seq' not in data:
+                        continue
+                    if data['lt_seq'] in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(data['lt_seq'])
+                    self.received[data['lt_seq']] += 1
+                    self.record_latency(time.time() - data['sent_at'])
+                self.failures['closed_by_server'] += 1
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            self.failures[type(e).__name__] += 1
+
+    async def run(self):
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = []
+            for position, (index, user_id, messages, _) in enumerate(self.plans):
+                tasks.append(asyncio.create_task(self.client(session, index, user_id, messages, self.urls[index % len(self.urls)])))
+                if self.connect_rate:
+                    await asyncio.sleep(1 / self.connect_rate)
+            deadline = time.monotonic() + 120
+            while len(self.connected) + sum(self.failures.values()) < len(self.plans) and time.monotonic() < deadline:
+                await asyncio.sleep(0.2)
+            self.results.put(('ready', self.worker, list(self.connected), sorted(self.connect_seconds)))
+            while not self.stop.is_set():
+                await asyncio.sleep(0.2)
+            for task in tasks:
+                task.cancel()
+        self.results.put(('done', self.worker, {
+            'received': dict(self.received),
+            'duplicates': self.duplicates,
+            'failures': dict(self.failures),
+            'latencies': self.latencies,
+            'latency_count': self.seen,
+        }))
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test Socket.io fan-out: many authenticated clients in a realistic mix of rooms, emits at a fixed '
+        'rate through Redis, reporting delivery latency percentiles, memory per connection and dropped messages'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', help='Socket.io node(s) to test; default: start --nodes locally')
+        parser.add_argument('--nodes', type=int, default=1)
+        parser.add_argument('--base-port', type=int, default=8401)
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+        parser.add_argument('--connect-rate', type=float, default=500, help='New connections per second, in total')
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products-per-client', type=int, default=5)
+        parser.add_argument('--zipf', type=float, default=1.1, help='Skew of product popularity')
+        parser.add_argument('--category-ratio', type=float, default=0.2, help='Clients that also follow a category')
+        parser.add_argument('--seller-ratio', type=float, default=0.05, help='Clients that follow their sales')
+        parser.add_argument('--rate', type=float, default=200, help='Emits per second')
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--mix', default='product:0.7,order:0.2,sale:0.05,user:0.05', help='Share of each event kind')
+        parser.add_argument('--raw-events', action='store_true',
+                            help='Use loadtest_* event names so send-queue coalescing does not count as loss')
+        parser.add_argument('--settle', type=float, default=5, help='Seconds to wait for deliveries after the last emit')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        plans = plan_clients(options)
+        user_ids = [plan[1] for plan in plans]
+        self.stdout.write(f"Creating {len(user_ids)} load-test users...")
+        create_check_users(user_ids)
+        processes = []
+        try:
+            urls = options['url']
+            if not urls:
+                urls = [f"http://127.0.0.1:{options['base_port'] + node}" for node in range(options['nodes'])]
+                processes = [
+                    subprocess.Popen(
+                        [sys.executable, str(Path(settings.BASE_DIR) / 'manage_socketio.py'), '--host', '127.0.0.1', '--port', url.rsplit(':', 1)[1]],
+                        stdout=subprocess.DEVNULL,
+                    )
+                    for url in urls
+                ]
+            report = self.run_load(plans, urls, processes, mix, options)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait(timeout=15)
+            delete_check_users(user_ids)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            kind, _, share = part.partition(':')
+            if kind not in EVENT_KINDS:
+                raise CommandError(f"Unknown event kind '{kind}'; use {', '.join(EVENT_KINDS)}")
+            mix[kind] = float(share)
+        return mix
+
+    def wait_ready(self, urls, processes):
+        deadline = time.monotonic() + 60
+        for index, url in enumerate(urls):
+            while True:
+                try:
+                    with urllib.request.urlopen(f'{url}/realtime/metrics', timeout=2):
+                        break
+                except OSError:
+                    # The node's own traceback is on stderr, which it shares with this command
+                    if index < len(processes) and processes[index].poll() is not None:
+                        raise CommandError(f'Socket.io node for {url} exited with code {processes[index].returncode}')
+                    if time.monotonic() > deadline:
+                        raise CommandError(f'No Socket.io node answering at {url}')
+                    time.sleep(0.5)
+
+    def node_metrics(self, urls):
+        metrics = {}
+        for url in urls:
+            try:
+                with urllib.request.urlopen(f'{url}/realtime/metrics', timeout=5) as response:
+                    metrics[url] = json.loads(response.read())
+            except OSError as e:
+                metrics[url] = {'error': str(e)}
+        return metrics
+
+    def run_load(self, plans, urls, processes, mix, options):
+        self.wait_ready(urls, processes)
+        pids = [process.pid for process in processes]
+        idle = resource_usage(pids) if pids else None
+
+        # Client processes are forked; they must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results, stop = context.Queue(), context.Event()
+        workers = options['client_processes']
+        rate_per_worker = options['connect_rate'] / workers if options['connect_rate'] else 0
+        children = [
+            context.Process(target=run_client_process, args=(worker, plans[worker::workers], urls, rate_per_worker, results, stop), daemon=True)
+            for worker in range(workers)
+        ]
+        for child in children:
+            child.start()
+
+        connected, connect_seconds = set(), []
+        for _ in children:
+            _, _, indices, seconds = results.get(timeout=300)
+            connected.update(indices)
+            connect_seconds.extend(seconds)
+        self.stdout.write(f"{len(connected)}/{len(plans)} clients connected")
+        loaded = resource_usage(pids) if pids else None
+
+        room_members = {}
+        for index, _, _, rooms in plans:
+            if index in connected:
+                for room in rooms:
+                    room_members.setdefault(room, set()).add(index)
+
+        try:
+            expected, emitted = self.drive(plans, room_members, mix, options)
+            time.sleep(options['settle'])
+        finally:
+            stop.set()
+        reports = []
+        for _ in children:
+            try:
+                reports.append(results.get(timeout=60)[2])
+            except queue.Empty:
+                break
+        for child in children:
+            child.join(timeout=10)
+
+        received, latencies, failures = Counter(), [], Counter()
+        duplicates = latency_count = 0
+        for report in reports:
+            received.update({int(seq): count for seq, count in report['received'].items()})
+            latencies.extend(report['latencies'])
+            failures.update(report['failures'])
+            duplicates += report['duplicates']
+            latency_count += report['latency_count']
+        total_expected = sum(expected.values())
+        total_received = sum(min(received[seq], count) for seq, count in expected.items())
+        rss_per_connection = None
+        if idle and loaded and connected:
+            rss_per_connection = round((loaded['rss_mb'] - idle['rss_mb']) * 1024 / len(connected), 1)
+
+        return {
+            'clients': {
+                'planned': len(plans),
+                'connected': len(connected),
+                'connect_p50_ms': round(percentile(connect_seconds, 0.5) * 1000, 1) if connect_seconds else None,
+                'connect_p99_ms': round(percentile(connect_seconds, 0.99) * 1000, 1) if connect_seconds else None,
+                'failures': dict(failures),
+            },
+            'emits': {'sent': emitted, 'rate': options['rate'], 'mix': mix},
+            'deliveries': {
+                'expected': total_expected,
+                'received': total_received,
+                'dropped': total_expected - total_received,
+                'drop_rate': round((total_expected - total_received) / total_expected, 6) if total_expected else 0,
+                'duplicates': duplicates,
+            },
+            'latency_ms': {
+                'samples': len(latencies),
+                'deliveries_timed': latency_count,
+                **{
+                    label: round(percentile(latencies, fraction) * 1000, 2) if latencies else None
+                    for label, fraction in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999), ('max', 1.0)]
+                },
+            },
+            'memory': {
+                'nodes_idle': idle,
+                'nodes_loaded': loaded,
+                'rss_kb_per_connection': rss_per_connection,
+            },
+            'node_metrics': self.node_metrics(urls),
+        }
+
+    def drive(self, plans, room_members, mix, options):
+        """Emit at the configured rate; returns expected recipients per event and the number emitted"""
+        rng = random.Random(options['seed'] + 1)
+        emitter = get_external_emitter()
+        weights = zipf_weights(options['products'], options['zipf'])
+        product_ids = list(range(PRODUCT_ID_BASE, PRODUCT_ID_BASE + options['products']))
+        user_ids = [plan[1] for plan in plans]
+        sellers = [plan[1] for plan in plans if any(message[0] == 'subscribe_seller_sales' for message in plan[2])] or user_ids
+        kinds, shares = list(mix), list(mix.values())
+        prefix = 'loadtest_' if options['raw_events'] else ''
+        names = {'product': 'product_updated', 'order': 'order_updated', 'sale': 'new_sale', 'user': 'notification'}
+
+        expected = {}
+        total = int(options['rate'] * options['duration'])
+        started = time.perf_counter()
+        for seq in range(total):
+            delay = started + seq / options['rate'] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind = rng.choices(kinds, weights=shares)[0]
+            if kind == 'product':
+                product_id = rng.choices(product_ids, cum_weights=weights)[0]
+                payload = {**product_data(product_id, options['categories']), 'stock': rng.randrange(100)}
+                rooms = rooms_for_product_data(payload)
+            elif kind == 'order':
+                rooms = [f'user_orders_{rng.choice(user_ids)}']
+                payload = {'id': seq, 'status': 'paid'}
+            elif kind == 'sale':
+                rooms = [f'seller_sales_{rng.choice(sellers)}']
+                payload = {'id': seq, 'status': 'pending'}
+            else:
+                rooms = [user_room(rng.choice(user_ids))]
+                payload = {'id': seq}
+            recipients = set().union(*(room_members.get(room, set()) for room in rooms))
+            expected[seq] = len(recipients)
+            payload.update({'lt_seq': seq, 'sent_at': time.time()})
+            emitter.emit(prefix + names[kind], payload, room=rooms if len(rooms) > 1 else rooms[0])
+        return expected, total
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import aiohttp
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.realtime.rooms import product_room
+from config.socketio_config import get_external_emitter
+from .socketio_cluster_check import USER_ID_BASE, create_check_users, delete_check_users, make_token
+
+LOAD_TEST_PRODUCT_ID = 10_000_001
+
+
+def rss_mb(pid):
+    """Resident memory of a local process, from /proc."""
+    try:
+        for line in Path(f'/proc/{pid}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Flood one product room with events while many clients read slowly or not at all, and report backpressure'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help='Socket.io node to test (default: start one locally)')
+        parser.add_argument('--port', type=int, default=8201, help='Port for the locally started node')
+        parser.add_argument('--clients', type=int, default=2000)
+        parser.add_argument('--slow-ratio', type=float, default=0.5, help='Fraction of clients that stop reading')
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--rate', type=float, default=500, help='Events per second')
+        parser.add_argument('--payload-bytes', type=int, default=2000)
+        parser.add_argument('--event', default='order_updated', help='Event name; its SEND_POLICIES entry applies')
+        parser.add_argument('--settle', type=float, default=10.0, help='Seconds to wait after the burst')
+
+    def handle(self, *args, **options):
+        process = None
+        url = options['url']
+        user_ids = [USER_ID_BASE + index for index in range(options['clients'])]
+        create_check_users(user_ids)
+        if url is None:
+            url = f"http://127.0.0.1:{options['port']}"
+            process = subprocess.Popen(
+                [sys.executable, str(Path(settings.BASE_DIR) / 'manage_socketio.py'), '--host', '127.0.0.1', '--port', str(options['port'])],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        try:
+            report = asyncio.run(self.run_load(url, process.pid if process else None, options))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+            delete_check_users(user_ids)
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    async def client(self, session, url, user_id, slow, received, ready):
+        ws_url = url.replace('http', 'ws', 1) + '/socket.io/?EIO=4&transport=websocket'
+        try:
+            async with session.ws_connect(ws_url, max_msg_size=0) as ws:
+                await ws.receive()  # Engine.IO open
+                await ws.send_str('40' + json.dumps({'token': make_token(user_id)}))
+                await ws.receive()  # namespace connect
+                await ws.send_str('42' + json.dumps(['subscribe_products', {'product_ids': [LOAD_TEST_PRODUCT_ID]}]))
+                ready.append(user_id)
+                if slow:
+                    # Never read again; the server has to absorb or shed what it sends us
+                    await asyncio.sleep(3600)
+                    return
+                async for message in ws:
+                    if message.data == '2':
+                        await ws.send_str('3')
+                    elif isinstance(message.data, str) and message.data.startswith('42'):
+                        received[user_id] = received.get(user_id, 0) + 1
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+
+    async def run_load(self, url, pid, options):
+        received, ready = {}, []
+        slow_every = int(1 / options['slow_ratio']) if options['slow_ratio'] > 0 else 0
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    async with session.get(f'{url}/realtime/metrics') as response:
+                        if response.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise CommandError(f'No Socket.io node answering at {url}')
+                await asyncio.sleep(0.5)
+
+            tasks = []
+            for index in range(options['clients']):
+                slow = bool(slow_every) and index % slow_every == 0
+                tasks.append(asyncio.create_task(self.client(session, url, USER_ID_BASE + index, slow, received, ready)))
+            while len(ready) < options['clients'] and time.monotonic() < deadline + 30:
+                await asyncio.sleep(0.2)
+            baseline_rss = rss_mb(pid) if pid else None
+
+            emitter = get_external_emitter()
+            room = product_room(LOAD_TEST_PRODUCT_ID)
+            blob = 'x' * options['payload_bytes']
+            peak_rss = baseline_rss
+            started = time.perf_counter()
+            for index in range(options['events']):
+                delay = started + index / options['rate'] - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Alternate object ids so coalescing policies have something to merge
+                await asyncio.to_thread(emitter.emit, options['event'], {'id': index % 20, 'seq': index, 'blob': blob}, room=room)
+                if pid and index % 100 == 0:
+                    peak_rss = max(filter(None, [peak_rss, rss_mb(pid)]), default=None)
+
+            settle_until = time.monotonic() + options['settle']
+            while time.monotonic() < settle_until:
+                if pid:
+                    peak_rss = max(filter(None, [peak_rss, rss_mb(pid)]), default=None)
+                await asyncio.sleep(0.5)
+
+            async with session.get(f'{url}/realtime/metrics') as response:
+                metrics = await response.json()
+            for task in tasks:
+                task.cancel()
+
+        readers = [received.get(USER_ID_BASE + index, 0) for index in range(options['clients'])
+                   if not (slow_every and index % slow_every == 0)]
+        return {
+            'clients_connected': len(ready),
+            'events_emitted': options['events'],
+            'reader_events_min': min(readers, default=0),
+            'reader_events_avg': round(sum(readers) / len(readers), 1) if readers else 0,
+            'node_rss_mb': {'baseline': baseline_rss, 'peak': peak_rss},
+            'node_metrics': metrics,
+        }
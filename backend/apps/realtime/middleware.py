@@ -0,0 +1,43 @@
+from urllib.parse import parse_qs
+
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .auth import AuthenticationError
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Sets ``scope['user']`` for Channels websockets from an access token.
+
+    Browsers cannot set headers on websockets, so the token is read from
+    ``?token=`` and otherwise from a Bearer Authorization header. Tokens go
+    through the Socket.io connect authenticator, sharing its decode cache and
+    batched user checks. Authenticated users are stateless TokenUsers;
+    everyone else is anonymous.
+    """
+
+    def __init__(self, inner, authenticator):
+        super().__init__(inner)
+        self.authenticator = authenticator
+
+    def get_token(self, scope):
+        token = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token', [None])[0]
+        if token:
+            return token
+        header = dict(scope.get('headers', [])).get(b'authorization', b'').decode('latin-1')
+        return header[7:] if header.startswith('Bearer ') else None
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'] = AnonymousUser()
+        token = self.get_token(scope)
+        if token:
+            try:
+                user_id, _ = await self.authenticator.authenticate(token)
+                scope['user'] = TokenUser({api_settings.USER_ID_CLAIM: user_id})
+            except AuthenticationError:
+                pass
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='realtimeevent',
+            name='channel_group',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='realtimeevent',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='realtimeevent',
+            name='dispatched_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='realtimeevent',
+            name='room',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='realtimeevent',
+            index=models.Index(condition=models.Q(('dispatched_at__isnull', True)), fields=['id'], name='realtime_event_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='realtimeevent',
+            index=models.Index(fields=['dispatched_at'], name='realtime_event_dispatched_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realtime', '0002_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='realtimeevent',
+            name='channel_group',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='realtimeevent',
+            name='room',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -1,9 +1,22 @@
 from django.db import models
 
 class RealtimeEvent(models.Model):
+    """Outbox row for a realtime event, written in the same transaction as the change it describes"""
     event_type = models.CharField(max_length=50)
     data = models.JSONField()
     timestamp = models.DateTimeField(auto_now_add=True)
+
+    # Fan-out targets: comma-separated Socket.io rooms and Channels groups
+    room = models.CharField(max_length=255, blank=True)
+    channel_group = models.CharField(max_length=255, blank=True)
+
+    # Set when a dispatcher takes the row; an expired claim is picked up again
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         db_table = 'realtime_event'
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(dispatched_at__isnull=True), name='realtime_event_pending_idx'),
+            models.Index(fields=['dispatched_at'], name='realtime_event_dispatched_idx'),
+        ]
@@ -0,0 +1,102 @@
+"""
+Transactional outbox for realtime events.
+
+Signals call ``enqueue`` inside the request transaction, so an event row is
+committed together with the change it describes and disappears with it on
+rollback. Nothing is emitted from the request thread: the dispatcher running
+in the Socket.io process drains pending rows in batches and fans them out to
+Socket.io rooms and Channels groups.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RealtimeEvent
+
+logger = logging.getLogger(__name__)
+
+# Channels consumer handler for each event type sent to a group
+CHANNELS_HANDLERS = {
+    'order_updated': 'order.update',
+    'product_updated': 'product.update',
+}
+
+
+def outbox_setting(name: str, default: Any) -> Any:
+    return settings.REALTIME_OUTBOX.get(name, default)
+
+
+def _join(targets: Union[str, List[str]]) -> str:
+    return targets if isinstance(targets, str) else ','.join(targets)
+
+
+def split_targets(value: str) -> List[str]:
+    return [target for target in value.split(',') if target]
+
+
+def enqueue(event_type: str, data: Dict[str, Any], room: Union[str, List[str]] = '',
+            channel_group: Union[str, List[str]] = '') -> RealtimeEvent:
+    """
+    Record an event to be delivered once the current transaction commits.
+
+    Args:
+        event_type: Socket.io event name
+        data: JSON-serializable payload
+        room: Socket.io room, or list of rooms, to emit to
+        channel_group: Channels group, or list of groups, to send to (optional)
+    """
+    return RealtimeEvent.objects.create(
+        event_type=event_type, data=data, room=_join(room), channel_group=_join(channel_group),
+    )
+
+
+def claim_batch(batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Claim the oldest pending events for this dispatcher.
+
+    Rows locked by another dispatcher are skipped, and a claim older than
+    LEASE_SECONDS is treated as abandoned, so events from a crashed process
+    are delivered again (at least once).
+
+    Returns:
+        list: Event dicts in id order
+    """
+    batch_size = batch_size or outbox_setting('BATCH_SIZE', 500)
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=outbox_setting('LEASE_SECONDS', 30))
+    with transaction.atomic():
+        ids = list(
+            RealtimeEvent.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=lease_expired))
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        RealtimeEvent.objects.filter(id__in=ids).update(claimed_at=now)
+    return list(
+        RealtimeEvent.objects.filter(id__in=ids)
+        .order_by('id')
+        .values('id', 'event_type', 'data', 'room', 'channel_group')
+    )
+
+
+def mark_dispatched(ids: List[int]) -> None:
+    if ids:
+        RealtimeEvent.objects.filter(id__in=ids).update(dispatched_at=timezone.now())
+
+
+def purge_dispatched(hours: Optional[int] = None) -> int:
+    """Delete delivered events older than RETENTION_HOURS; returns the number removed."""
+    hours = hours or outbox_setting('RETENTION_HOURS', 24)
+    deleted, _ = RealtimeEvent.objects.filter(
+        dispatched_at__lt=timezone.now() - timedelta(hours=hours)
+    ).delete()
+    return deleted
@@ -0,0 +1,179 @@
+"""
+Multi-device online presence shared by every Socket.io node through Redis.
+
+A user is online while at least one of their sockets is alive on any node.
+Redis holds:
+
+- ``presence:sids:<user>``: hash of the user's sids to connection metadata
+  (node, user agent, remote address, connected_at)
+- ``presence:online``: sorted set of user ids scored by last heartbeat, so
+  single and bulk lookups are O(1) per user
+- ``presence:nodes``: sorted set of nodes scored by last heartbeat, and
+  ``presence:node:<node>``: hash of sid to user for each node's sockets
+
+Each node refreshes all of its users with a few chunked ZADDs per heartbeat
+rather than one write per socket. Removing a sid and checking whether it was
+the user's last one is a single Lua call, so tabs closing on different nodes
+cannot race each other into a wrong offline state. A node that dies without
+cleaning up stops heartbeating; the periodic sweep then removes its sids and
+takes users offline who have no other devices.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Set
+
+from django.conf import settings
+
+from .redis_pool import get_async_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_PREFIX = 'chainmart:presence'
+ONLINE_KEY = f'{PRESENCE_PREFIX}:online'
+NODES_KEY = f'{PRESENCE_PREFIX}:nodes'
+SWEEP_LOCK_KEY = f'{PRESENCE_PREFIX}:sweep_lock'
+HEARTBEAT_CHUNK_SIZE = 1000
+
+# KEYS: user sids hash, node sids hash, online zset; ARGV: sid, user id
+REMOVE_SID_SCRIPT = """
+redis.call('HDEL', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+local remaining = redis.call('HLEN', KEYS[1])
+if remaining == 0 then
+    redis.call('ZREM', KEYS[3], ARGV[2])
+end
+return remaining
+"""
+
+
+def sids_key(user_id) -> str:
+    return f"{PRESENCE_PREFIX}:sids:{user_id}"
+
+
+def node_key(node: str) -> str:
+    return f"{PRESENCE_PREFIX}:node:{node}"
+
+
+def node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def presence_ttl() -> int:
+    return settings.SOCKETIO_CONFIG.get('PRESENCE_TTL', 60)
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PresenceTracker:
+    """Presence for the connections held by this Socket.io node"""
+
+    def __init__(self, redis_url: str = None, ttl: int = None, heartbeat_interval: int = None):
+        config = settings.SOCKETIO_CONFIG
+        self.redis = get_async_redis(redis_url)
+        self.ttl = ttl or presence_ttl()
+        self.heartbeat_interval = heartbeat_interval or config.get('HEARTBEAT_INTERVAL', 20)
+        self.sweep_interval = config.get('PRESENCE_SWEEP_INTERVAL', 60)
+        self.node = node_id()
+        self.local: Dict[str, Set[str]] = defaultdict(set)
+        self._remove_sid = self.redis.register_script(REMOVE_SID_SCRIPT)
+        self._running = False
+
+    async def connected(self, user_id, sid: str, metadata: Dict[str, Any] = None) -> None:
+        user_id = str(user_id)
+        self.local[user_id].add(sid)
+        info = {'node': self.node, 'connected_at': int(time.time()), **(metadata or {})}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(sids_key(user_id), sid, json.dumps(info))
+            pipe.hset(node_key(self.node), sid, user_id)
+            pipe.zadd(ONLINE_KEY, {user_id: time.time()})
+            pipe.zadd(NODES_KEY, {self.node: time.time()})
+            await pipe.execute()
+
+    async def disconnected(self, user_id, sid: str) -> int:
+        """Drop one socket; returns how many sockets the user still has on any node."""
+        user_id = str(user_id)
+        sids = self.local.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.local[user_id]
+        return await self._remove_sid(keys=[sids_key(user_id), node_key(self.node), ONLINE_KEY], args=[sid, user_id])
+
+    async def heartbeat(self) -> None:
+        """Mark this node and all of its users as alive in a handful of round trips."""
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(NODES_KEY, {self.node: now})
+            for chunk in _chunks(list(self.local), HEARTBEAT_CHUNK_SIZE):
+                pipe.zadd(ONLINE_KEY, {user_id: now for user_id in chunk})
+            await pipe.execute()
+
+    async def sweep(self) -> int:
+        """
+        Remove sockets of nodes that stopped heartbeating.
+
+        Only one node sweeps at a time. Returns the number of users taken offline.
+        """
+        if not await self.redis.set(SWEEP_LOCK_KEY, self.node, nx=True, ex=self.sweep_interval):
+            return 0
+        cutoff = time.time() - self.ttl
+        dead_nodes = await self.redis.zrangebyscore(NODES_KEY, '-inf', cutoff)
+        offline = 0
+        for node in dead_nodes:
+            async for sid, user_id in self.redis.hscan_iter(node_key(node), count=HEARTBEAT_CHUNK_SIZE):
+                remaining = await self._remove_sid(keys=[sids_key(user_id), node_key(node), ONLINE_KEY], args=[sid, user_id])
+                if remaining == 0:
+                    offline += 1
+            await self.redis.delete(node_key(node))
+            await self.redis.zrem(NODES_KEY, node)
+            logger.info(f"Swept presence of dead Socket.io node {node}")
+        return offline
+
+    async def run(self) -> None:
+        self._running = True
+        last_sweep = 0.0
+        while self._running:
+            try:
+                await self.heartbeat()
+                if time.monotonic() - last_sweep >= self.sweep_interval:
+                    last_sweep = time.monotonic()
+                    await self.sweep()
+            except Exception as e:
+                logger.error(f"Presence heartbeat failed: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def stop(self) -> None:
+        self._running = False
+
+
+def online_users(user_ids: Iterable) -> Set[str]:
+    """Subset of user_ids with a live socket on any node, in one ZMSCORE."""
+    user_ids = [str(user_id) for user_id in user_ids]
+    if not user_ids:
+        return set()
+    cutoff = time.time() - presence_ttl()
+    scores = get_sync_redis().zmscore(ONLINE_KEY, user_ids)
+    return {user_id for user_id, score in zip(user_ids, scores) if score is not None and score >= cutoff}
+
+
+def is_online(user_id) -> bool:
+    return str(user_id) in online_users([user_id])
+
+
+def online_count() -> int:
+    return get_sync_redis().zcount(ONLINE_KEY, time.time() - presence_ttl(), '+inf')
+
+
+def user_devices(user_id) -> List[Dict[str, Any]]:
+    """Connection metadata for each of the user's sockets."""
+    raw = get_sync_redis().hgetall(sids_key(user_id))
+    return [{'sid': sid, **json.loads(info)} for sid, info in raw.items()]
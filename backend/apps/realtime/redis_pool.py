@@ -0,0 +1,35 @@
+"""
+Redis clients shared by the realtime components of one process.
+
+Presence, replay streams and anything else on the Socket.io side draw their
+connections from one pool per Redis URL instead of opening a pool each. The
+sync clients serve Django views reading the same keys, which live in the
+Socket.io Redis rather than the cache's.
+"""
+
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+
+_clients = {}
+_sync_clients = {}
+
+
+def get_async_redis(redis_url: Optional[str] = None) -> aioredis.Redis:
+    """Shared client (decoding responses to str) for a Redis URL, SOCKETIO_CONFIG['REDIS_URL'] by default"""
+    redis_url = redis_url or settings.SOCKETIO_CONFIG['REDIS_URL']
+    client = _clients.get(redis_url)
+    if client is None:
+        client = _clients[redis_url] = aioredis.from_url(redis_url, decode_responses=True)
+    return client
+
+
+def get_sync_redis(redis_url: Optional[str] = None) -> redis.Redis:
+    """Blocking counterpart of get_async_redis, for reads from Django views"""
+    redis_url = redis_url or settings.SOCKETIO_CONFIG['REDIS_URL']
+    client = _sync_clients.get(redis_url)
+    if client is None:
+        client = _sync_clients[redis_url] = redis.Redis.from_url(redis_url, decode_responses=True)
+    return client
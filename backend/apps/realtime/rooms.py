@@ -0,0 +1,69 @@
+"""
+Room names for fine-grained product subscriptions.
+
+A product change is sent to its product room, its category room and its
+seller's room at once; Socket.io de-duplicates sockets that are in several
+of them, so each client gets the event once.
+"""
+
+import re
+from typing import Any, Dict, List
+
+MAX_SUBSCRIPTIONS = 200
+
+# Public events are also sequenced on one catalog-wide channel, which feeds the SSE stream
+CATALOG_CHANNEL = 'catalog'
+PUBLIC_CATALOG_EVENTS = {'product_updated'}
+_CATEGORY_RE = re.compile(r'^[a-z0-9_-]{1,50}$')
+
+
+def user_room(user_id) -> str:
+    """Personal room joined by every socket of a user, on any node"""
+    return f'user_{user_id}'
+
+
+def product_room(product_id) -> str:
+    return f'product_{product_id}'
+
+
+def category_room(category: str) -> str:
+    return f'category_{category}'
+
+
+def seller_products_room(seller_id) -> str:
+    return f'seller_products_{seller_id}'
+
+
+def rooms_for_product(product) -> List[str]:
+    return [product_room(product.id), category_room(product.category), seller_products_room(product.seller_id)]
+
+
+def rooms_for_product_data(data: Dict[str, Any]) -> List[str]:
+    """Rooms of a product_updated payload"""
+    return [product_room(data.get('id')), category_room(data.get('category')), seller_products_room(data.get('seller_id'))]
+
+
+def subscription_rooms(data: Dict[str, Any]) -> List[str]:
+    """
+    Rooms for a subscribe request of the form
+    ``{"product_ids": [...], "categories": [...], "seller_ids": [...]}``.
+
+    Invalid entries are ignored.
+
+    Raises:
+        ValueError: More than MAX_SUBSCRIPTIONS rooms were requested
+    """
+    if not isinstance(data, dict):
+        return []
+
+    def values(key):
+        items = data.get(key) or []
+        return items if isinstance(items, list) else []
+
+    rooms = [product_room(int(pk)) for pk in values('product_ids') if str(pk).isdigit()]
+    rooms += [category_room(category) for category in values('categories') if isinstance(category, str) and _CATEGORY_RE.match(category)]
+    rooms += [seller_products_room(int(pk)) for pk in values('seller_ids') if str(pk).isdigit()]
+    rooms = list(dict.fromkeys(rooms))
+    if len(rooms) > MAX_SUBSCRIPTIONS:
+        raise ValueError(f'At most {MAX_SUBSCRIPTIONS} product subscriptions per connection')
+    return rooms
@@ -0,0 +1,170 @@
+"""
+Server-Sent Events feed of public catalog updates.
+
+The outbox dispatcher sequences every public event (PUBLIC_CATALOG_EVENTS)
+on the ``catalog`` stream, in the same call that sequences its Socket.io
+rooms. Each process runs one CatalogFeed that reads that stream with a
+blocking XREAD and hands matching events to its SSE clients. Thousands of
+anonymous viewers therefore cost one Redis connection per process, not one
+Socket.io session each.
+
+SSE event ids are catalog sequence numbers. A client that reconnects with
+Last-Event-ID gets the events it missed from the stream buffer, or a
+``resync`` event when they have been trimmed. Heartbeats carry the latest
+catalog id, so clients whose filters rarely match still resume from a recent
+position. A subscriber whose queue overflows is closed and resumes the same
+way.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+from django.conf import settings
+
+from .redis_pool import get_async_redis
+from .rooms import CATALOG_CHANNEL, rooms_for_product_data
+from .streams import get_stream_store, seq_key, stream_key
+
+logger = logging.getLogger(__name__)
+
+XREAD_BLOCK_MS = 5000
+XREAD_COUNT = 500
+
+
+def sse_setting(name: str, default: Any) -> Any:
+    return getattr(settings, 'REALTIME_SSE', {}).get(name, default)
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines += [f'event: {event}', f'data: {json.dumps(data, separators=(",", ":"))}']
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One SSE client: the rooms it follows and its pending events"""
+
+    def __init__(self, rooms: Set[str], max_queue: int):
+        self.rooms = rooms
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def matches(self, data: Dict[str, Any]) -> bool:
+        return any(room in self.rooms for room in rooms_for_product_data(data))
+
+    def offer(self, item) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Closing is cheaper than buffering; the client resumes from its Last-Event-ID
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class CatalogFeed:
+    """Single reader of the catalog stream per process, fanning out to SSE subscribers"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.last_seq = 0
+        self._task = None
+
+    async def subscribe(self, rooms: Set[str]) -> Subscriber:
+        subscriber = Subscriber(rooms, sse_setting('QUEUE_SIZE', 256))
+        if self._task is None or self._task.done():
+            # The start position is fixed before the caller replays, so nothing falls in between
+            self.last_seq = int(await get_async_redis().get(seq_key(CATALOG_CHANNEL)) or 0)
+            self._task = asyncio.create_task(self.run())
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    async def run(self) -> None:
+        redis = get_async_redis()
+        while self.subscribers:
+            try:
+                response = await redis.xread(
+                    {stream_key(CATALOG_CHANNEL): f'{self.last_seq}-0'},
+                    count=XREAD_COUNT,
+                    block=XREAD_BLOCK_MS,
+                )
+            except Exception as e:
+                logger.error(f"Catalog feed read failed: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    seq = int(entry_id.split('-', 1)[0])
+                    self.last_seq = max(self.last_seq, seq)
+                    data = json.loads(fields['d'])
+                    for subscriber in list(self.subscribers):
+                        if subscriber.matches(data):
+                            subscriber.offer((seq, fields['e'], data))
+
+
+_feed = None
+
+
+def get_catalog_feed() -> CatalogFeed:
+    global _feed
+    if _feed is None:
+        _feed = CatalogFeed()
+    return _feed
+
+
+async def catalog_events(rooms: Set[str], last_event_id: Optional[int]):
+    """
+    SSE body for the given rooms.
+
+    Replays events after ``last_event_id`` (or sends ``resync``), then streams
+    live events with heartbeats until MAX_STREAM_SECONDS, so connections behind
+    the CDN are recycled and clients come back with their Last-Event-ID.
+    """
+    feed = get_catalog_feed()
+    subscriber = await feed.subscribe(rooms)
+    heartbeat = sse_setting('HEARTBEAT_SECONDS', 15)
+    loop = asyncio.get_running_loop()
+    closes_at = loop.time() + sse_setting('MAX_STREAM_SECONDS', 300)
+    try:
+        yield f"retry: {sse_setting('RETRY_MS', 3000)}\n\n"
+        sent_seq = 0
+        if last_event_id is not None:
+            replay = await get_stream_store().replay(CATALOG_CHANNEL, last_event_id)
+            if replay.get('resync_required'):
+                yield format_event('resync', {'seq': replay['seq']}, replay['seq'])
+            else:
+                for event in replay['events']:
+                    data = {key: value for key, value in event['data'].items() if key != '_seq'}
+                    if subscriber.matches(data):
+                        yield format_event(event['event'], data, event['seq'])
+            sent_seq = replay['seq']
+
+        while True:
+            remaining = closes_at - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                # An id without data is not dispatched but moves the client's Last-Event-ID
+                # past catalog events that did not match its filters
+                sent_seq = max(sent_seq, feed.last_seq)
+                yield f'id: {sent_seq}\n\n'
+                continue
+            if item is None:
+                return
+            seq, event_type, data = item
+            if seq <= sent_seq:
+                continue
+            sent_seq = seq
+            yield format_event(event_type, data, seq)
+    finally:
+        feed.unsubscribe(subscriber)
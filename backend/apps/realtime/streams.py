@@ -0,0 +1,121 @@
+"""
+Per-channel sequence numbers and bounded replay buffers for realtime events.
+
+Every Socket.io room an outbox event is delivered to is a channel with its
+own monotonic sequence. Delivering an event increments the channel counter
+and appends the payload to a Redis stream whose entry ids are ``<seq>-0``,
+capped at roughly STREAM_MAXLEN entries. This happens for all target
+channels in one Lua call. The live payload carries ``_seq``, a mapping of
+channel to sequence number.
+
+A reconnecting client sends the last sequence it saw per channel. If every
+later event is still buffered, it gets exactly the missed events. If some
+have already been trimmed away (or the channel was reset), it gets a
+resync_required answer and refetches that channel over HTTP.
+"""
+
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .redis_pool import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_PREFIX = 'chainmart:rt'
+
+# KEYS: seq key and stream key for each channel, in pairs
+# ARGV: max length, ttl, event type, JSON payload
+APPEND_SCRIPT = """
+local seqs = {}
+for i = 1, #KEYS, 2 do
+    local seq = redis.call('INCR', KEYS[i])
+    redis.call('XADD', KEYS[i + 1], 'MAXLEN', '~', ARGV[1], seq .. '-0', 'e', ARGV[3], 'd', ARGV[4])
+    redis.call('EXPIRE', KEYS[i], ARGV[2])
+    redis.call('EXPIRE', KEYS[i + 1], ARGV[2])
+    seqs[#seqs + 1] = seq
+end
+return seqs
+"""
+
+_store = None
+
+
+def seq_key(channel: str) -> str:
+    return f"{STREAM_PREFIX}:seq:{channel}"
+
+
+def stream_key(channel: str) -> str:
+    return f"{STREAM_PREFIX}:stream:{channel}"
+
+
+def _seq_from_id(entry_id: str) -> int:
+    return int(entry_id.split('-', 1)[0])
+
+
+class StreamStore:
+    """Sequenced, bounded event history per channel"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        config = settings.REALTIME_OUTBOX
+        self.redis = get_async_redis(redis_url)
+        self.maxlen = config.get('STREAM_MAXLEN', 1000)
+        self.ttl = config.get('STREAM_TTL', 86400)
+        self.max_replay = config.get('MAX_REPLAY', 500)
+        self._append = self.redis.register_script(APPEND_SCRIPT)
+
+    async def append(self, channels: List[str], event_type: str, data: Dict[str, Any]) -> Dict[str, int]:
+        """Sequence an event on each channel; returns {channel: seq}."""
+        if not channels:
+            return {}
+        keys = []
+        for channel in channels:
+            keys += [seq_key(channel), stream_key(channel)]
+        seqs = await self._append(keys=keys, args=[self.maxlen, self.ttl, event_type, json.dumps(data)])
+        return dict(zip(channels, (int(seq) for seq in seqs)))
+
+    async def replay(self, channel: str, after_seq: int) -> Dict[str, Any]:
+        """
+        Events on a channel after ``after_seq``.
+
+        Returns:
+            dict: ``{'channel', 'events': [{'seq', 'event', 'data'}], 'seq'}``, or
+            ``{'channel', 'resync_required': True, 'seq'}`` when the gap is no longer buffered
+        """
+        current = int(await self.redis.get(seq_key(channel)) or 0)
+        if after_seq >= current:
+            if after_seq > current:
+                # Counter was reset (expired or flushed): the client's history is from another epoch
+                return {'channel': channel, 'resync_required': True, 'seq': current}
+            return {'channel': channel, 'events': [], 'seq': current}
+
+        if current - after_seq > self.max_replay:
+            return {'channel': channel, 'resync_required': True, 'seq': current}
+        entries = await self.redis.xrange(stream_key(channel), min=f'{after_seq + 1}-0', max='+', count=self.max_replay)
+        if not entries or _seq_from_id(entries[0][0]) != after_seq + 1:
+            return {'channel': channel, 'resync_required': True, 'seq': current}
+
+        events = [
+            {'seq': _seq_from_id(entry_id), 'event': fields['e'], 'data': {**json.loads(fields['d']), '_seq': {channel: _seq_from_id(entry_id)}}}
+            for entry_id, fields in entries
+        ]
+        return {'channel': channel, 'events': events, 'seq': current}
+
+    async def replay_many(self, positions: Dict[str, Any], allowed: Iterable[str]) -> List[Dict[str, Any]]:
+        """Replay several channels; channels the caller has not joined are skipped."""
+        allowed = set(allowed)
+        results = []
+        for channel, after_seq in positions.items():
+            if channel not in allowed or not isinstance(after_seq, int) or after_seq < 0:
+                continue
+            results.append(await self.replay(channel, after_seq))
+        return results
+
+
+def get_stream_store() -> StreamStore:
+    global _store
+    if _store is None:
+        _store = StreamStore()
+    return _store
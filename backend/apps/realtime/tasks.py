@@ -0,0 +1,8 @@
+from celery import shared_task
+from . import outbox
+
+
+@shared_task
+def purge_dispatched_events():
+    """Remove delivered outbox rows past the retention window"""
+    return outbox.purge_dispatched()
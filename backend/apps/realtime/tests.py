@@ -0,0 +1,513 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest import mock
+
+import fakeredis
+import msgpack
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.products.models import Product
+from apps.users.models import UserProfile
+from . import auth, backpressure, outbox, presence, redis_pool, rooms, sse, streams, wire
+from .dispatcher import OutboxDispatcher
+from .management.commands import socketio_load_test
+from .models import RealtimeEvent
+
+SOCKETIO_REDIS_URL = 'redis://socketio-redis:6379/3'
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://cache-redis:6379/1'}},
+    SOCKETIO_CONFIG={**settings.SOCKETIO_CONFIG, 'REDIS_URL': SOCKETIO_REDIS_URL},
+)
+class PresenceReadTest(SimpleTestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        # Only the Socket.io URL resolves; a read from any other Redis would fail to connect
+        patcher = mock.patch.dict(redis_pool._sync_clients, {
+            SOCKETIO_REDIS_URL: fakeredis.FakeRedis(server=server, decode_responses=True),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        async_redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        patcher = mock.patch.object(presence, 'get_async_redis', return_value=async_redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tracker = presence.PresenceTracker()
+
+    def test_views_read_the_presence_the_tracker_writes(self):
+        asyncio.run(self.tracker.connected(7, 'sid-1', {'user_agent': 'test'}))
+
+        self.assertEqual(presence.online_users([7, 8]), {'7'})
+        self.assertEqual(presence.online_count(), 1)
+        self.assertEqual([device['sid'] for device in presence.user_devices(7)], ['sid-1'])
+
+    def test_last_socket_closing_takes_the_user_offline(self):
+        asyncio.run(self.tracker.connected(7, 'sid-1'))
+        asyncio.run(self.tracker.connected(7, 'sid-2'))
+
+        self.assertEqual(asyncio.run(self.tracker.disconnected(7, 'sid-1')), 1)
+        self.assertTrue(presence.is_online(7))
+        asyncio.run(self.tracker.disconnected(7, 'sid-2'))
+        self.assertFalse(presence.is_online(7))
+
+    def test_a_dead_nodes_sockets_are_swept_by_another_node(self):
+        dead = presence.PresenceTracker()
+        dead.node, self.tracker.node = 'node-a', 'node-b'
+        asyncio.run(dead.connected(7, 'sid-a'))
+        asyncio.run(dead.connected(8, 'sid-a2'))
+        asyncio.run(self.tracker.connected(7, 'sid-b'))
+
+        # node-a stops heartbeating; node-b keeps its users alive past the TTL
+        later = time.time() + presence.presence_ttl() + 1
+        with mock.patch.object(presence.time, 'time', return_value=later):
+            asyncio.run(self.tracker.heartbeat())
+            self.assertEqual(asyncio.run(self.tracker.sweep()), 1)
+            self.assertEqual(presence.online_users([7, 8]), {'7'})
+        self.assertEqual([device['sid'] for device in presence.user_devices(7)], ['sid-b'])
+
+
+class MetricsAccessTest(SimpleTestCase):
+    scope = {'type': 'http', 'path': '/realtime/metrics', 'client': ('127.0.0.1', 50000), 'headers': []}
+
+    def allowed(self, scope):
+        from config.asgi import metrics_allowed
+        return asyncio.run(metrics_allowed(scope))
+
+    def test_loopback_is_not_trusted_by_default(self):
+        with override_settings(SOCKETIO_CONFIG={**settings.SOCKETIO_CONFIG, 'METRICS_ALLOW_LOOPBACK': False}):
+            self.assertFalse(self.allowed(self.scope))
+
+    def test_loopback_without_proxy_headers_when_enabled(self):
+        proxied = {**self.scope, 'headers': [(b'x-forwarded-for', b'203.0.113.9')]}
+        with override_settings(SOCKETIO_CONFIG={**settings.SOCKETIO_CONFIG, 'METRICS_ALLOW_LOOPBACK': True}):
+            self.assertTrue(self.allowed(self.scope))
+            self.assertFalse(self.allowed(proxied))
+
+
+class OutboxTest(TestCase):
+    def enqueue(self, count):
+        return [outbox.enqueue('notification', {'n': n}, room=['user_1', 'user_2']) for n in range(count)]
+
+    def test_events_roll_back_with_the_transaction(self):
+        with transaction.atomic():
+            self.enqueue(1)
+            transaction.set_rollback(True)
+        self.assertEqual(outbox.claim_batch(), [])
+
+    def test_claims_are_ordered_batched_and_not_handed_out_twice(self):
+        events = self.enqueue(3)
+
+        first = outbox.claim_batch(batch_size=2)
+        self.assertEqual([event['id'] for event in first], [events[0].pk, events[1].pk])
+        self.assertEqual(outbox.split_targets(first[0]['room']), ['user_1', 'user_2'])
+        self.assertEqual([event['id'] for event in outbox.claim_batch()], [events[2].pk])
+        self.assertEqual(outbox.claim_batch(), [])
+
+    def test_an_expired_claim_is_delivered_again(self):
+        event, = self.enqueue(1)
+        self.assertEqual(len(outbox.claim_batch()), 1)
+
+        # The dispatcher that claimed it died before marking it dispatched
+        lease = timedelta(seconds=outbox.outbox_setting('LEASE_SECONDS', 30) + 1)
+        RealtimeEvent.objects.filter(pk=event.pk).update(claimed_at=timezone.now() - lease)
+        self.assertEqual([claimed['id'] for claimed in outbox.claim_batch()], [event.pk])
+
+    def test_dispatched_events_are_not_claimed_and_are_purged_later(self):
+        event, = self.enqueue(1)
+        outbox.mark_dispatched([claimed['id'] for claimed in outbox.claim_batch()])
+        RealtimeEvent.objects.filter(pk=event.pk).update(claimed_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(outbox.claim_batch(), [])
+
+        self.assertEqual(outbox.purge_dispatched(), 0)
+        RealtimeEvent.objects.filter(pk=event.pk).update(dispatched_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(outbox.purge_dispatched(), 1)
+
+
+@override_settings(REALTIME_OUTBOX={**settings.REALTIME_OUTBOX, 'STREAM_MAXLEN': 1000, 'MAX_REPLAY': 5})
+class StreamReplayTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(streams, 'get_async_redis', return_value=fakeredis.FakeAsyncRedis(decode_responses=True))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = streams.StreamStore()
+        self.sio = mock.AsyncMock()
+        with mock.patch('apps.realtime.dispatcher.get_channel_layer', return_value=None), \
+                mock.patch('apps.realtime.dispatcher.get_stream_store', return_value=self.store):
+            self.dispatcher = OutboxDispatcher(self.sio)
+
+    def deliver(self, *events):
+        async def run():
+            for event_id, (event_type, room, data) in enumerate(events, 1):
+                await self.dispatcher.deliver({
+                    'id': event_id, 'event_type': event_type, 'data': data, 'room': room, 'channel_group': '',
+                })
+        asyncio.run(run())
+
+    def test_live_events_carry_a_sequence_per_room(self):
+        self.deliver(('notification', 'user_1', {'n': 1}), ('notification', 'user_1,user_2', {'n': 2}))
+
+        self.assertEqual(self.sio.emit.await_args_list[-1].args[1]['_seq'], {'user_1': 2, 'user_2': 1})
+        self.sio.emit.assert_awaited_with('notification', mock.ANY, room=['user_1', 'user_2'])
+
+    def test_reconnecting_client_gets_exactly_what_it_missed(self):
+        self.deliver(*[('notification', 'user_1', {'n': n}) for n in range(1, 5)])
+
+        result = asyncio.run(self.store.replay('user_1', 2))
+        self.assertEqual(result['seq'], 4)
+        self.assertEqual([(event['seq'], event['data']['n']) for event in result['events']], [(3, 3), (4, 4)])
+        self.assertEqual(asyncio.run(self.store.replay('user_1', 4))['events'], [])
+
+    def test_public_product_updates_are_also_sequenced_for_sse(self):
+        self.deliver(('product_updated', 'product_7', {'id': 7}))
+
+        self.assertEqual(self.sio.emit.await_args.args[1]['_seq'], {'product_7': 1, 'catalog': 1})
+        self.assertEqual(len(asyncio.run(self.store.replay('catalog', 0))['events']), 1)
+
+    def test_gaps_that_cannot_be_replayed_ask_for_a_resync(self):
+        self.deliver(*[('notification', 'user_1', {'n': n}) for n in range(1, 8)])
+
+        self.assertTrue(asyncio.run(self.store.replay('user_1', 0))['resync_required'])
+        # A position past the counter comes from before a reset
+        self.assertTrue(asyncio.run(self.store.replay('user_1', 50))['resync_required'])
+
+    def test_only_joined_rooms_are_replayed(self):
+        self.deliver(('notification', 'user_1', {'n': 1}), ('notification', 'user_2', {'n': 2}))
+
+        results = asyncio.run(self.store.replay_many({'user_1': 0, 'user_2': 0, 'user_3': 'x'}, allowed=['user_1']))
+        self.assertEqual([result['channel'] for result in results], ['user_1'])
+
+
+@override_settings(SOCKETIO_CONFIG={**settings.SOCKETIO_CONFIG, 'SEND_QUEUE_DEPTH': 2})
+class SendQueueTest(SimpleTestCase):
+    def entry(self, event, policy):
+        return backpressure.QueuedEvent(event, None, [], policy, None)
+
+    def test_coalesced_events_replace_the_queued_one(self):
+        queue = backpressure.SendQueue()
+        self.assertEqual(queue.push(('product_updated', 1), self.entry('old', 'coalesce'), 2), 'queued')
+        self.assertEqual(queue.push(('product_updated', 1), self.entry('new', 'coalesce'), 2), 'coalesced')
+        self.assertEqual([entry.event for entry in queue.entries.values()], ['new'])
+
+    def test_droppable_events_make_room_before_coalesced_ones(self):
+        queue = backpressure.SendQueue()
+        queue.push('a', self.entry('product_updated', 'coalesce'), 2)
+        queue.push('b', self.entry('typing', 'drop_oldest'), 2)
+        self.assertEqual(queue.push('c', self.entry('notification', 'keep'), 2), 'dropped')
+        self.assertEqual(list(queue.entries), ['a', 'c'])
+        self.assertEqual(queue.push('d', self.entry('notification', 'keep'), 2), 'dropped')
+        self.assertEqual(queue.push('e', self.entry('notification', 'keep'), 2), 'overflow')
+        self.assertEqual(list(queue.entries), ['c', 'd'])
+
+    def test_a_queue_full_of_kept_events_disconnects_the_client(self):
+        manager = backpressure.BoundedDeliveryManager()
+        manager.server = mock.Mock(disconnect=mock.AsyncMock())
+
+        async def run():
+            queue = manager.queues['eio-1'] = backpressure.SendQueue()
+            queue.task = mock.Mock()  # a drain that is stuck on the socket
+            for key in range(3):
+                manager.enqueue('eio-1', 'sid-1', '/', key, self.entry('notification', 'keep'))
+            await asyncio.sleep(0)
+            # Later events for the same connection are discarded until it is gone
+            manager.enqueue('eio-1', 'sid-1', '/', 3, self.entry('notification', 'keep'))
+        asyncio.run(run())
+
+        manager.server.disconnect.assert_awaited_once_with('sid-1', namespace='/')
+        self.assertNotIn('eio-1', manager.queues)
+
+
+class CompactClient:
+    """What a compact-mode client does: keep a snapshot per (event, id) and merge deltas into it"""
+
+    def __init__(self, tables):
+        self.events = {code: name for name, code in tables['events'].items()}
+        self.fields = {code: name for name, code in tables['fields'].items()}
+        self.snapshots = {}
+
+    def receive(self, message):
+        received = []
+        for frame in msgpack.unpackb(message, strict_map_key=False):
+            event_code, kind, fields = frame[:3]
+            data = {self.fields.get(code, code): value for code, value in fields.items()}
+            if 'changed' in data:
+                data['changed'] = [self.fields.get(code, code) for code in data['changed']]
+            key = (event_code, data['id'])
+            if kind == wire.DELTA:
+                base = dict(self.snapshots[key])
+                for code in (frame[3] if len(frame) > 3 else []):
+                    base.pop(self.fields.get(code, code), None)
+                data = {**base, **data}
+            self.snapshots[key] = data
+            received.append((self.events[event_code], data))
+        return received
+
+
+class WireModeTest(SimpleTestCase):
+    def setUp(self):
+        self.encoder = wire.DeltaEncoder()
+
+    def send(self, connections, event, data):
+        version = self.encoder.new_version()
+        return [self.encoder.pack(bases, event, data, version) for bases in connections]
+
+    def test_clients_rebuild_every_payload_from_snapshots_and_deltas(self):
+        client, bases = CompactClient(wire.describe()), {}
+        payloads = [
+            {'id': 5, 'status': 'PAYMENT_HELD', 'amount': '10.00', 'currency': 'USDC', 'note': 'gift'},
+            {'id': 5, 'status': 'SHIPPED', 'amount': '10.00', 'currency': 'USDC', 'note': 'gift'},
+            {'id': 5, 'status': 'COMPLETED', 'amount': '10.00', 'currency': 'USDC'},
+            {'id': 6, 'status': 'PAYMENT_HELD', 'amount': '3.50', 'currency': 'USDC'},
+        ]
+        frames = [self.send([bases], 'order_updated', payload)[0] for payload in payloads]
+
+        received = client.receive(wire.pack_batch(frames))
+        self.assertEqual(received, [('order_updated', payload) for payload in payloads])
+        # Unchanged fields are left out of deltas
+        self.assertLess(len(frames[1]), len(frames[0]))
+
+    def test_changed_lists_and_unknown_events(self):
+        client = CompactClient(wire.describe())
+        data = {'id': 7, 'stock': 3, 'changed': ['stock', 'custom']}
+        frame = self.encoder.pack({}, 'product_updated', data)
+        self.assertEqual(client.receive(wire.pack_batch([frame])), [('product_updated', data)])
+        self.assertIsNone(self.encoder.pack({}, 'notification', {'id': 1}))
+
+    def test_deltas_follow_what_each_connection_received(self):
+        behind, current = CompactClient(wire.describe()), CompactClient(wire.describe())
+        behind_bases, current_bases = {}, {}
+        first = self.send([behind_bases, current_bases], 'product_updated', {'id': 1, 'stock': 5, 'price': '2'})
+        behind.receive(wire.pack_batch([first[0]]))
+        current.receive(wire.pack_batch([first[1]]))
+        # The second version was dropped for the slow connection
+        current.receive(wire.pack_batch(self.send([current_bases], 'product_updated', {'id': 1, 'stock': 4, 'price': '2'})))
+
+        latest = {'id': 1, 'stock': 3, 'price': '2.5'}
+        for client, frame in zip([behind, current], self.send([behind_bases, current_bases], 'product_updated', latest)):
+            self.assertEqual(client.receive(wire.pack_batch([frame])), [('product_updated', latest)])
+
+    def test_mode_is_negotiated_from_auth_or_query_string(self):
+        self.assertEqual(wire.requested_mode({'wire': 'compact'}), wire.COMPACT_MODE)
+        self.assertEqual(wire.requested_mode(None, b'token=x&wire=compact'), wire.COMPACT_MODE)
+        self.assertIsNone(wire.requested_mode({'token': 'x'}, b'wire=json'))
+
+
+class ConnectionAuthTest(SimpleTestCase):
+    def setUp(self):
+        self.authenticator = auth.ConnectionAuthenticator(sio=mock.AsyncMock())
+        patcher = mock.patch.object(auth, 'fetch_allowed_users', side_effect=lambda ids: {str(pk) for pk in ids if pk != 3})
+        self.fetch_allowed_users = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def token(self, user_id):
+        token = AccessToken()
+        token['user_id'] = user_id
+        return str(token)
+
+    def test_each_token_is_decoded_once(self):
+        token = self.token(1)
+        with mock.patch.object(auth, 'AccessToken', wraps=AccessToken) as decode:
+            for _ in range(3):
+                self.assertEqual(asyncio.run(self.authenticator.authenticate(token))[0], 1)
+            for _ in range(2):
+                with self.assertRaises(auth.AuthenticationError):
+                    self.authenticator.decode('not-a-token')
+        self.assertEqual(decode.call_count, 2)
+        self.assertEqual(self.fetch_allowed_users.call_count, 1)
+
+    def test_concurrent_connects_share_one_user_lookup(self):
+        async def run():
+            return await asyncio.gather(*[self.authenticator.is_allowed(user_id) for user_id in (1, 2, 3, 2)])
+
+        self.assertEqual(asyncio.run(run()), [True, True, False, True])
+        self.fetch_allowed_users.assert_called_once()
+        with self.assertRaises(auth.AuthenticationError):
+            asyncio.run(self.authenticator.authenticate(self.token(3)))
+
+    def test_reauth_disconnects_suspended_users_and_warns_expiring_tokens(self):
+        now = time.time()
+        self.authenticator.register('sid-ok', 1, now + 3600)
+        self.authenticator.register('sid-expiring', 2, now + 10)
+        self.authenticator.register('sid-expired', 2, now - 1)
+        self.authenticator.register('sid-suspended', 3, now + 3600)
+
+        self.assertEqual(asyncio.run(self.authenticator.reauthenticate()), 2)
+        sio = self.authenticator.sio
+        self.assertEqual(sorted(call.args[0] for call in sio.disconnect.await_args_list), ['sid-expired', 'sid-suspended'])
+        sio.emit.assert_awaited_once_with('reauth_required', {'expires_at': now + 10}, to='sid-expiring')
+        self.assertEqual(sorted(self.authenticator.connections), ['sid-expiring', 'sid-ok'])
+
+
+@override_settings(
+    REALTIME_OUTBOX={**settings.REALTIME_OUTBOX, 'MAX_REPLAY': 5},
+    REALTIME_SSE={**settings.REALTIME_SSE, 'HEARTBEAT_SECONDS': 0.2},
+)
+class CatalogStreamTest(SimpleTestCase):
+    def setUp(self):
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        for module in (sse, streams):
+            patcher = mock.patch.object(module, 'get_async_redis', return_value=redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = streams.StreamStore()
+        for patcher in (
+            mock.patch.object(sse, 'get_stream_store', return_value=self.store),
+            # Every test gets its own feed, started on its own event loop
+            mock.patch.object(sse, '_feed', None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def publish(self, product_id, category='shoes'):
+        data = {'id': product_id, 'category': category, 'seller_id': 1, 'stock': 1}
+        return (await self.store.append([f'product_{product_id}', 'catalog'], 'product_updated', data))['catalog']
+
+    async def read(self, body, count):
+        return [await asyncio.wait_for(body.__anext__(), timeout=5) for _ in range(count)]
+
+    def test_resume_replays_matching_events_then_streams_live_ones(self):
+        async def run():
+            for product_id in (7, 8, 7):
+                await self.publish(product_id)
+            body = sse.catalog_events({'product_7'}, last_event_id=1)
+            try:
+                chunks = await self.read(body, 2)
+                await self.publish(8)
+                live = await self.publish(7)
+                chunks += await self.read(body, 1)
+            finally:
+                await body.aclose()
+                sse.get_catalog_feed()._task.cancel()
+            return chunks, live
+
+        chunks, live = asyncio.run(run())
+        self.assertTrue(chunks[0].startswith('retry: '))
+        self.assertTrue(chunks[1].startswith('id: 3\nevent: product_updated\n'))
+        self.assertTrue(chunks[2].startswith(f'id: {live}\nevent: product_updated\n'))
+        self.assertIn('"id":7', chunks[2])
+
+    def test_trimmed_history_asks_for_a_resync_and_heartbeats_advance_the_id(self):
+        async def run():
+            for _ in range(8):
+                await self.publish(8)
+            body = sse.catalog_events({'product_7'}, last_event_id=0)
+            try:
+                return await self.read(body, 3)
+            finally:
+                await body.aclose()
+                sse.get_catalog_feed()._task.cancel()
+
+        chunks = asyncio.run(run())
+        self.assertEqual(chunks[1], 'id: 8\nevent: resync\ndata: {"seq":8}\n\n')
+        self.assertEqual(chunks[2], 'id: 8\n\n')
+
+    def test_stream_requires_a_valid_filter(self):
+        self.assertEqual(self.client.get('/api/v1/realtime/catalog/stream/').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/realtime/catalog/stream/?categories=Bad Name').status_code, 400)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ProductRoomsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        seller = UserProfile.objects.create(username='seller', role='seller')
+        self.product = Product.objects.create(
+            seller=seller, listing_id='listing-1', title='Boots', description='', category='shoes',
+            price=10, product_hash='0x' + '00' * 32,
+        )
+        RealtimeEvent.objects.all().delete()
+
+    def test_watched_changes_go_to_the_product_category_and_seller_rooms(self):
+        self.product.rating = 4.5
+        self.product.save()
+        self.assertFalse(RealtimeEvent.objects.exists())
+
+        product = Product.objects.get(pk=self.product.pk)
+        product.stock = 0
+        product.save()
+        event = RealtimeEvent.objects.get()
+        self.assertEqual(outbox.split_targets(event.room), [
+            f'product_{product.pk}', 'category_shoes', f'seller_products_{product.seller_id}',
+        ])
+        self.assertEqual(event.data['changed'], ['stock'])
+
+    def test_subscriptions_are_validated_and_capped(self):
+        self.assertEqual(
+            rooms.subscription_rooms({'product_ids': [1, '2', 'x', 1], 'categories': ['shoes', 'Bad Name'], 'seller_ids': [3]}),
+            ['product_1', 'product_2', 'category_shoes', 'seller_products_3'],
+        )
+        with self.assertRaises(ValueError):
+            rooms.subscription_rooms({'product_ids': list(range(rooms.MAX_SUBSCRIPTIONS + 1))})
+
+
+class CoalescingDispatchTest(SimpleTestCase):
+    def dispatch(self, *batches):
+        events = iter(batches)
+        sio = mock.AsyncMock()
+        store = mock.Mock(append=mock.AsyncMock(return_value={}))
+        with mock.patch('apps.realtime.dispatcher.get_channel_layer', return_value=None), \
+                mock.patch('apps.realtime.dispatcher.get_stream_store', return_value=store), \
+                mock.patch.object(outbox, 'claim_batch', side_effect=lambda size: next(events, [])), \
+                mock.patch.object(outbox, 'mark_dispatched') as mark_dispatched:
+            dispatcher = OutboxDispatcher(sio, coalesce_window=3600)
+
+            async def run():
+                for _ in batches:
+                    await dispatcher.dispatch_once()
+                held = sio.emit.await_count
+                await dispatcher.flush_coalesced()
+                return held
+            held = asyncio.run(run())
+        return sio, held, mark_dispatched
+
+    def product_event(self, event_id, product_id, changed):
+        return {
+            'id': event_id, 'event_type': 'product_updated', 'room': f'product_{product_id}', 'channel_group': '',
+            'data': {'id': product_id, 'changed': changed},
+        }
+
+    def test_product_updates_are_merged_per_product_within_the_window(self):
+        sio, held, mark_dispatched = self.dispatch(
+            [self.product_event(1, 7, ['stock']), self.product_event(2, 8, ['price'])],
+            [self.product_event(3, 7, ['price']), {
+                'id': 4, 'event_type': 'notification', 'room': 'user_1', 'channel_group': '', 'data': {},
+            }],
+        )
+
+        # Only the event that is not coalesced went out before the window closed
+        self.assertEqual(held, 1)
+        delivered = {call.args[1]['id']: call.args[1]['changed'] for call in sio.emit.await_args_list if call.args[0] == 'product_updated'}
+        self.assertEqual(delivered, {7: ['stock', 'price'], 8: ['price']})
+        self.assertEqual([call.args[0] for call in mark_dispatched.call_args_list], [[1, 2], [3, 4]])
+
+
+class LoadTestPlanTest(SimpleTestCase):
+    options = {
+        'seed': 3, 'clients': 200, 'products': 50, 'categories': 4, 'products_per_client': 5, 'zipf': 1.1,
+        'category_ratio': 0.5, 'seller_ratio': 0.2,
+    }
+
+    def test_planned_rooms_are_the_rooms_the_subscriptions_join(self):
+        plans = socketio_load_test.plan_clients(self.options)
+
+        self.assertEqual(plans, socketio_load_test.plan_clients(self.options))
+        for _, user_id, messages, planned in plans:
+            joined = {f'user_{user_id}', f'user_orders_{user_id}'}
+            for event, data in messages:
+                if event == 'subscribe_products':
+                    joined |= set(rooms.subscription_rooms(data))
+                elif event == 'subscribe_seller_sales':
+                    joined.add(f'seller_sales_{user_id}')
+            self.assertEqual(joined, planned)
+
+    def test_popular_products_are_picked_more_often(self):
+        weights = socketio_load_test.zipf_weights(10, 1.1)
+        self.assertEqual(len(weights), 10)
+        self.assertGreater(weights[0], weights[9] - weights[8])
+        self.assertEqual(socketio_load_test.percentile([3, 1, 2, 4], 0.5), 3)
@@ -1,6 +1,12 @@
 from django.urls import path
 
+from . import consumers, views
+
+urlpatterns = [
+    path('catalog/stream/', views.catalog_stream, name='catalog-stream'),
+]
+
 websocket_urlpatterns = [
-    path('ws/orders/<int:user_id>/', 'apps.realtime.consumers.OrderConsumer.as_asgi'),
-    path('ws/products/', 'apps.realtime.consumers.ProductConsumer.as_asgi'),
+    path('ws/orders/<int:user_id>/', consumers.OrderConsumer.as_asgi()),
+    path('ws/products/', consumers.ProductConsumer.as_asgi()),
 ]
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .rooms import subscription_rooms
+from .sse import catalog_events
+
+
+def _list_param(request, name):
+    """Values of a query parameter given as repeats and/or comma separated"""
+    return [value for raw in request.GET.getlist(name) for value in raw.split(',') if value]
+
+
+# Never touches the database; ATOMIC_REQUESTS cannot wrap async views anyway
+@transaction.non_atomic_requests
+@require_GET
+async def catalog_stream(request):
+    """Public Server-Sent Events stream of product updates, filtered by product_ids, categories and seller_ids"""
+    try:
+        rooms = subscription_rooms({
+            'product_ids': _list_param(request, 'product_ids'),
+            'categories': _list_param(request, 'categories'),
+            'seller_ids': _list_param(request, 'seller_ids'),
+        })
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not rooms:
+        return JsonResponse({'error': 'Pass product_ids, categories or seller_ids'}, status=400)
+
+    # EventSource sends Last-Event-ID on reconnect; the query form lets a page resume from its first load
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    response = StreamingHttpResponse(catalog_events(set(rooms), last_event_id), content_type='text/event-stream')
+    # Keep CDNs and proxies from caching, compressing or buffering the stream
+    response['Cache-Control'] = 'no-cache, no-transform'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductReview
+from .models import HelpfulVote, ProductReview
 
 
 @admin.register(ProductReview)
@@ -22,3 +22,11 @@ class ProductReviewAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(HelpfulVote)
+class HelpfulVoteAdmin(admin.ModelAdmin):
+    list_display = ['review', 'user', 'created']
+    raw_id_fields = ['review', 'user']
+    readonly_fields = ['created', 'modified']
+    ordering = ['-created']
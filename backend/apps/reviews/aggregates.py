@@ -0,0 +1,120 @@
+"""
+Denormalized rating aggregates on Product.
+
+Every review add, edit or delete turns into one UPDATE of its product that
+adjusts rating_sum, review_count and the star histogram with F()
+expressions and recomputes rating from the new sum and count. Concurrent
+reviews of the same product serialize on the row lock instead of
+overwriting each other, and reads never aggregate reviews. ``recompute``
+rebuilds the aggregates from the review table to repair drift (raw SQL,
+bulk deletes that bypass signals, historical data).
+"""
+
+import logging
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Greatest
+
+from apps.common.reconcile import reconcile_in_chunks
+from apps.products.models import Product
+
+from .models import ProductReview
+
+logger = logging.getLogger(__name__)
+
+STARS = range(1, 6)
+RECOMPUTE_CHUNK_SIZE = 1000
+
+
+def histogram_field(stars: int) -> str:
+    return f'rating_{stars}_count'
+
+
+def apply_delta(product_id, changes: Dict[int, int]) -> int:
+    """
+    Apply review count changes per star rating to a product in one UPDATE.
+
+    Args:
+        product_id: Product the reviews belong to
+        changes: Star rating -> change in number of reviews, e.g. {2: -1, 4: 1} for an edit
+
+    Returns:
+        int: Number of products updated (0 if the product no longer exists)
+    """
+    changes = {stars: delta for stars, delta in changes.items() if delta}
+    if not changes:
+        return 0
+    count_delta = sum(changes.values())
+    sum_delta = sum(stars * delta for stars, delta in changes.items())
+    updates = {histogram_field(stars): F(histogram_field(stars)) + delta for stars, delta in changes.items()}
+    # The right-hand sides all see the row as it was before this UPDATE
+    updates.update(
+        review_count=F('review_count') + count_delta,
+        rating_sum=F('rating_sum') + sum_delta,
+        rating=Cast(F('rating_sum') + sum_delta, FloatField()) / Greatest(F('review_count') + count_delta, Value(1)),
+    )
+    return Product.objects.filter(pk=product_id).update(**updates)
+
+
+def review_changed(previous: Optional[tuple], current: Optional[tuple]) -> None:
+    """
+    Move a review's contribution between (product_id, rating) states.
+
+    Either side may be None for an added or deleted review.
+    """
+    if previous == current:
+        return
+    by_product: Dict = {}
+    if previous is not None:
+        by_product.setdefault(previous[0], Counter())[previous[1]] -= 1
+    if current is not None:
+        by_product.setdefault(current[0], Counter())[current[1]] += 1
+    for product_id, changes in by_product.items():
+        apply_delta(product_id, changes)
+
+
+def _aggregates(product_ids: Iterable) -> Dict:
+    rows = (
+        ProductReview.objects.filter(product_id__in=list(product_ids))
+        .values('product_id')
+        .annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{histogram_field(stars): Count('id', filter=Q(rating=stars)) for stars in STARS},
+        )
+        .order_by()
+    )
+    return {row.pop('product_id'): row for row in rows}
+
+
+def recompute(product_ids: Optional[Iterable] = None, chunk_size: int = RECOMPUTE_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Rebuild rating aggregates from the review table and fix products that drifted.
+
+    Args:
+        product_ids: Products to check (default: every product)
+        chunk_size: Products locked and counted per transaction
+
+    Returns:
+        dict: Numbers of products 'checked' and 'repaired'
+    """
+    counts = ['review_count', 'rating_sum'] + [histogram_field(stars) for stars in STARS]
+    products = Product.objects.only(*counts, 'rating')
+    if product_ids is not None:
+        products = products.filter(pk__in=list(product_ids))
+
+    def expected(chunk):
+        actual = _aggregates(product.pk for product in chunk)
+        rows = []
+        for product in chunk:
+            row = actual.get(product.pk) or dict.fromkeys(counts, 0)
+            row['rating'] = row['rating_sum'] / row['review_count'] if row['review_count'] else 0.0
+            rows.append(row)
+        return rows
+
+    stats = reconcile_in_chunks(products, counts + ['rating'], expected, chunk_size)
+    if stats['repaired']:
+        logger.info(f"Repaired rating aggregates of {stats['repaired']} of {stats['checked']} products")
+    return stats
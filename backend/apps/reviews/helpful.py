@@ -0,0 +1,226 @@
+"""
+Write-behind counting of helpful votes.
+
+A vote is a HelpfulVote row, unique per (review, user), so a user counts
+once no matter how often they click. Accepted votes and withdrawals do not
+update the review row. In the same transaction they increment a per-review
+delta in a Redis hash, so thousands of votes on one review during a launch
+add up in memory. A periodic flush atomically renames the hash, as
+reputation_sync does, and applies all deltas to ``helpful_count`` with one
+CASE UPDATE per chunk of reviews.
+
+Flushing is at least once: a flush that dies between the UPDATE and
+deleting its hash re-applies those deltas on the next run. ``recount``
+rebuilds counts from the vote table and runs nightly to remove any such
+drift. It holds the flush lock while it works on a chunk, so a flush cannot
+move deltas from Redis into helpful_count between its reads.
+
+Recount also locks the chunk's review rows. Inserting a vote takes a key
+share lock on its review through the foreign key, and withdrawing one locks
+the review explicitly, so a vote is either committed together with its
+delta before recount reads, or waits until the chunk is written. A delta
+buffered by a transaction that later rolls back is netted out the same way:
+recount subtracts it from the table count and the flush adds it back.
+"""
+
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django_redis import get_redis_connection
+
+from .models import HelpfulVote, ProductReview
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'chainmart:reviews:helpful:pending'
+FLUSHING_KEY = 'chainmart:reviews:helpful:flushing'
+FLUSH_LOCK_KEY = 'helpful_votes_flush_lock'
+FLUSH_LOCK_TIMEOUT = 5 * 60
+FLUSH_CHUNK_SIZE = 500
+RECOUNT_LOCK_WAIT = 60
+
+
+def _decode_hash(raw: Dict[bytes, bytes]) -> Dict[int, int]:
+    return {int(key): int(value) for key, value in raw.items()}
+
+
+def _buffer(review_id: int, delta: int) -> None:
+    get_redis_connection('default').hincrby(PENDING_KEY, review_id, delta)
+
+
+def pending_delta(review_id: int) -> int:
+    """Votes accepted for a review but not yet flushed to helpful_count"""
+    redis = get_redis_connection('default')
+    return sum(int(value or 0) for value in (redis.hget(PENDING_KEY, review_id), redis.hget(FLUSHING_KEY, review_id)))
+
+
+def vote(review: ProductReview, user) -> bool:
+    """
+    Record a helpful vote; repeated votes by the same user are ignored.
+
+    Returns:
+        bool: True if this call added the vote
+    """
+    try:
+        with transaction.atomic():
+            HelpfulVote.objects.create(review=review, user=user)
+            # Buffered before commit, so recount never sees the vote without its delta
+            _buffer(review.pk, 1)
+    except IntegrityError:
+        return False
+    return True
+
+
+def unvote(review: ProductReview, user) -> bool:
+    """
+    Withdraw a helpful vote.
+
+    Returns:
+        bool: True if the user had voted
+    """
+    with transaction.atomic():
+        # A delete takes no lock on the review; this makes recount wait for the withdrawal to commit
+        list(ProductReview.objects.select_for_update(no_key=True).filter(pk=review.pk).values_list('pk'))
+        deleted, _ = HelpfulVote.objects.filter(review=review, user=user).delete()
+        if deleted:
+            _buffer(review.pk, -1)
+    return bool(deleted)
+
+
+def _apply(deltas: Dict[int, int]) -> None:
+    """Add deltas to helpful_count, one UPDATE per chunk of reviews"""
+    review_ids = [review_id for review_id, delta in deltas.items() if delta]
+    for start in range(0, len(review_ids), FLUSH_CHUNK_SIZE):
+        chunk = review_ids[start:start + FLUSH_CHUNK_SIZE]
+        ProductReview.objects.filter(pk__in=chunk).update(helpful_count=F('helpful_count') + Case(
+            *[When(pk=review_id, then=Value(deltas[review_id])) for review_id in chunk],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+
+def _set_counts(counts: Dict[int, int]) -> None:
+    """Overwrite helpful_count with absolute values, one UPDATE per chunk of reviews"""
+    review_ids = list(counts)
+    for start in range(0, len(review_ids), FLUSH_CHUNK_SIZE):
+        chunk = review_ids[start:start + FLUSH_CHUNK_SIZE]
+        ProductReview.objects.filter(pk__in=chunk).update(helpful_count=Case(
+            *[When(pk=review_id, then=Value(counts[review_id])) for review_id in chunk],
+            default=F('helpful_count'),
+            output_field=IntegerField(),
+        ))
+
+
+def _wait_for_flush_lock(timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.5)
+    return True
+
+
+def _requeue(redis, deltas: Dict[int, int]) -> None:
+    if not deltas:
+        return
+    pipe = redis.pipeline()
+    for review_id, delta in deltas.items():
+        pipe.hincrby(PENDING_KEY, review_id, delta)
+    pipe.execute()
+
+
+def flush() -> Dict[str, int]:
+    """
+    Apply buffered vote deltas to helpful_count.
+
+    The pending hash is renamed before reading, so votes arriving during a
+    flush land in a fresh hash and are applied by the next run. If the UPDATE
+    fails, the deltas are merged back into the pending hash.
+
+    Returns:
+        dict: Numbers of 'reviews' updated and net 'votes' applied
+    """
+    stats = {'reviews': 0, 'votes': 0}
+    if not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        logger.info("Helpful vote flush already running, skipping")
+        return stats
+
+    redis = get_redis_connection('default')
+    try:
+        # Deltas of a flush that died before applying them
+        _requeue(redis, _decode_hash(redis.hgetall(FLUSHING_KEY)))
+        redis.delete(FLUSHING_KEY)
+        if not redis.exists(PENDING_KEY):
+            return stats
+        redis.rename(PENDING_KEY, FLUSHING_KEY)
+        deltas = _decode_hash(redis.hgetall(FLUSHING_KEY))
+        try:
+            with transaction.atomic():
+                _apply(deltas)
+        except Exception as e:
+            logger.error(f"Helpful vote flush of {len(deltas)} reviews failed: {str(e)}", exc_info=True)
+            _requeue(redis, deltas)
+            redis.delete(FLUSHING_KEY)
+            return stats
+        redis.delete(FLUSHING_KEY)
+        stats = {'reviews': sum(1 for delta in deltas.values() if delta), 'votes': sum(deltas.values())}
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+    logger.info(f"Helpful votes flushed: {stats}")
+    return stats
+
+
+def recount(review_ids: Optional[Iterable[int]] = None, chunk_size: int = FLUSH_CHUNK_SIZE) -> int:
+    """
+    Rebuild helpful_count from the vote table, net of deltas still buffered.
+
+    Each chunk is recounted under the flush lock with its review rows locked,
+    which waits out votes in flight on them, and the result is written as an
+    absolute value.
+
+    Args:
+        review_ids: Reviews to recount (default: every review)
+        chunk_size: Reviews counted per query
+
+    Returns:
+        int: Number of reviews whose count was corrected
+    """
+    redis = get_redis_connection('default')
+    reviews = ProductReview.objects.order_by('pk')
+    if review_ids is not None:
+        reviews = reviews.filter(pk__in=list(review_ids))
+    repaired, last_pk = 0, 0
+    while True:
+        ids = list(reviews.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+        if not _wait_for_flush_lock(RECOUNT_LOCK_WAIT):
+            logger.warning(f"Helpful vote flush lock busy, stopping recount at review {ids[0]}")
+            break
+        try:
+            with transaction.atomic():
+                current = dict(ProductReview.objects.select_for_update().filter(pk__in=ids).values_list('pk', 'helpful_count'))
+                votes = dict(
+                    HelpfulVote.objects.filter(review_id__in=ids).values_list('review_id').annotate(count=Count('id')).order_by()
+                )
+                # Votes still in Redis are already in the vote table but not yet in helpful_count.
+                # With the rows locked no vote can commit between the two reads.
+                buffered = zip(redis.hmget(PENDING_KEY, ids), redis.hmget(FLUSHING_KEY, ids))
+                counts = {}
+                for pk, (pending, flushing) in zip(ids, buffered):
+                    expected = votes.get(pk, 0) - int(pending or 0) - int(flushing or 0)
+                    if pk in current and current[pk] != expected:
+                        counts[pk] = expected
+                _set_counts(counts)
+        finally:
+            cache.delete(FLUSH_LOCK_KEY)
+        repaired += len(counts)
+    if repaired:
+        logger.info(f"Corrected helpful counts of {repaired} reviews")
+    return repaired
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.reviews import aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild product rating sums, counts and histograms from reviews (run once after deploying the aggregates)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', help='Only these product ids')
+        parser.add_argument('--chunk-size', type=int, default=aggregates.RECOMPUTE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        stats = aggregates.recompute(options['product'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {stats['checked']} products, repaired {stats['repaired']}"))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:54
+
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rating_aggregates'),
+        ('reviews', '0002_product_recent_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelpfulVote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+            ],
+            options={
+                'db_table': 'reviews_helpfulvote',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product', '-helpful_count', '-created', '-id'], name='reviews_product_helpful_idx'),
+        ),
+        migrations.AddField(
+            model_name='helpfulvote',
+            name='review',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='helpful_votes', to='reviews.productreview'),
+        ),
+        migrations.AddField(
+            model_name='helpfulvote',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='helpful_votes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='helpfulvote',
+            constraint=models.UniqueConstraint(fields=('review', 'user'), name='reviews_helpfulvote_uniq'),
+        ),
+    ]
@@ -12,3 +12,19 @@ class ProductReview(TimeStampedModel):
     
     class Meta:
         db_table = 'reviews_productreview'
+        indexes = [
+            models.Index(fields=['product', '-created'], name='reviews_product_recent_idx'),
+            models.Index(fields=['product', '-helpful_count', '-created', '-id'], name='reviews_product_helpful_idx'),
+        ]
+
+
+class HelpfulVote(TimeStampedModel):
+    """One user's helpful vote on a review; counted into helpful_count by apps.reviews.helpful"""
+    review = models.ForeignKey(ProductReview, on_delete=models.CASCADE, related_name='helpful_votes')
+    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='helpful_votes')
+
+    class Meta:
+        db_table = 'reviews_helpfulvote'
+        constraints = [
+            models.UniqueConstraint(fields=['review', 'user'], name='reviews_helpfulvote_uniq'),
+        ]
@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+from apps.common.pagination import KeysetPagination
+
+
+class ProductReviewPagination(CursorPagination):
+    """Reviews of one product, newest first, on the (product, -created) index"""
+    ordering = '-created'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class HelpfulReviewPagination(KeysetPagination):
+    """Reviews of one product, most helpful first, on the (product, -helpful_count, -created, -id) index"""
+    ordering = ('-helpful_count', '-created', '-id')
@@ -3,7 +3,14 @@ from .models import ProductReview
 
 class ProductReviewSerializer(serializers.ModelSerializer):
     reviewer_name = serializers.CharField(source='reviewer.display_name', read_only=True)
+    created_at = serializers.DateTimeField(source='created', read_only=True)
     
     class Meta:
         model = ProductReview
-        fields = ['id', 'rating', 'comment', 'reviewer_name', 'helpful_count', 'created_at']
+        fields = ['id', 'product', 'rating', 'comment', 'reviewer', 'reviewer_name', 'helpful_count', 'created_at']
+        read_only_fields = ['reviewer', 'helpful_count']
+
+    def update(self, instance, validated_data):
+        # A review stays attached to the product it was written for
+        validated_data.pop('product', None)
+        return super().update(instance, validated_data)
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from apps.reviews import aggregates
+from apps.reviews.models import ProductReview
+
+
+def _state(instance):
+    # Read from __dict__ so a deferred rating is not fetched just to be remembered
+    if instance.pk is None or 'rating' not in instance.__dict__:
+        return None
+    return (instance.product_id, instance.rating)
+
+
+@receiver(post_init, sender=ProductReview)
+def remember_rating(sender, instance, **kwargs):
+    instance._rating_snapshot = _state(instance)
+
+
+@receiver(post_save, sender=ProductReview)
+def review_saved(sender, instance, created, **kwargs):
+    """Move the review's star rating into its product's aggregates"""
+    previous = None if created else getattr(instance, '_rating_snapshot', None)
+    current = (instance.product_id, instance.rating)
+    instance._rating_snapshot = current
+    if not created and previous is None:
+        # Loaded without its rating: the old value is unknown, the periodic recompute settles it
+        return
+    aggregates.review_changed(previous, current)
+
+
+@receiver(post_delete, sender=ProductReview)
+def review_deleted(sender, instance, **kwargs):
+    aggregates.review_changed((instance.product_id, instance.rating), None)
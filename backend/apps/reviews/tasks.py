@@ -0,0 +1,20 @@
+from celery import shared_task
+from . import aggregates, helpful
+
+
+@shared_task
+def recompute_product_ratings():
+    """Rebuild product rating aggregates from reviews and repair any drift"""
+    return aggregates.recompute()
+
+
+@shared_task
+def flush_helpful_votes():
+    """Apply buffered helpful votes to review counters"""
+    return helpful.flush()
+
+
+@shared_task
+def recount_helpful_votes():
+    """Rebuild helpful counts from the vote table to remove drift from interrupted flushes"""
+    return helpful.recount()
@@ -0,0 +1,211 @@
+from base64 import b64encode
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.products.models import Product
+from apps.users.models import UserProfile
+from . import aggregates, helpful
+from .models import HelpfulVote, ProductReview
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ReviewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = UserProfile.objects.create(username='seller', role='seller')
+        self.product = self.make_product('listing-1')
+
+    def make_product(self, listing_id):
+        return Product.objects.create(
+            seller=self.seller, listing_id=listing_id, title=listing_id, description='',
+            category='other', price=1, product_hash='0x' + '00' * 32,
+        )
+
+    def make_user(self, username):
+        return UserProfile.objects.create(username=username)
+
+    def review(self, rating, product=None, username=None):
+        reviewer = self.make_user(username or f'reviewer-{ProductReview.objects.count()}')
+        return ProductReview.objects.create(product=product or self.product, reviewer=reviewer, rating=rating, comment='')
+
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RatingAggregatesTest(ReviewTestCase):
+    def aggregates(self, product=None):
+        product = Product.objects.get(pk=(product or self.product).pk)
+        histogram = [getattr(product, aggregates.histogram_field(stars)) for stars in aggregates.STARS]
+        return product.review_count, product.rating_sum, product.rating, histogram
+
+    def test_added_reviews_update_count_sum_and_histogram(self):
+        self.review(5)
+        self.review(4)
+        self.review(4)
+
+        self.assertEqual(self.aggregates(), (3, 13, 13 / 3, [0, 0, 0, 2, 1]))
+
+    def test_edit_moves_the_rating_between_stars(self):
+        review = self.review(5)
+        self.review(1)
+
+        review.rating = 2
+        review.save()
+
+        self.assertEqual(self.aggregates(), (2, 3, 1.5, [1, 1, 0, 0, 0]))
+
+    def test_edit_to_another_product_moves_the_review(self):
+        other = self.make_product('listing-2')
+        review = self.review(3)
+
+        review.product = other
+        review.save()
+
+        self.assertEqual(self.aggregates(), (0, 0, 0.0, [0, 0, 0, 0, 0]))
+        self.assertEqual(self.aggregates(other), (1, 3, 3.0, [0, 0, 1, 0, 0]))
+
+    def test_delete_removes_the_review(self):
+        self.review(5)
+        review = self.review(2)
+
+        review.delete()
+
+        self.assertEqual(self.aggregates(), (1, 5, 5.0, [0, 0, 0, 0, 1]))
+
+    def test_review_loaded_without_its_rating_is_left_to_recompute(self):
+        review = self.review(5)
+        partial = ProductReview.objects.only('id', 'product_id', 'comment').get(pk=review.pk)
+        partial.rating = 1
+        partial.save()
+
+        self.assertEqual(self.aggregates()[:2], (1, 5))
+        self.assertEqual(aggregates.recompute(), {'checked': 1, 'repaired': 1})
+        self.assertEqual(self.aggregates(), (1, 1, 1.0, [1, 0, 0, 0, 0]))
+
+    def test_recompute_repairs_drift_in_chunks(self):
+        self.review(4)
+        other = self.make_product('listing-2')
+        self.review(2, product=other)
+        # Queryset updates bypass the review signals
+        Product.objects.filter(pk=self.product.pk).update(rating=0, rating_sum=0)
+        Product.objects.filter(pk=other.pk).update(rating_2_count=5, review_count=9)
+
+        self.assertEqual(aggregates.recompute(chunk_size=1), {'checked': 2, 'repaired': 2})
+        self.assertEqual(self.aggregates(), (1, 4, 4.0, [0, 0, 0, 1, 0]))
+        self.assertEqual(self.aggregates(other), (1, 2, 2.0, [0, 1, 0, 0, 0]))
+        self.assertEqual(aggregates.recompute(), {'checked': 2, 'repaired': 0})
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class HelpfulVoteTest(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(helpful, 'get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.target = self.review(5)
+        self.voters = [self.make_user(f'voter-{i}') for i in range(3)]
+
+    def vote(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return helpful.vote(self.target, user)
+
+    def unvote(self, user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return helpful.unvote(self.target, user)
+
+    def helpful_count(self):
+        self.target.refresh_from_db(fields=['helpful_count'])
+        return self.target.helpful_count
+
+    def test_votes_are_buffered_until_flush(self):
+        for voter in self.voters:
+            self.assertTrue(self.vote(voter))
+        self.assertFalse(self.vote(self.voters[0]))
+        self.assertTrue(self.unvote(self.voters[1]))
+
+        self.assertEqual(self.helpful_count(), 0)
+        self.assertEqual(helpful.pending_delta(self.target.pk), 2)
+
+        self.assertEqual(helpful.flush(), {'reviews': 1, 'votes': 2})
+        self.assertEqual(self.helpful_count(), 2)
+        self.assertEqual(helpful.pending_delta(self.target.pk), 0)
+
+    def test_recount_leaves_buffered_votes_to_the_flush(self):
+        for voter in self.voters:
+            self.vote(voter)
+        ProductReview.objects.filter(pk=self.target.pk).update(helpful_count=40)
+
+        self.assertEqual(helpful.recount(), 1)
+        self.assertEqual(self.helpful_count(), 0)
+        helpful.flush()
+        self.assertEqual(self.helpful_count(), 3)
+        self.assertEqual(helpful.recount(), 0)
+
+    def test_recount_waits_for_a_running_flush(self):
+        self.vote(self.voters[0])
+        helpful.flush()
+        ProductReview.objects.filter(pk=self.target.pk).update(helpful_count=7)
+        cache.add(helpful.FLUSH_LOCK_KEY, 1)
+
+        with mock.patch.object(helpful, 'RECOUNT_LOCK_WAIT', 0):
+            self.assertEqual(helpful.recount(), 0)
+        self.assertEqual(self.helpful_count(), 7)
+
+        cache.delete(helpful.FLUSH_LOCK_KEY)
+        self.assertEqual(helpful.recount(), 1)
+        self.assertEqual(self.helpful_count(), 1)
+
+    def test_recount_before_the_vote_commits_does_not_count_it_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            helpful.vote(self.target, self.voters[0])
+            helpful.recount()
+
+        helpful.flush()
+        self.assertEqual(self.helpful_count(), 1)
+
+    def test_vote_is_not_recorded_when_it_cannot_be_buffered(self):
+        with mock.patch.object(helpful, '_buffer', side_effect=ConnectionError('redis down')):
+            with self.assertRaises(ConnectionError):
+                helpful.vote(self.target, self.voters[0])
+        self.assertFalse(HelpfulVote.objects.exists())
+
+    def test_flush_skips_while_recount_holds_the_lock(self):
+        self.vote(self.voters[0])
+        cache.add(helpful.FLUSH_LOCK_KEY, 1)
+        self.assertEqual(helpful.flush(), {'reviews': 0, 'votes': 0})
+        self.assertEqual(helpful.pending_delta(self.target.pk), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class HelpfulReviewPaginationTest(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.reviews = [self.review(4) for _ in range(5)]
+        ProductReview.objects.filter(pk=self.reviews[2].pk).update(helpful_count=3)
+
+    def list(self, **params):
+        return self.client.get('/api/v1/reviews/', {'product': self.product.pk, 'ordering': 'helpful', **params})
+
+    def test_pages_most_helpful_first_through_ties(self):
+        seen = []
+        response = self.list(page_size=2)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen[0], self.reviews[2].pk)
+        self.assertEqual(sorted(seen), sorted(review.pk for review in self.reviews))
+
+    def test_page_size_and_cursor_are_validated(self):
+        self.assertEqual(len(self.list(page_size=-1).data['results']), 1)
+        cursor = b64encode(b'[0, "yesterday", 1]').decode()
+        self.assertEqual(self.list(cursor=cursor).status_code, 404)
@@ -1,9 +1,51 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from . import helpful
 from .models import ProductReview
+from .pagination import HelpfulReviewPagination, ProductReviewPagination
 from .serializers import ProductReviewSerializer
 
 class ProductReviewViewSet(viewsets.ModelViewSet):
     queryset = ProductReview.objects.all()
     serializer_class = ProductReviewSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ProductReviewPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        queryset = ProductReview.objects.select_related('reviewer')
+        if self.action == 'helpful':
+            return queryset
+        if self.request.method not in SAFE_METHODS:
+            return queryset.filter(reviewer=self.request.user)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        """Reviews of one product: ?product=<id>[&ordering=helpful]"""
+        product_id = request.query_params.get('product')
+        if not product_id or not product_id.isdigit():
+            return Response({'error': 'product is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('ordering') == 'helpful':
+            self.pagination_class = HelpfulReviewPagination
+        queryset = self.get_queryset().filter(product_id=int(product_id))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def perform_create(self, serializer):
+        serializer.save(reviewer=self.request.user)
+
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def helpful(self, request, pk=None):
+        """Vote a review helpful (POST) or withdraw the vote (DELETE); one vote per user"""
+        review = self.get_object()
+        if review.reviewer_id == request.user.pk:
+            return Response({'error': 'Cannot vote on your own review'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.method == 'POST':
+            changed, own = helpful.vote(review, request.user), 1
+        else:
+            changed, own = helpful.unvote(review, request.user), -1
+        # Flushed count plus buffered votes, this request's included
+        count = review.helpful_count + helpful.pending_delta(review.pk)
+        return Response({'helpful': own > 0, 'changed': changed, 'helpful_count': count})
@@ -4,10 +4,13 @@ from .models import SellerProfile, SellerReview
 
 @admin.register(SellerProfile)
 class SellerProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'store_name', 'verified', 'response_time', 'created']
+    list_display = ['user', 'store_name', 'verified', 'completed_sales', 'average_rating', 'created']
     list_filter = ['verified', 'created']
     search_fields = ['user__username', 'store_name']
-    readonly_fields = ['created', 'modified']
+    readonly_fields = [
+        'created', 'modified', 'active_product_count', 'completed_sales', 'review_count', 'average_rating',
+        'median_response_time',
+    ]
     list_editable = ['verified']
     
     fieldsets = (
@@ -20,6 +23,9 @@ class SellerProfileAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('verified', 'response_time')
         }),
+        ('Directory Stats', {
+            'fields': ('active_product_count', 'completed_sales', 'review_count', 'average_rating', 'median_response_time')
+        }),
         ('Timestamps', {
             'fields': ('created', 'modified'),
             'classes': ('collapse',)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.sellers import reputation
+
+
+class Command(BaseCommand):
+    help = 'Recompute seller reputation scores from reviews and orders and queue changes for the on-chain sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--incremental', action='store_true', help='Only sellers touched since the last run')
+        parser.add_argument('--seller', type=int, action='append', help='Only these seller ids')
+
+    def handle(self, *args, **options):
+        stats = reputation.recompute(incremental=options['incremental'], seller_ids=options['seller'])
+        self.stdout.write(self.style.SUCCESS(f"Scored {stats['sellers']} sellers, updated {stats['updated']}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apps.sellers import stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild seller directory stats from products, orders, reviews and messages (run once after deploying them)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', help='Only these seller (user) ids')
+        parser.add_argument('--chunk-size', type=int, default=stats.RECONCILE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        result = stats.reconcile(options['seller'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Checked {result['checked']} sellers, repaired {result['repaired']}"))
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='active_product_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='average_rating',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='completed_sales',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='median_response_time',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='rating_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sellerprofile',
+            name='review_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(fields=['-completed_sales', '-id'], name='sellers_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(fields=['-average_rating', '-id'], name='sellers_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(fields=['-active_product_count', '-id'], name='sellers_products_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(condition=models.Q(('median_response_time__isnull', False)), fields=['median_response_time', 'id'], name='sellers_response_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(condition=models.Q(('verified', True)), fields=['-completed_sales', '-id'], name='sellers_verified_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerprofile',
+            index=models.Index(condition=models.Q(('verified', True)), fields=['-average_rating', '-id'], name='sellers_verified_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sellers', '0002_directory_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sellerreview',
+            index=models.Index(fields=['seller', '-created'], name='sellers_review_recent_idx'),
+        ),
+    ]
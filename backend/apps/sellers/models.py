@@ -9,9 +9,31 @@ class SellerProfile(TimeStampedModel):
     store_banner = models.URLField(blank=True, null=True)
     verified = models.BooleanField(default=False)
     response_time = models.IntegerField(default=0)  # in hours
+
+    # Directory stats, maintained by apps.sellers.stats
+    active_product_count = models.IntegerField(default=0)
+    completed_sales = models.IntegerField(default=0)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    average_rating = models.FloatField(default=0.0)
+    # Median minutes to reply to a message, recomputed nightly; null until the seller has replied
+    median_response_time = models.PositiveIntegerField(null=True, blank=True)
     
     class Meta:
         db_table = 'sellers_sellerprofile'
+        indexes = [
+            # One (value, id) index per directory sort, so every page is a range scan
+            models.Index(fields=['-completed_sales', '-id'], name='sellers_sales_idx'),
+            models.Index(fields=['-average_rating', '-id'], name='sellers_rating_idx'),
+            models.Index(fields=['-active_product_count', '-id'], name='sellers_products_idx'),
+            models.Index(
+                fields=['median_response_time', 'id'],
+                condition=models.Q(median_response_time__isnull=False),
+                name='sellers_response_idx',
+            ),
+            models.Index(fields=['-completed_sales', '-id'], condition=models.Q(verified=True), name='sellers_verified_sales_idx'),
+            models.Index(fields=['-average_rating', '-id'], condition=models.Q(verified=True), name='sellers_verified_rating_idx'),
+        ]
 
 class SellerReview(TimeStampedModel):
     seller = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='seller_reviews')
@@ -21,3 +43,7 @@ class SellerReview(TimeStampedModel):
     
     class Meta:
         db_table = 'sellers_sellerreview'
+        indexes = [
+            models.Index(fields=['seller', '-created'], name='sellers_review_recent_idx'),
+            models.Index(fields=['modified'], name='sellers_review_modified_idx'),
+        ]
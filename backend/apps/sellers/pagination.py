@@ -0,0 +1,5 @@
+from apps.common.pagination import KeysetPagination
+
+
+class SellerDirectoryPagination(KeysetPagination):
+    """Seller profiles in the view's (value, id) order, on the matching directory index"""
@@ -0,0 +1,246 @@
+"""
+Seller reputation scores.
+
+A seller's score (0-1000, the scale of the ReputationNFT levels) is
+computed from three inputs: their SellerReview ratings, how many of their
+orders completed compared to how many ended disputed or refunded, and how
+many orders they have completed. Each input comes from one grouped
+aggregate query over all sellers, and the scores are computed at once with
+NumPy array math.
+
+Both ratios are smoothed towards the marketplace-wide average (a Bayesian
+prior worth a fixed number of reviews or orders). A seller with one
+five-star review therefore does not outrank one with hundreds of
+4.8-star reviews. The smoothed quality is then scaled by experience, which
+grows with the log of completed orders. New sellers start low and climb as
+they trade.
+
+Only changed scores are written, with chunked bulk_update. bulk_update does
+not send post_save, so the changes are queued for the on-chain sync here.
+A nightly full run recomputes every seller and refreshes the priors. The
+frequent incremental run only recomputes sellers with reviews or orders
+created or changed since the previous run, found through the ``modified``
+indexes. ``modified`` is stamped when a row is saved, not when its
+transaction commits. A row saved just before a run starts can therefore
+commit after the run has read the table. Each incremental run looks back
+INCREMENTAL_OVERLAP before the previous run's start, so such rows are
+picked up on the next run. The sellers in that overlap are scored twice,
+which is harmless because only changed scores are written. A deleted review
+or order leaves no row to find, so deletes add their seller to a Redis set
+that the next run drains.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+from apps.blockchain.reputation_sync import mark_many_dirty
+from apps.orders.models import Order
+from apps.users.models import UserProfile
+
+from .models import SellerReview
+
+logger = logging.getLogger(__name__)
+
+MAX_SCORE = 1000
+# Weight of the marketplace average, in reviews and in orders
+RATING_PRIOR_WEIGHT = 10
+RELIABILITY_PRIOR_WEIGHT = 20
+# Share of quality coming from ratings; the rest is completion reliability
+RATING_SHARE = 0.6
+# Completed orders at which experience stops growing
+EXPERIENCE_ORDERS = 500
+# Priors used until the marketplace has reviews or finished orders
+DEFAULT_PRIORS = {'rating': 3.0, 'reliability': 0.9}
+
+COMPLETED_STATUSES = ['COMPLETED']
+# Orders that went wrong for the buyer
+DISPUTED_STATUSES = ['DISPUTED', 'REFUNDED']
+
+LAST_RUN_KEY = 'seller_reputation_last_run'
+PRIORS_KEY = 'seller_reputation_priors'
+LOCK_KEY = 'seller_reputation_lock'
+# Redis set of sellers who lost a review or an order since the last run
+DELETED_KEY = 'seller_reputation_deleted'
+LOCK_TIMEOUT = 60 * 60
+LOAD_CHUNK_SIZE = 10000
+WRITE_CHUNK_SIZE = 1000
+# Sellers recomputed together in incremental mode, bounding IN (...) lists
+INCREMENTAL_CHUNK_SIZE = 50000
+# Look-back before the previous run's start; must exceed the longest transaction writing reviews or orders
+INCREMENTAL_OVERLAP = timedelta(minutes=10)
+
+
+def compute_priors() -> Dict[str, float]:
+    """
+    Marketplace-wide average rating and completion rate.
+
+    Returns:
+        dict: 'rating' (1-5) and 'reliability' (0-1)
+    """
+    reviews = SellerReview.objects.aggregate(count=Count('id'), total=Sum('rating'))
+    orders = Order.objects.aggregate(
+        completed=Count('id', filter=Q(status__in=COMPLETED_STATUSES)),
+        disputed=Count('id', filter=Q(status__in=DISPUTED_STATUSES)),
+    )
+    priors = dict(DEFAULT_PRIORS)
+    if reviews['count']:
+        priors['rating'] = reviews['total'] / reviews['count']
+    if orders['completed'] + orders['disputed']:
+        priors['reliability'] = orders['completed'] / (orders['completed'] + orders['disputed'])
+    return priors
+
+
+def score(review_count: np.ndarray, rating_sum: np.ndarray, completed: np.ndarray, disputed: np.ndarray,
+          priors: Dict[str, float]) -> np.ndarray:
+    """
+    Reputation scores for arrays of seller statistics, element-wise.
+
+    Args:
+        review_count: Number of reviews of each seller
+        rating_sum: Sum of their ratings
+        completed: Number of completed orders
+        disputed: Number of disputed or refunded orders
+        priors: Marketplace averages from ``compute_priors``
+
+    Returns:
+        np.ndarray: Integer scores between 0 and MAX_SCORE
+    """
+    rating = (RATING_PRIOR_WEIGHT * priors['rating'] + rating_sum) / (RATING_PRIOR_WEIGHT + review_count)
+    reliability = (RELIABILITY_PRIOR_WEIGHT * priors['reliability'] + completed) / (
+        RELIABILITY_PRIOR_WEIGHT + completed + disputed
+    )
+    quality = RATING_SHARE * (rating - 1) / 4 + (1 - RATING_SHARE) * reliability
+    experience = np.minimum(np.log1p(completed) / np.log1p(EXPERIENCE_ORDERS), 1.0)
+    return np.clip(np.rint(MAX_SCORE * quality * experience), 0, MAX_SCORE).astype(np.int64)
+
+
+def _scatter(seller_ids: np.ndarray, rows: List[tuple], columns: int) -> np.ndarray:
+    """Place (seller_id, value, ...) rows at their seller's position; sellers without a row get zeros"""
+    values = np.zeros((columns, len(seller_ids)), dtype=np.float64)
+    if not rows or not len(seller_ids):
+        return values
+    data = np.array(rows, dtype=np.float64)
+    row_ids = data[:, 0].astype(np.int64)
+    positions = np.minimum(np.searchsorted(seller_ids, row_ids), len(seller_ids) - 1)
+    found = seller_ids[positions] == row_ids
+    values[:, positions[found]] = data[found, 1:].T
+    return values
+
+
+def _recompute(seller_ids: Optional[List[int]], priors: Dict[str, float]) -> Dict[str, int]:
+    """Recompute and write the scores of the given sellers (None: all sellers)"""
+    sellers = UserProfile.objects.filter(role='seller')
+    reviews = SellerReview.objects.all()
+    orders = Order.objects.filter(status__in=COMPLETED_STATUSES + DISPUTED_STATUSES)
+    if seller_ids is not None:
+        sellers = sellers.filter(pk__in=seller_ids)
+        reviews = reviews.filter(seller_id__in=seller_ids)
+        orders = orders.filter(seller_id__in=seller_ids)
+
+    ids, current, wallets = [], [], []
+    for pk, reputation_score, wallet_address in (
+        sellers.order_by('pk').values_list('pk', 'reputation_score', 'wallet_address').iterator(chunk_size=LOAD_CHUNK_SIZE)
+    ):
+        ids.append(pk)
+        current.append(reputation_score)
+        wallets.append(wallet_address)
+    if not ids:
+        return {'sellers': 0, 'updated': 0}
+    ids = np.array(ids, dtype=np.int64)
+    current = np.array(current, dtype=np.int64)
+
+    review_count, rating_sum = _scatter(ids, list(
+        reviews.values_list('seller_id').annotate(count=Count('id'), total=Sum('rating')).order_by()
+    ), 2)
+    completed, disputed = _scatter(ids, list(
+        orders.values_list('seller_id').annotate(
+            completed=Count('id', filter=Q(status__in=COMPLETED_STATUSES)),
+            disputed=Count('id', filter=Q(status__in=DISPUTED_STATUSES)),
+        ).order_by()
+    ), 2)
+
+    scores = score(review_count, rating_sum, completed, disputed, priors)
+    changed = np.flatnonzero(scores != current)
+    for start in range(0, len(changed), WRITE_CHUNK_SIZE):
+        chunk = changed[start:start + WRITE_CHUNK_SIZE]
+        profiles = [UserProfile(pk=int(ids[i]), reputation_score=int(scores[i])) for i in chunk]
+        synced = [(wallets[i], int(scores[i])) for i in chunk if wallets[i]]
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(profiles, ['reputation_score'])
+            if synced:
+                transaction.on_commit(lambda synced=synced: mark_many_dirty(synced), robust=True)
+    return {'sellers': len(ids), 'updated': len(changed)}
+
+
+def mark_deleted(seller_id) -> None:
+    """Have the next run recompute a seller whose review or order was deleted"""
+    get_redis_connection('default').sadd(DELETED_KEY, seller_id)
+
+
+def _touched_since(since: datetime, deleted: Iterable[int]) -> List[int]:
+    """Sellers with reviews or orders created, changed or deleted since a time"""
+    touched = set(deleted)
+    touched.update(SellerReview.objects.filter(modified__gte=since).values_list('seller_id', flat=True).distinct())
+    touched.update(Order.objects.filter(modified__gte=since).values_list('seller_id', flat=True).distinct())
+    return sorted(touched)
+
+
+def recompute(incremental: bool = False, seller_ids: Optional[Iterable[int]] = None) -> Dict[str, int]:
+    """
+    Recompute seller reputation scores and queue the changes for the on-chain sync.
+
+    Args:
+        incremental: Only sellers touched since the previous run; falls back to
+            a full run if there has been none
+        seller_ids: Only these sellers (priors are reused as in incremental mode)
+
+    Returns:
+        dict: Numbers of 'sellers' scored and scores 'updated'
+    """
+    stats = {'sellers': 0, 'updated': 0}
+    if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+        logger.info("Reputation recompute already running, skipping")
+        return stats
+
+    # Changes committed while this runs, or saved shortly before, are picked up by the next incremental run
+    started = timezone.now()
+    redis = get_redis_connection('default')
+    try:
+        # Read before scoring; sellers marked during the run stay in the set for the next one
+        deleted = [int(seller_id) for seller_id in redis.smembers(DELETED_KEY)] if seller_ids is None else []
+        since = cache.get(LAST_RUN_KEY) if incremental else None
+        if seller_ids is not None:
+            targets = sorted(set(seller_ids))
+        elif since is not None:
+            targets = _touched_since(since - INCREMENTAL_OVERLAP, deleted)
+        else:
+            targets = None
+
+        priors = cache.get(PRIORS_KEY) if targets is not None else None
+        if priors is None:
+            priors = compute_priors()
+            cache.set(PRIORS_KEY, priors, None)
+
+        if targets is None:
+            stats = _recompute(None, priors)
+        else:
+            for start in range(0, len(targets), INCREMENTAL_CHUNK_SIZE):
+                result = _recompute(targets[start:start + INCREMENTAL_CHUNK_SIZE], priors)
+                stats = {key: stats[key] + result[key] for key in stats}
+        if seller_ids is None:
+            cache.set(LAST_RUN_KEY, started, None)
+            if deleted:
+                redis.srem(DELETED_KEY, *deleted)
+    finally:
+        cache.delete(LOCK_KEY)
+
+    logger.info(f"Seller reputation {'incremental' if incremental else 'full'} run: {stats}")
+    return stats
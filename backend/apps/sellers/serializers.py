@@ -1,12 +1,67 @@
 from rest_framework import serializers
+from apps.products.models import Product
 from .models import SellerProfile, SellerReview
 
+# Maintained by apps.sellers.stats, never written through the API
+STATS_FIELDS = [
+    'active_product_count', 'completed_sales', 'review_count', 'rating_sum', 'average_rating', 'median_response_time',
+]
+
+
 class SellerProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = SellerProfile
         fields = '__all__'
+        read_only_fields = STATS_FIELDS
+
+
+class SellerDirectorySerializer(serializers.ModelSerializer):
+    """A seller's directory entry; the user fields come from the same joined query"""
+    user_id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    display_name = serializers.CharField(source='user.display_name', read_only=True)
+    avatar = serializers.URLField(source='user.avatar', read_only=True)
+    reputation_score = serializers.IntegerField(source='user.reputation_score', read_only=True)
+
+    class Meta:
+        model = SellerProfile
+        fields = [
+            'id', 'user_id', 'username', 'display_name', 'avatar', 'reputation_score',
+            'store_name', 'store_banner', 'verified',
+            'active_product_count', 'completed_sales', 'review_count', 'average_rating', 'median_response_time',
+        ]
+        read_only_fields = fields
+
 
 class SellerReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = SellerReview
         fields = '__all__'
+
+
+class StorefrontProfileSerializer(SellerDirectorySerializer):
+    class Meta(SellerDirectorySerializer.Meta):
+        fields = SellerDirectorySerializer.Meta.fields + ['store_description', 'response_time', 'created']
+        read_only_fields = fields
+
+
+class StorefrontProductSerializer(serializers.ModelSerializer):
+    """A product card on its seller's storefront; the seller is the page itself"""
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'listing_id', 'title', 'category', 'price', 'currency',
+            'thumbnail', 'rating', 'review_count', 'sale_count', 'is_active',
+        ]
+        read_only_fields = fields
+
+
+class StorefrontReviewSerializer(serializers.ModelSerializer):
+    reviewer_name = serializers.CharField(source='reviewer.display_name', read_only=True)
+    reviewer_avatar = serializers.URLField(source='reviewer.avatar', read_only=True)
+    created_at = serializers.DateTimeField(source='created', read_only=True)
+
+    class Meta:
+        model = SellerReview
+        fields = ['id', 'reviewer_id', 'reviewer_name', 'reviewer_avatar', 'rating', 'comment', 'created_at']
+        read_only_fields = fields
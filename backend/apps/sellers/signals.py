@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from apps.orders.models import Order
+from apps.products.models import Product
+from apps.sellers import reputation, stats, storefront
+from apps.sellers.models import SellerProfile, SellerReview
+
+# Unknown: the instance was loaded without the fields its state depends on
+UNKNOWN = object()
+
+
+def _loaded(instance, *fields):
+    # Read from __dict__ so deferred fields are not fetched just to be remembered
+    return instance.pk is not None and all(field in instance.__dict__ for field in fields)
+
+
+def _product_state(instance):
+    if not _loaded(instance, 'seller_id', 'is_active'):
+        return UNKNOWN
+    return (instance.seller_id,) if instance.is_active else None
+
+
+def _order_state(instance):
+    if not _loaded(instance, 'seller_id', 'status'):
+        return UNKNOWN
+    return (instance.seller_id,) if instance.status == 'COMPLETED' else None
+
+
+def _review_state(instance):
+    if not _loaded(instance, 'seller_id', 'rating'):
+        return UNKNOWN
+    return (instance.seller_id, instance.rating)
+
+
+TRACKED = {
+    Product: (_product_state, stats.product_changed),
+    Order: (_order_state, stats.order_changed),
+    SellerReview: (_review_state, stats.review_changed),
+}
+
+
+@receiver(post_init, sender=Product)
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=SellerReview)
+def remember_directory_state(sender, instance, **kwargs):
+    instance._directory_snapshot = TRACKED[sender][0](instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=SellerReview)
+def directory_row_saved(sender, instance, created, **kwargs):
+    """Move the row's contribution to its seller's directory stats"""
+    state, changed = TRACKED[sender]
+    previous = None if created else getattr(instance, '_directory_snapshot', UNKNOWN)
+    current = state(instance)
+    instance._directory_snapshot = current
+    if previous is UNKNOWN:
+        # The old state is unknown, the nightly reconcile settles it
+        return
+    changed(previous, current)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=SellerReview)
+def directory_row_deleted(sender, instance, **kwargs):
+    state, changed = TRACKED[sender]
+    previous = state(instance)
+    if previous is not UNKNOWN:
+        changed(previous, None)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=SellerReview)
+@receiver(post_delete, sender=SellerReview)
+def storefront_row_changed(sender, instance, **kwargs):
+    """Drop the cached storefront of the seller whose product or review changed"""
+    storefront.invalidate(instance.seller_id)
+
+
+@receiver(post_save, sender=SellerProfile)
+def storefront_profile_changed(sender, instance, **kwargs):
+    storefront.invalidate(instance.user_id)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=SellerReview)
+def reputation_row_deleted(sender, instance, **kwargs):
+    """Deleted rows are invisible to the incremental reputation run's modified scan"""
+    seller_id = instance.seller_id
+    transaction.on_commit(lambda: reputation.mark_deleted(seller_id), robust=True)
@@ -0,0 +1,185 @@
+"""
+Denormalized seller directory stats on SellerProfile.
+
+Active product count, completed sales and the review count, sum and
+average live on the seller's profile, so the directory sorts and pages
+over indexed columns. These counters never aggregate on read. A product
+activated or deactivated, an order completed or a seller review added,
+edited or deleted turns into one UPDATE of the seller's profile with F()
+expressions, as product rating aggregates do.
+
+The median response time cannot be maintained incrementally. It is
+recomputed by the nightly ``reconcile`` from the seller's replies in the
+last RESPONSE_WINDOW_DAYS. The same run rebuilds the counters from their
+source tables, repairing drift from queryset updates, bulk deletes and
+historical data.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import connection
+from django.db.models import Count, F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from apps.common.reconcile import reconcile_in_chunks
+from apps.orders.models import Order
+from apps.products.models import Product
+
+from . import storefront
+from .models import SellerProfile, SellerReview
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_WINDOW_DAYS = 90
+RECONCILE_CHUNK_SIZE = 1000
+COUNTER_FIELDS = ['active_product_count', 'completed_sales', 'review_count', 'rating_sum']
+
+# A reply is a message whose previous message in the conversation came from the other participant
+_MEDIAN_RESPONSE_SQL = """
+WITH thread AS (
+    SELECT m.sender_id, m.created,
+           LAG(m.sender_id) OVER w AS previous_sender,
+           LAG(m.created) OVER w AS previous_created
+    FROM messages_message m
+    WHERE m.created >= %s
+      AND m.conversation_id IN (
+          SELECT conversation_id FROM messages_conversation_participant WHERE user_id = ANY(%s)
+      )
+    WINDOW w AS (PARTITION BY m.conversation_id ORDER BY m.created, m.id)
+)
+SELECT sender_id,
+       percentile_cont(0.5) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM created - previous_created)) / 60
+FROM thread
+WHERE sender_id = ANY(%s) AND previous_sender IS NOT NULL AND previous_sender <> sender_id
+GROUP BY sender_id
+"""
+
+
+def apply_delta(seller_id, products: int = 0, sales: int = 0, reviews: int = 0, rating: int = 0) -> int:
+    """
+    Adjust a seller's directory counters in one UPDATE.
+
+    Args:
+        seller_id: UserProfile id of the seller
+        products: Change in active products
+        sales: Change in completed orders
+        reviews: Change in number of seller reviews
+        rating: Change in the sum of their ratings
+
+    Returns:
+        int: Number of profiles updated (0 if the user has no seller profile)
+    """
+    updates = {}
+    if products:
+        updates['active_product_count'] = F('active_product_count') + products
+    if sales:
+        updates['completed_sales'] = F('completed_sales') + sales
+    if reviews or rating:
+        # The right-hand sides all see the row as it was before this UPDATE
+        updates.update(
+            review_count=F('review_count') + reviews,
+            rating_sum=F('rating_sum') + rating,
+            average_rating=Cast(F('rating_sum') + rating, FloatField()) / Greatest(F('review_count') + reviews, Value(1)),
+        )
+    if not updates:
+        return 0
+    updated = SellerProfile.objects.filter(user_id=seller_id).update(**updates)
+    if updated:
+        storefront.invalidate(seller_id)
+    return updated
+
+
+def _move(previous: Optional[tuple], current: Optional[tuple], changes: Callable[[tuple], Dict[str, int]]) -> None:
+    """Move a row's contribution between (seller_id, ...) states; None means it does not count"""
+    if previous == current:
+        return
+    deltas: Dict = defaultdict(Counter)
+    if previous is not None:
+        deltas[previous[0]].subtract(changes(previous))
+    if current is not None:
+        deltas[current[0]].update(changes(current))
+    for seller_id, counters in deltas.items():
+        apply_delta(seller_id, **counters)
+
+
+def product_changed(previous: Optional[tuple], current: Optional[tuple]) -> None:
+    """Move an active product between (seller_id,) states; None for an inactive or deleted product"""
+    _move(previous, current, lambda state: {'products': 1})
+
+
+def order_changed(previous: Optional[tuple], current: Optional[tuple]) -> None:
+    """Move a completed order between (seller_id,) states; None for an order that is not completed"""
+    _move(previous, current, lambda state: {'sales': 1})
+
+
+def review_changed(previous: Optional[tuple], current: Optional[tuple]) -> None:
+    """Move a seller review between (seller_id, rating) states; None for an added or deleted review"""
+    _move(previous, current, lambda state: {'reviews': 1, 'rating': state[1]})
+
+
+def median_response_times(seller_ids: List[int]) -> Dict[int, int]:
+    """
+    Median minutes each seller took to reply to a message in the last RESPONSE_WINDOW_DAYS.
+
+    Returns:
+        dict: Seller id -> median minutes, for sellers who replied at least once
+    """
+    since = timezone.now() - timedelta(days=RESPONSE_WINDOW_DAYS)
+    with connection.cursor() as cursor:
+        cursor.execute(_MEDIAN_RESPONSE_SQL, [since, seller_ids, seller_ids])
+        return {seller_id: round(minutes) for seller_id, minutes in cursor.fetchall()}
+
+
+def _grouped(queryset, **aggregates) -> Dict[int, Dict]:
+    rows = queryset.values('seller_id').annotate(**aggregates).order_by()
+    return {row.pop('seller_id'): row for row in rows}
+
+
+def _actual(seller_ids: List[int]) -> Dict[int, Dict]:
+    """Counters and median response time of sellers, computed from the source tables"""
+    products = _grouped(Product.objects.filter(seller_id__in=seller_ids, is_active=True), count=Count('id'))
+    sales = _grouped(Order.objects.filter(seller_id__in=seller_ids, status='COMPLETED'), count=Count('id'))
+    reviews = _grouped(SellerReview.objects.filter(seller_id__in=seller_ids), count=Count('id'), total=Sum('rating'))
+    response = median_response_times(seller_ids)
+    actual = {}
+    for seller_id in seller_ids:
+        review = reviews.get(seller_id, {'count': 0, 'total': 0})
+        actual[seller_id] = {
+            'active_product_count': products.get(seller_id, {'count': 0})['count'],
+            'completed_sales': sales.get(seller_id, {'count': 0})['count'],
+            'review_count': review['count'],
+            'rating_sum': review['total'],
+            'average_rating': review['total'] / review['count'] if review['count'] else 0.0,
+            'median_response_time': response.get(seller_id),
+        }
+    return actual
+
+
+def reconcile(seller_ids: Optional[Iterable] = None, chunk_size: int = RECONCILE_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Rebuild directory stats from products, orders, reviews and messages.
+
+    Args:
+        seller_ids: UserProfile ids of the sellers to check (default: every seller profile)
+        chunk_size: Profiles locked and counted per transaction
+
+    Returns:
+        dict: Numbers of profiles 'checked' and 'repaired'
+    """
+    fields = COUNTER_FIELDS + ['average_rating', 'median_response_time']
+    profiles = SellerProfile.objects.only('user_id', *fields)
+    if seller_ids is not None:
+        profiles = profiles.filter(user_id__in=list(seller_ids))
+
+    def expected(chunk):
+        actual = _actual([profile.user_id for profile in chunk])
+        return [actual[profile.user_id] for profile in chunk]
+
+    stats = reconcile_in_chunks(profiles, fields, expected, chunk_size)
+    if stats['repaired']:
+        logger.info(f"Repaired directory stats of {stats['repaired']} of {stats['checked']} sellers")
+    return stats
@@ -0,0 +1,93 @@
+"""
+Seller storefront pages.
+
+A storefront is built from five queries, whatever the size of the store:
+- the profile with its user;
+- the top and newest active products, without per-product joins;
+- a histogram of the seller's ratings;
+- the most recent reviews with their reviewers.
+
+The result is cached per seller. A product, seller review or profile change
+deletes the seller's entry once its transaction commits, as do the
+directory counter updates behind order completions. Changes that bypass
+signals, such as bulk reputation updates and queryset updates of product
+ratings, show up when the entry expires.
+"""
+
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from apps.products.models import Product
+
+from .models import SellerProfile, SellerReview
+from .serializers import StorefrontProductSerializer, StorefrontProfileSerializer, StorefrontReviewSerializer
+
+STOREFRONT_TTL = 10 * 60
+TOP_PRODUCTS = 8
+NEW_PRODUCTS = 8
+RECENT_REVIEWS = 5
+PRODUCT_FIELDS = (
+    'listing_id', 'title', 'category', 'price', 'currency', 'thumbnail', 'rating', 'review_count', 'sale_count',
+    'is_active', 'seller_id', 'created',
+)
+
+
+def cache_key(seller_id) -> str:
+    return f'storefront:{seller_id}'
+
+
+def build(seller_id) -> Optional[Dict[str, Any]]:
+    """
+    Assemble a seller's storefront from the database.
+
+    Args:
+        seller_id: UserProfile id of the seller
+
+    Returns:
+        dict: 'profile', 'top_products', 'new_products', 'rating' and 'recent_reviews', or None without a seller profile
+    """
+    profile = SellerProfile.objects.select_related('user').filter(user_id=seller_id).first()
+    if profile is None:
+        return None
+    products = Product.objects.filter(seller_id=seller_id, is_active=True).only(*PRODUCT_FIELDS)
+    top_products = list(products.order_by('-sale_count', '-id')[:TOP_PRODUCTS])
+    new_products = list(products.order_by('-created')[:NEW_PRODUCTS])
+    histogram = dict(
+        SellerReview.objects.filter(seller_id=seller_id).values_list('rating').annotate(count=Count('id')).order_by()
+    )
+    reviews = (
+        SellerReview.objects.filter(seller_id=seller_id)
+        .select_related('reviewer')
+        .only('rating', 'comment', 'created', 'reviewer__display_name', 'reviewer__avatar')
+        .order_by('-created')[:RECENT_REVIEWS]
+    )
+    count = sum(histogram.values())
+    return {
+        'profile': StorefrontProfileSerializer(profile).data,
+        'top_products': StorefrontProductSerializer(top_products, many=True).data,
+        'new_products': StorefrontProductSerializer(new_products, many=True).data,
+        'rating': {
+            'average': sum(stars * n for stars, n in histogram.items()) / count if count else 0.0,
+            'count': count,
+            'histogram': {str(stars): histogram.get(stars, 0) for stars in range(1, 6)},
+        },
+        'recent_reviews': StorefrontReviewSerializer(reviews, many=True).data,
+    }
+
+
+def get(seller_id) -> Optional[Dict[str, Any]]:
+    """A seller's storefront, from the cache when possible"""
+    data = cache.get(cache_key(seller_id))
+    if data is None:
+        data = build(seller_id)
+        if data is not None:
+            cache.set(cache_key(seller_id), data, STOREFRONT_TTL)
+    return data
+
+
+def invalidate(seller_id) -> None:
+    """Drop a seller's cached storefront once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(cache_key(seller_id)), robust=True)
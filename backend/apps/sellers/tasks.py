@@ -0,0 +1,20 @@
+from celery import shared_task
+from . import reputation, stats
+
+
+@shared_task
+def recompute_seller_reputation():
+    """Recompute every seller's reputation score and refresh the marketplace priors"""
+    return reputation.recompute()
+
+
+@shared_task
+def update_seller_reputation():
+    """Recompute reputation of sellers with reviews or orders since the last run"""
+    return reputation.recompute(incremental=True)
+
+
+@shared_task
+def reconcile_seller_stats():
+    """Rebuild seller directory counters and median response times from their source tables"""
+    return stats.reconcile()
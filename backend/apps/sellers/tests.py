@@ -0,0 +1,221 @@
+from base64 import b64encode
+from datetime import timedelta
+from unittest import mock
+
+import fakeredis
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.orders.models import Order
+from apps.products.models import Product
+from apps.users.models import UserProfile
+from . import reputation, stats, storefront
+from .models import SellerProfile, SellerReview
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SellerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = UserProfile.objects.create(username='buyer')
+        self.seller = self.make_seller('seller')
+        # The median response query is Postgres SQL
+        patcher = mock.patch.object(stats, 'median_response_times', return_value={})
+        self.median_response_times = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_seller(self, username):
+        user = UserProfile.objects.create(username=username, role='seller')
+        SellerProfile.objects.create(user=user, store_name=username)
+        return user
+
+    def make_product(self, listing_id, is_active=True):
+        return Product.objects.create(
+            seller=self.seller, listing_id=listing_id, title=listing_id, description='',
+            category='other', price=1, product_hash='0x' + '00' * 32, is_active=is_active,
+        )
+
+    def make_order(self, order_id, status='PAYMENT_HELD'):
+        return Order.objects.create(
+            order_id=order_id, listing_id='listing', buyer=self.buyer, seller=self.seller,
+            amount=1, currency='USDC', payment_token='0x' + '00' * 20, status=status,
+        )
+
+    def review(self, rating):
+        return SellerReview.objects.create(seller=self.seller, reviewer=self.buyer, rating=rating, comment='')
+
+    def profile(self):
+        return SellerProfile.objects.get(user=self.seller)
+
+
+class SellerStatsTest(SellerTestCase):
+    def test_products_and_orders_move_the_counters(self):
+        product = self.make_product('listing-1')
+        self.make_product('listing-2', is_active=False)
+        order = self.make_order('order-1')
+        order.status = 'COMPLETED'
+        order.save()
+        self.assertEqual((self.profile().active_product_count, self.profile().completed_sales), (1, 1))
+
+        product.is_active = False
+        product.save()
+        order.delete()
+        self.assertEqual((self.profile().active_product_count, self.profile().completed_sales), (0, 0))
+
+    def test_review_add_edit_and_delete_keep_the_average(self):
+        first = self.review(5)
+        self.review(2)
+        self.assertEqual((self.profile().review_count, self.profile().average_rating), (2, 3.5))
+
+        first.rating = 3
+        first.save()
+        self.assertEqual(self.profile().average_rating, 2.5)
+
+        first.delete()
+        self.assertEqual((self.profile().review_count, self.profile().rating_sum), (1, 2))
+
+    def test_reconcile_repairs_drift(self):
+        self.make_product('listing-1')
+        self.review(4)
+        self.make_seller('other')
+        SellerProfile.objects.filter(user=self.seller).update(active_product_count=7, review_count=0, average_rating=0)
+        self.median_response_times.return_value = {self.seller.pk: 12}
+
+        result = stats.reconcile(chunk_size=1)
+
+        self.assertEqual(result, {'checked': 2, 'repaired': 1})
+        profile = self.profile()
+        self.assertEqual((profile.active_product_count, profile.review_count), (1, 1))
+        self.assertEqual((profile.average_rating, profile.median_response_time), (4.0, 12))
+        self.assertEqual(stats.reconcile(), {'checked': 2, 'repaired': 0})
+
+
+class SellerDirectoryTest(SellerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        # Five sellers tied on zero sales, two ahead of them
+        for i in range(7):
+            self.make_seller(f'seller-{i}')
+        SellerProfile.objects.filter(user__username__in=['seller-3', 'seller-5']).update(completed_sales=4)
+
+    def directory(self, **params):
+        return self.client.get('/api/v1/sellers/directory/', {'ordering': 'sales', **params})
+
+    def test_pages_through_ties_without_gaps(self):
+        seen = []
+        response = self.directory(page_size=3)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen += [row['store_name'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen[:2], ['seller-5', 'seller-3'])
+        self.assertEqual(sorted(seen), sorted(SellerProfile.objects.values_list('store_name', flat=True)))
+
+    def test_page_size_is_clamped_to_one(self):
+        response = self.directory(page_size=-5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_malformed_cursor_is_not_found(self):
+        for values in ('["x", 1]', '[1, "y"]', '[1]', '{"a": 1}', 'not json'):
+            cursor = b64encode(values.encode()).decode()
+            self.assertEqual(self.directory(cursor=cursor).status_code, 404, values)
+
+
+class StorefrontTest(SellerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.make_product('listing-1')
+        Product.objects.filter(listing_id='listing-1').update(sale_count=9)
+        self.make_product('listing-2')
+        self.make_product('listing-3', is_active=False)
+        for rating in (5, 4, 4):
+            self.review(rating)
+
+    def storefront(self, seller_id=None):
+        return self.client.get(f'/api/v1/sellers/storefront/{seller_id or self.seller.pk}/')
+
+    def test_one_response_from_five_queries_then_from_the_cache(self):
+        with self.assertNumQueries(5):
+            storefront.build(self.seller.pk)
+        response = self.storefront()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['listing_id'] for product in response.data['top_products']], ['listing-1', 'listing-2'])
+        self.assertEqual(len(response.data['new_products']), 2)
+        self.assertEqual(response.data['rating']['histogram'], {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1})
+        self.assertEqual(len(response.data['recent_reviews']), 3)
+
+        with mock.patch.object(storefront, 'build') as build:
+            self.assertEqual(self.storefront().data, response.data)
+        build.assert_not_called()
+
+    def test_changes_drop_the_cached_page_after_commit(self):
+        self.storefront()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_product('listing-4')
+            self.assertIsNotNone(cache.get(storefront.cache_key(self.seller.pk)))
+        self.assertIsNone(cache.get(storefront.cache_key(self.seller.pk)))
+        self.assertEqual(len(self.storefront().data['new_products']), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(1)
+        self.assertEqual(self.storefront().data['rating']['count'], 4)
+
+    def test_unknown_seller_is_not_found(self):
+        self.assertEqual(self.storefront(self.buyer.pk).status_code, 404)
+
+
+class IncrementalReputationTest(SellerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(reputation, 'get_redis_connection', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.make_order('order-1', status='COMPLETED')
+        self.bad_review = self.review(1)
+        self.review(5)
+        reputation.recompute()
+        # Out of the next run's look-back window
+        self.backdate(reputation.INCREMENTAL_OVERLAP * 2)
+
+    def backdate(self, age):
+        modified = timezone.now() - age
+        Order.objects.update(modified=modified)
+        SellerReview.objects.update(modified=modified)
+
+    def score(self):
+        self.seller.refresh_from_db(fields=['reputation_score'])
+        return self.seller.reputation_score
+
+    def test_untouched_sellers_are_skipped(self):
+        self.assertEqual(reputation.recompute(incremental=True), {'sellers': 0, 'updated': 0})
+
+    def test_rows_saved_before_the_last_run_but_committed_after_it_are_picked_up(self):
+        before = self.score()
+        SellerReview.objects.filter(pk=self.bad_review.pk).update(rating=5)
+        # Saved a minute before the previous run started, committed once it had read the table
+        cache.set(reputation.LAST_RUN_KEY, timezone.now(), None)
+        self.backdate(timedelta(minutes=1))
+
+        self.assertEqual(reputation.recompute(incremental=True), {'sellers': 1, 'updated': 1})
+        self.assertGreater(self.score(), before)
+
+    def test_deleted_review_is_picked_up_by_the_next_incremental_run(self):
+        before = self.score()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bad_review.delete()
+
+        self.assertEqual(reputation.recompute(incremental=True), {'sellers': 1, 'updated': 1})
+        self.assertGreater(self.score(), before)
+        self.assertFalse(self.redis.exists(reputation.DELETED_KEY))
@@ -1,16 +1,66 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from apps.realtime.presence import online_users
+from . import storefront
 from .models import SellerProfile, SellerReview
-from .serializers import SellerProfileSerializer, SellerReviewSerializer
+from .pagination import SellerDirectoryPagination
+from .serializers import SellerDirectorySerializer, SellerProfileSerializer, SellerReviewSerializer
+
+# Directory sorts; each has a matching (value, id) index on SellerProfile
+DIRECTORY_ORDERINGS = {
+    'sales': '-completed_sales',
+    'rating': '-average_rating',
+    'products': '-active_product_count',
+    'response': 'median_response_time',
+}
+
 
 class SellerProfileViewSet(viewsets.ModelViewSet):
     queryset = SellerProfile.objects.all()
     serializer_class = SellerProfileSerializer
+
+    @action(detail=False, methods=['get'], pagination_class=SellerDirectoryPagination)
+    def directory(self, request):
+        """Sellers by ?ordering=sales|rating|products|response, optionally &verified=true|false"""
+        ordering = request.query_params.get('ordering', 'sales')
+        if ordering not in DIRECTORY_ORDERINGS:
+            return Response(
+                {'error': f"ordering must be one of: {', '.join(DIRECTORY_ORDERINGS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        field = DIRECTORY_ORDERINGS[ordering]
+        queryset = SellerProfile.objects.select_related('user').order_by(field, '-id' if field.startswith('-') else 'id')
+        if ordering == 'response':
+            # Sellers who have not replied yet have no median to rank by
+            queryset = queryset.filter(median_response_time__isnull=False)
+        verified = request.query_params.get('verified')
+        if verified in ('true', 'false'):
+            queryset = queryset.filter(verified=verified == 'true')
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(SellerDirectorySerializer(page, many=True).data)
     
+    @action(detail=False, methods=['get'], url_path=r'storefront/(?P<seller_id>\d+)')
+    def storefront_page(self, request, seller_id=None):
+        """Profile, top and newest products, rating summary and recent reviews of a seller (by user id)"""
+        data = storefront.get(int(seller_id))
+        if data is None:
+            return Response({'error': 'Seller not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_store(self, request):
         profile = SellerProfile.objects.get(user=request.user)
         serializer = SellerProfileSerializer(profile)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def online(self, request):
+        """Which of the given user ids (comma separated) currently have a live connection"""
+        user_ids = [value.strip() for value in request.query_params.get('user_ids', '').split(',')]
+        user_ids = [user_id for user_id in user_ids if user_id.isdigit()]
+        if len(user_ids) > 500:
+            return Response({'error': 'At most 500 user ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+        online = online_users(user_ids)
+        return Response({'online': {user_id: user_id in online for user_id in user_ids}})
@@ -1,30 +1,84 @@
 import os
-import asyncio
+import json
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-# Initialize Django ASGI app
+# Initialize Django ASGI app before importing anything that touches models
 django_asgi_app = get_asgi_application()
 
-from aiohttp import web
-from config.socketio_config import sio
-
-async def create_app():
-    app = web.Application()
-    sio.attach(app)
-    
-    # Health check
-    async def health(request):
-        return web.json_response({'status': 'ok'})
-    
-    app.router.add_get('/health/', health)
-    return app
-
-# Export for production
-async def application(scope, receive, send):
-    """ASGI application that routes between HTTP and Socket.io"""
-    if scope['type'] == 'http':
-        await django_asgi_app(scope, receive, send)
-    elif scope['type'] == 'lifespan':
+import socketio  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from apps.realtime.auth import AuthenticationError  # noqa: E402
+from apps.realtime.backpressure import queue_metrics  # noqa: E402
+from apps.realtime.middleware import JWTAuthMiddleware  # noqa: E402
+from apps.realtime.urls import websocket_urlpatterns  # noqa: E402
+from config.socketio_config import authenticator, sio, start_background_tasks, stop_background_tasks  # noqa: E402
+
+
+LOOPBACK_HOSTS = {'127.0.0.1', '::1'}
+PROXY_HEADERS = {b'x-forwarded-for', b'x-real-ip', b'forwarded'}
+
+
+async def metrics_allowed(scope):
+    """
+    Staff users with a Bearer token may read metrics. With
+    SOCKETIO_CONFIG['METRICS_ALLOW_LOOPBACK'] on, so may loopback callers that
+    did not come through a proxy (the load-test and slow-consumer tools).
+    """
+    headers = dict(scope.get('headers', []))
+    client = scope.get('client') or (None, None)
+    if (
+        settings.SOCKETIO_CONFIG.get('METRICS_ALLOW_LOOPBACK')
+        and client[0] in LOOPBACK_HOSTS
+        and not PROXY_HEADERS.intersection(headers)
+    ):
+        return True
+    authorization = headers.get(b'authorization', b'').decode('latin-1')
+    if not authorization.startswith('Bearer '):
+        return False
+    try:
+        user_id, _ = await authenticator.authenticate(authorization[7:])
+    except AuthenticationError:
+        return False
+    return await get_user_model().objects.filter(pk=user_id, is_staff=True, is_active=True).aexists()
+
+
+async def realtime_metrics(scope, receive, send):
+    """Send-queue metrics of the Socket.io server in this worker"""
+    if await metrics_allowed(scope):
+        status, body = 200, json.dumps(queue_metrics(sio.manager)).encode()
+    else:
+        status, body = 403, json.dumps({'error': 'Realtime metrics are restricted to internal and staff access'}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def http_application(scope, receive, send):
+    if scope['path'] == '/realtime/metrics':
+        await realtime_metrics(scope, receive, send)
+    else:
         await django_asgi_app(scope, receive, send)
+
+
+channels_application = ProtocolTypeRouter({
+    'http': http_application,
+    'websocket': JWTAuthMiddleware(URLRouter(websocket_urlpatterns), authenticator),
+})
+
+# One application per worker process: Socket.io answers /socket.io/ and starts the
+# outbox dispatcher, presence and re-auth loops on lifespan startup; Channels
+# websockets and Django HTTP share the same event loop. Run with e.g.
+#   uvicorn config.asgi:application --workers 4
+application = socketio.ASGIApp(
+    sio,
+    other_asgi_app=channels_application,
+    on_startup=start_background_tasks,
+    on_shutdown=stop_background_tasks,
+)
@@ -18,10 +18,54 @@ app.conf.beat_schedule = {
         'task': 'apps.blockchain.tasks.sync_contract_events',
         'schedule': crontab(minute='*/10'),  # Every 10 minutes
     },
+    'flush-reputation-sync': {
+        'task': 'apps.blockchain.tasks.flush_reputation_sync',
+        'schedule': crontab(minute='*/2'),  # Every 2 minutes
+    },
+    'warm-seller-dashboards': {
+        'task': 'apps.blockchain.tasks.warm_seller_dashboards',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+    'anchor-pending-products': {
+        'task': 'apps.blockchain.tasks.anchor_pending_products',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+    },
     'process-dispute-timeouts': {
         'task': 'apps.orders.tasks.process_dispute_timeouts',
         'schedule': crontab(hour='*/1'),  # Every hour
     },
+    'purge-dispatched-realtime-events': {
+        'task': 'apps.realtime.tasks.purge_dispatched_events',
+        'schedule': crontab(minute=30),  # Hourly
+    },
+    'reconcile-unread-counters': {
+        'task': 'apps.messages.tasks.reconcile_unread_counters',
+        'schedule': crontab(minute='*/5'),  # Every 5 minutes
+    },
+    'recompute-product-ratings': {
+        'task': 'apps.reviews.tasks.recompute_product_ratings',
+        'schedule': crontab(hour=3, minute=30),  # Daily at 3:30 AM
+    },
+    'flush-helpful-votes': {
+        'task': 'apps.reviews.tasks.flush_helpful_votes',
+        'schedule': crontab(minute='*'),  # Every minute
+    },
+    'recount-helpful-votes': {
+        'task': 'apps.reviews.tasks.recount_helpful_votes',
+        'schedule': crontab(hour=4, minute=0),  # Daily at 4 AM
+    },
+    'update-seller-reputation': {
+        'task': 'apps.sellers.tasks.update_seller_reputation',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+    },
+    'recompute-seller-reputation': {
+        'task': 'apps.sellers.tasks.recompute_seller_reputation',
+        'schedule': crontab(hour=2, minute=30),  # Daily at 2:30 AM
+    },
+    'reconcile-seller-stats': {
+        'task': 'apps.sellers.tasks.reconcile_seller_stats',
+        'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
+    },
     'send-notification-digests': {
         'task': 'apps.realtime.tasks.send_notification_digests',
         'schedule': crontab(hour=9, minute=0),  # Daily at 9 AM
@@ -160,8 +160,8 @@ REST_FRAMEWORK = {
         'rest_framework.throttling.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '100/hour',
-        'user': '1000/hour',
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '100/hour'),
+        'user': os.environ.get('THROTTLE_USER_RATE', '1000/hour'),
     },
 }
 
@@ -199,9 +199,54 @@ CHANNEL_LAYERS = {
 
 # Socket.io Configuration
 SOCKETIO_CONFIG = {
+    # 'asgi' when served by config.asgi (uvicorn); manage_socketio.py runs its own aiohttp server
+    'ASYNC_MODE': os.environ.get('SOCKETIO_ASYNC_MODE', 'asgi'),
     'PING_INTERVAL': 25,
     'PING_TIMEOUT': 60,
     'CORS_ALLOWED_ORIGINS': os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(','),
+    # Pub/sub channel shared by all Socket.io nodes and write-only emitters
+    'REDIS_URL': os.environ.get('SOCKETIO_REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/0')),
+    'CHANNEL': 'chainmart-socketio',
+    'PRESENCE_TTL': 60,  # seconds; refreshed by each node's heartbeat
+    'HEARTBEAT_INTERVAL': 20,
+    'PRESENCE_SWEEP_INTERVAL': 60,  # seconds between sweeps for sockets of dead nodes
+    # Per-connection send queues: events above this depth are dropped or coalesced by policy
+    'SEND_QUEUE_DEPTH': 100,
+    'SLOW_CONSUMER_SECONDS': 30,  # disconnect sockets that have not drained for this long
+    'SEND_POLICIES': {
+        'product_updated': 'coalesce',
+        'typing': 'drop_oldest',
+    },
+    # Minimum seconds between relayed typing indicators of one user in one conversation
+    'TYPING_INTERVAL': 2,
+    # Connect authentication: decoded tokens cached until expiry, user status for USER_STATUS_TTL
+    'AUTH_CACHE_SIZE': 50000,
+    'USER_STATUS_TTL': 30,  # seconds
+    'REAUTH_INTERVAL': 60,  # seconds between re-checks of open sockets
+    # Let loopback callers without proxy headers read /realtime/metrics unauthenticated (local tooling only;
+    # a reverse proxy on the same host that does not set X-Forwarded-For would make metrics public)
+    'METRICS_ALLOW_LOOPBACK': os.environ.get('REALTIME_METRICS_ALLOW_LOOPBACK', 'False') == 'True',
+}
+
+# Realtime outbox: events are committed with the change and delivered by the Socket.io process
+REALTIME_OUTBOX = {
+    'BATCH_SIZE': 500,
+    'POLL_INTERVAL': 0.5,  # seconds between polls when the outbox is drained
+    'LEASE_SECONDS': 30,  # claimed rows are redelivered if not dispatched within this window
+    'RETENTION_HOURS': 24,
+    'COALESCE_WINDOW': 1.0,  # seconds; product updates are merged per product within this window
+    # Replay buffers for reconnecting clients, one Redis stream per room
+    'STREAM_MAXLEN': 1000,
+    'STREAM_TTL': 86400,
+    'MAX_REPLAY': 500,
+}
+
+# Public SSE stream of catalog updates (served by config.asgi)
+REALTIME_SSE = {
+    'HEARTBEAT_SECONDS': 15,  # below typical CDN idle timeouts
+    'MAX_STREAM_SECONDS': 300,  # streams end and clients reconnect with Last-Event-ID
+    'RETRY_MS': 3000,
+    'QUEUE_SIZE': 256,  # pending events per client before it is closed
 }
 
 # Logging
@@ -250,10 +295,23 @@ BLOCKCHAIN_CONFIG = {
     'RPC_URL': os.environ.get('BLOCKCHAIN_RPC_URL', 'https://rpc-amoy.polygon.technology/'),
     'MARKETPLACE_CONTRACT': os.environ.get('MARKETPLACE_CONTRACT_ADDRESS'),
     'REPUTATION_NFT_CONTRACT': os.environ.get('REPUTATION_NFT_ADDRESS'),
+    # Multicall3 canonical deployment (Polygon, Amoy); set empty on chains without it
+    'MULTICALL_CONTRACT': os.environ.get('MULTICALL_CONTRACT_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11'),
     'PLATFORM_WALLET': os.environ.get('PLATFORM_WALLET_ADDRESS'),
     'PRIVATE_KEY': os.environ.get('BLOCKCHAIN_PRIVATE_KEY'),
     'GAS_LIMIT': 500000,
     'GAS_PRICE_MULTIPLIER': 1.2,
+    'RECEIPT_TIMEOUT': int(os.environ.get('BLOCKCHAIN_RECEIPT_TIMEOUT', 120)),
+    'REPUTATION_SYNC_BATCH_SIZE': int(os.environ.get('REPUTATION_SYNC_BATCH_SIZE', 100)),
+    'REPUTATION_SYNC_MAX_BATCHES': int(os.environ.get('REPUTATION_SYNC_MAX_BATCHES', 10)),
+    'CHAIN_READ_CACHE_TTL': 120,  # seconds; keys include the block number
+    'BLOCK_NUMBER_TTL': 2,  # seconds to reuse the latest block number in-process
+    'CHAIN_READ_MAX_STALE_BLOCKS': 30,  # latest reads share one pinned block until it is this far behind
+    'DASHBOARD_WARMUP_SELLERS': 200,
+    # 'batch' anchors product hashes under periodic Merkle roots instead of one createListing each
+    'PRODUCT_ANCHOR_MODE': os.environ.get('PRODUCT_ANCHOR_MODE', 'batch'),
+    'PRODUCT_ANCHOR_MAX_LEAVES': int(os.environ.get('PRODUCT_ANCHOR_MAX_LEAVES', 100000)),
+    'BULK_RECORD_MAX_ITEMS': 1000,
 }
 
 # Email Configuration
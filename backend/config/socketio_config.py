@@ -1,55 +1,101 @@
 import socketio
-import os
-from django.contrib.auth.models import AnonymousUser
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from django.conf import settings
+from apps.realtime.auth import AuthenticationError, ConnectionAuthenticator, extract_token
+from apps.realtime.backpressure import BackpressureRedisManager
+from apps.realtime.dispatcher import OutboxDispatcher
+from apps.realtime.presence import PresenceTracker
+from apps.realtime.rooms import MAX_SUBSCRIPTIONS, rooms_for_product, subscription_rooms, user_room
+from apps.realtime.streams import get_stream_store
+from apps.realtime import wire
+from apps.messages.delivery import ConversationMembers, TypingLimiter
 
-# Create Socket.io server with CORS enabled
+# Rooms and emits are shared across every Socket.io node through Redis pub/sub;
+# local deliveries go through bounded per-connection queues
+client_manager = BackpressureRedisManager(
+    settings.SOCKETIO_CONFIG['REDIS_URL'],
+    channel=settings.SOCKETIO_CONFIG['CHANNEL'],
+)
+
+# Create Socket.io server with CORS enabled; 'asgi' when mounted in config.asgi, 'aiohttp' under manage_socketio.py
 sio = socketio.AsyncServer(
-    async_mode='aiohttp',
-    cors_allowed_origins=os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(','),
-    ping_timeout=60,
-    ping_interval=25,
+    async_mode=settings.SOCKETIO_CONFIG['ASYNC_MODE'],
+    client_manager=client_manager,
+    cors_allowed_origins=settings.SOCKETIO_CONFIG['CORS_ALLOWED_ORIGINS'],
+    ping_timeout=settings.SOCKETIO_CONFIG['PING_TIMEOUT'],
+    ping_interval=settings.SOCKETIO_CONFIG['PING_INTERVAL'],
     engineio_logger=False,
     logger=True,
 )
 
-# Dictionary to track connected users and their sockets
-connected_users = {}
+# Online users, kept in Redis with TTL heartbeats so every node sees them
+presence = PresenceTracker()
+
+# Cached token decoding, batched user checks and periodic re-auth of open sockets
+authenticator = ConnectionAuthenticator(sio)
+
+# Participants of conversations and per-sender typing throttles, both in process only
+conversation_members = ConversationMembers()
+typing_limiter = TypingLimiter()
+
+_external_emitter = None
+_dispatcher = None
+
+
+def start_background_tasks():
+    """Start the outbox dispatcher, presence heartbeats and re-auth loop of this node"""
+    global _dispatcher
+    _dispatcher = OutboxDispatcher(sio)
+    sio.start_background_task(_dispatcher.run)
+    sio.start_background_task(presence.run)
+    sio.start_background_task(authenticator.run)
+
+
+def stop_background_tasks():
+    if _dispatcher is not None:
+        _dispatcher.stop()
+    presence.stop()
+    authenticator.stop()
+
+
+def get_external_emitter():
+    """Write-only manager for emitting from Django and Celery processes that do not host sockets"""
+    global _external_emitter
+    if _external_emitter is None:
+        _external_emitter = socketio.RedisManager(
+            settings.SOCKETIO_CONFIG['REDIS_URL'],
+            channel=settings.SOCKETIO_CONFIG['CHANNEL'],
+            write_only=True,
+        )
+    return _external_emitter
 
 
 @sio.event
 async def connect(sid, environ, auth):
     """Handle client connection"""
     try:
-        # Extract token from auth header
-        token = None
-        if auth:
-            token = auth.get('token')
-        elif 'HTTP_AUTHORIZATION' in environ:
-            auth_header = environ['HTTP_AUTHORIZATION']
-            if auth_header.startswith('Bearer '):
-                token = auth_header[7:]
-        
-        if not token:
-            return False
-        
-        # Verify JWT token
-        try:
-            jwt_auth = JWTAuthentication()
-            validated_token = jwt_auth.get_validated_token(token)
-            user_id = validated_token.get('user_id')
-            
-            # Store user socket mapping
-            connected_users[user_id] = sid
-            await sio.save_session(sid, {'user_id': user_id, 'token': token})
-            
-            print(f"[v0] User {user_id} connected via Socket.io: {sid}")
-            return True
-        except (InvalidToken, AuthenticationFailed):
-            print(f"[v0] Invalid token: {token}")
-            return False
+        user_id, expires_at = await authenticator.authenticate(extract_token(auth, environ))
+    except AuthenticationError as e:
+        print(f"[v0] Socket.io connection rejected: {str(e)}")
+        return False
+
+    try:
+        # Only the expiry is kept; the token itself never lands in the session
+        await sio.save_session(sid, {'user_id': user_id, 'token_expires_at': expires_at})
+        authenticator.register(sid, user_id, expires_at)
+        await sio.enter_room(sid, user_room(user_id))
+        await presence.connected(user_id, sid, {
+            'user_agent': environ.get('HTTP_USER_AGENT', '')[:200],
+            'remote_addr': environ.get('REMOTE_ADDR', ''),
+        })
+        if wire.requested_mode(auth, environ.get('QUERY_STRING', '')) == wire.COMPACT_MODE:
+            # Queued behind the connect acknowledgement, ahead of any compact frame
+            client_manager.enable_compact(sid, '/')
+            await sio.emit('wire', wire.describe(), to=sid)
+
+        print(f"[v0] User {user_id} connected via Socket.io: {sid}")
+        return True
     except Exception as e:
+        authenticator.forget(sid)
         print(f"[v0] Connection error: {str(e)}")
         return False
 
@@ -57,14 +103,31 @@ async def connect(sid, environ, auth):
 @sio.event
 async def disconnect(sid):
     """Handle client disconnection"""
+    authenticator.forget(sid)
     session = await sio.get_session(sid)
     if session and 'user_id' in session:
         user_id = session['user_id']
-        if user_id in connected_users:
-            del connected_users[user_id]
+        await presence.disconnected(user_id, sid)
         print(f"[v0] User {user_id} disconnected from Socket.io: {sid}")
 
 
+@sio.event
+async def reauth(sid, data):
+    """Extend a connection with a fresh access token for the same user"""
+    session = await sio.get_session(sid)
+    token = data.get('token') if isinstance(data, dict) else None
+    try:
+        user_id, expires_at = await authenticator.authenticate(token)
+    except AuthenticationError as e:
+        return {'ok': False, 'error': str(e)}
+    if str(user_id) != str(session.get('user_id')):
+        return {'ok': False, 'error': 'Token belongs to a different user'}
+    session['token_expires_at'] = expires_at
+    await sio.save_session(sid, session)
+    authenticator.register(sid, user_id, expires_at)
+    return {'ok': True, 'expires_at': expires_at}
+
+
 @sio.event
 async def subscribe_orders(sid, data):
     """Subscribe user to order updates"""
@@ -72,19 +135,41 @@ async def subscribe_orders(sid, data):
     if session and 'user_id' in session:
         user_id = session['user_id']
         room = f'user_orders_{user_id}'
-        sio.enter_room(sid, room)
+        await sio.enter_room(sid, room)
         print(f"[v0] User {user_id} subscribed to orders room: {room}")
         await sio.emit('subscribed', {'room': room, 'type': 'orders'}, to=sid)
 
 
 @sio.event
 async def subscribe_products(sid, data):
-    """Subscribe to product inventory updates"""
+    """Subscribe to updates for lists of product ids, categories and seller ids"""
     session = await sio.get_session(sid)
-    if session:
-        sio.enter_room(sid, 'products_inventory')
-        print(f"[v0] Client subscribed to products inventory room")
-        await sio.emit('subscribed', {'room': 'products_inventory', 'type': 'products'}, to=sid)
+    if not session:
+        return
+    try:
+        rooms = subscription_rooms(data)
+    except ValueError as e:
+        await sio.emit('subscription_error', {'error': str(e)}, to=sid)
+        return
+    current = [room for room in sio.rooms(sid) if room.startswith(('product_', 'category_', 'seller_products_'))]
+    if len(set(current) | set(rooms)) > MAX_SUBSCRIPTIONS:
+        await sio.emit('subscription_error', {'error': f'At most {MAX_SUBSCRIPTIONS} product subscriptions per connection'}, to=sid)
+        return
+    for room in rooms:
+        await sio.enter_room(sid, room)
+    await sio.emit('subscribed', {'rooms': rooms, 'type': 'products'}, to=sid)
+
+
+@sio.event
+async def unsubscribe_products(sid, data):
+    """Leave product, category and seller rooms"""
+    try:
+        rooms = subscription_rooms(data)
+    except ValueError:
+        rooms = []
+    for room in rooms:
+        await sio.leave_room(sid, room)
+    await sio.emit('unsubscribed', {'rooms': rooms, 'type': 'products'}, to=sid)
 
 
 @sio.event
@@ -94,11 +179,58 @@ async def subscribe_seller_sales(sid, data):
     if session and 'user_id' in session:
         seller_id = session['user_id']
         room = f'seller_sales_{seller_id}'
-        sio.enter_room(sid, room)
+        await sio.enter_room(sid, room)
         print(f"[v0] Seller {seller_id} subscribed to sales room: {room}")
         await sio.emit('subscribed', {'room': room, 'type': 'seller_sales'}, to=sid)
 
 
+@sio.event
+async def resume(sid, data):
+    """Replay events missed on joined rooms: {"channels": {room: last_seq}}"""
+    positions = data.get('channels') if isinstance(data, dict) else None
+    if not isinstance(positions, dict):
+        await sio.emit('resume_error', {'error': 'Expected {"channels": {room: last_seq}}'}, to=sid)
+        return
+    results = await get_stream_store().replay_many(positions, allowed=sio.rooms(sid))
+    for result in results:
+        await sio.emit('resync_required' if result.get('resync_required') else 'replay', result, to=sid)
+
+
+@sio.event
+async def message_delivered(sid, data):
+    """Relay a delivery receipt to the sender: {"conversation_id": id, "message_id": id}"""
+    session = await sio.get_session(sid)
+    if not session or not isinstance(data, dict):
+        return
+    user_id = session['user_id']
+    recipient = await conversation_members.recipient(data.get('conversation_id'), user_id)
+    if recipient is None:
+        return
+    await sio.emit('message_delivered', {
+        'conversation_id': data['conversation_id'],
+        'message_id': data.get('message_id'),
+        'user_id': user_id,
+    }, room=user_room(recipient))
+
+
+@sio.event
+async def typing(sid, data):
+    """Relay a typing indicator, rate-limited per sender and conversation: {"conversation_id": id, "typing": bool}"""
+    session = await sio.get_session(sid)
+    if not session or not isinstance(data, dict):
+        return
+    user_id = session['user_id']
+    is_typing = bool(data.get('typing', True))
+    recipient = await conversation_members.recipient(data.get('conversation_id'), user_id)
+    if recipient is None or not typing_limiter.allow(str(user_id), data['conversation_id'], is_typing):
+        return
+    await sio.emit('typing', {
+        'conversation_id': data['conversation_id'],
+        'user_id': user_id,
+        'typing': is_typing,
+    }, room=user_room(recipient))
+
+
 @sio.event
 async def ping(sid):
     """Respond to ping keep-alive"""
@@ -112,9 +244,9 @@ async def emit_order_update(user_id, order_data):
     await sio.emit('order_updated', order_data, room=room)
 
 
-async def emit_product_update(product_data):
-    """Emit product inventory update to all subscribed clients"""
-    await sio.emit('product_updated', product_data, room='products_inventory')
+async def emit_product_update(product, product_data):
+    """Emit product update to clients subscribed to the product, its category or its seller"""
+    await sio.emit('product_updated', product_data, room=rooms_for_product(product))
 
 
 async def emit_seller_sale(seller_id, sale_data):
@@ -124,7 +256,10 @@ async def emit_seller_sale(seller_id, sale_data):
 
 
 async def emit_to_user(user_id, event_name, data):
-    """Emit custom event to specific user"""
-    if user_id in connected_users:
-        sid = connected_users[user_id]
-        await sio.emit(event_name, data, to=sid)
+    """Emit custom event to every connection of a user, on any node"""
+    await sio.emit(event_name, data, room=user_room(user_id))
+
+
+def emit_from_sync(event_name, data, room):
+    """Emit from synchronous code (views, Celery tasks) through the Redis manager"""
+    get_external_emitter().emit(event_name, data, room=room)
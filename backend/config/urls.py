@@ -34,6 +34,7 @@ urlpatterns = [
     path('api/v1/reviews/', include('apps.reviews.urls')),
     path('api/v1/messages/', include('apps.messages.urls')),
     path('api/v1/blockchain/', include('apps.blockchain.urls')),
+    path('api/v1/realtime/', include('apps.realtime.urls')),
 ]
 
 if settings.DEBUG:
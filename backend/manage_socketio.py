@@ -1,25 +1,49 @@
 #!/usr/bin/env python
 import os
+import argparse
 import asyncio
 import django
 from aiohttp import web
-from config.socketio_config import sio
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# This standalone node serves Socket.io from its own aiohttp server
+os.environ['SOCKETIO_ASYNC_MODE'] = 'aiohttp'
 django.setup()
 
+from config.socketio_config import sio, start_background_tasks, stop_background_tasks  # noqa: E402
+from apps.realtime.backpressure import queue_metrics  # noqa: E402
+
 
 async def create_app():
     app = web.Application()
     sio.attach(app)
+
+    async def on_startup(app):
+        start_background_tasks()
+
+    async def on_cleanup(app):
+        stop_background_tasks()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
     
     async def health(request):
         return web.json_response({'status': 'ok', 'service': 'chainmart'})
+
+    async def realtime_metrics(request):
+        return web.json_response(queue_metrics(sio.manager))
     
-    app.router.add_get('/socket.io/', health)
+    # /socket.io/ itself belongs to the Socket.io handler attached above
+    app.router.add_get('/health', health)
+    app.router.add_get('/realtime/metrics', realtime_metrics)
     return app
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ChainMart Socket.io node')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8001)
+    args = parser.parse_args()
+
     app = asyncio.run(create_app())
-    web.run_app(app, host='0.0.0.0', port=8001)
+    web.run_app(app, host=args.host, port=args.port)
@@ -5,6 +5,7 @@ import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
 import "@openzeppelin/contracts/utils/ReentrancyGuard.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/utils/Pausable.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 
 interface IReputationNFT {
     function updateReputation(address user, uint256 newScore) external;
@@ -88,6 +89,9 @@ contract MarketplaceEscrow is ReentrancyGuard, Ownable, Pausable {
     // Supported payment tokens
     mapping(address => bool) public supportedTokens;
     
+    // Merkle roots of batch-anchored product hashes => anchoring timestamp
+    mapping(bytes32 => uint256) public productRoots;
+    
     // Events
     event ListingCreated(uint256 indexed listingId, address indexed seller, bytes32 productHash, uint256 price, address paymentToken);
     event OrderPlaced(uint256 indexed orderId, uint256 indexed listingId, address indexed buyer, address seller, uint256 amount);
@@ -99,6 +103,7 @@ contract MarketplaceEscrow is ReentrancyGuard, Ownable, Pausable {
     event PlatformFeeUpdated(uint256 newFee);
     event TokenAdded(address indexed token);
     event ReputationUpdated(address indexed user, uint256 newScore);
+    event ProductRootAnchored(bytes32 indexed root, uint256 leafCount);
     
     // Modifiers
     modifier onlySellerOrPlatform(uint256 _orderId) {
@@ -184,6 +189,18 @@ contract MarketplaceEscrow is ReentrancyGuard, Ownable, Pausable {
         listing.price = _newPrice;
     }
     
+    /**
+     * @dev Anchors the Merkle root of a batch of product hashes in one transaction
+     * @param _root Root of the tree built over keccak256(productHash) leaves
+     * @param _leafCount Number of products in the batch
+     */
+    function anchorProductRoot(bytes32 _root, uint256 _leafCount) external onlyOwner whenNotPaused {
+        require(_root != 0, "Invalid root");
+        require(productRoots[_root] == 0, "Root already anchored");
+        productRoots[_root] = block.timestamp;
+        emit ProductRootAnchored(_root, _leafCount);
+    }
+    
     // ========== PURCHASE & ESCROW ==========
     
     /**
@@ -594,6 +611,23 @@ contract MarketplaceEscrow is ReentrancyGuard, Ownable, Pausable {
         return orders[_orderId];
     }
     
+    /**
+     * @dev Verifies that a product hash belongs to an anchored batch
+     * @param _productHash Product hash stored off-chain
+     * @param _proof Sibling hashes from the leaf up to the root (sorted-pair hashing)
+     * @param _root Anchored Merkle root
+     */
+    function verifyProductHash(
+        bytes32 _productHash,
+        bytes32[] calldata _proof,
+        bytes32 _root
+    ) external view returns (bool) {
+        if (productRoots[_root] == 0) {
+            return false;
+        }
+        return MerkleProof.verifyCalldata(_proof, _root, keccak256(abi.encodePacked(_productHash)));
+    }
+    
     /**
      * @dev Receives native currency
      */
@@ -27,21 +27,56 @@ contract ReputationNFT is ERC721, Ownable {
     
     mapping(address => UserReputation) public userReputation;
     mapping(address => uint256) public userTokenId;
+    mapping(address => bool) public reputationUpdaters;
     
     uint256 private tokenIdCounter = 1;
     
     event ReputationUpdated(address indexed user, uint256 newScore, ReputationLevel level);
     event BadgeMinted(address indexed user, ReputationLevel level, uint256 tokenId);
+    event UpdaterSet(address indexed updater, bool allowed);
+    
+    modifier onlyUpdater() {
+        require(msg.sender == owner() || reputationUpdaters[msg.sender], "Not authorized");
+        _;
+    }
     
     constructor() ERC721("ChainMart Reputation", "CMREP") Ownable(msg.sender) {}
     
     /**
-     * @dev Updates user reputation score
+     * @dev Allows or revokes an address (escrow contract, backend relayer) to update scores
+     */
+    function setUpdater(address _updater, bool _allowed) external onlyOwner {
+        reputationUpdaters[_updater] = _allowed;
+        emit UpdaterSet(_updater, _allowed);
+    }
+    
+    /**
+     * @dev Updates user reputation score after a completed transaction
+     */
+    function updateReputation(address _user, uint256 _newScore) external onlyUpdater {
+        userReputation[_user].totalTransactions += 1;
+        _setScore(_user, _newScore);
+    }
+    
+    /**
+     * @dev Updates many users in one transaction (used by the backend reputation sync)
+     * Only the scores change; a sync is not a transaction, so totalTransactions is left as is
+     * @param _users Addresses to update
+     * @param _scores New scores, same order as _users
+     */
+    function batchUpdateReputation(address[] calldata _users, uint256[] calldata _scores) external onlyUpdater {
+        require(_users.length == _scores.length, "Length mismatch");
+        for (uint256 i = 0; i < _users.length; i++) {
+            _setScore(_users[i], _scores[i]);
+        }
+    }
+    
+    /**
+     * @dev Applies a score update and mints a new badge on level change
      */
-    function updateReputation(address _user, uint256 _newScore) external onlyOwner {
+    function _setScore(address _user, uint256 _newScore) internal {
         UserReputation storage rep = userReputation[_user];
         rep.score = _newScore;
-        rep.totalTransactions += 1;
         rep.lastUpdated = block.timestamp;
         
         ReputationLevel oldLevel = rep.level;
@@ -21,6 +21,13 @@ async function main() {
   await marketplace.deployed()
   console.log("MarketplaceEscrow deployed to:", marketplace.address)
 
+  // Allow the escrow contract and the backend relayer to push reputation updates
+  console.log("\n3. Authorizing reputation updaters...")
+  await reputationNFT.setUpdater(marketplace.address, true)
+  if (process.env.REPUTATION_RELAYER_ADDRESS) {
+    await reputationNFT.setUpdater(process.env.REPUTATION_RELAYER_ADDRESS, true)
+  }
+
   // Save deployment addresses
   const deploymentData = {
     network: hre.network.name,
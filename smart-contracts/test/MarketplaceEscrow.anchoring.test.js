@@ -0,0 +1,88 @@
+const { expect } = require("chai")
+const { ethers } = require("hardhat")
+
+// Mirrors backend/apps/blockchain/merkle.py: keccak256(productHash) leaves,
+// sorted-pair inner nodes, odd node carried up unchanged.
+function hashPair(a, b) {
+  return BigInt(a) < BigInt(b) ? ethers.keccak256(ethers.concat([a, b])) : ethers.keccak256(ethers.concat([b, a]))
+}
+
+function buildTree(productHashes) {
+  const levels = [productHashes.map((hash) => ethers.keccak256(hash))]
+  while (levels[levels.length - 1].length > 1) {
+    const level = levels[levels.length - 1]
+    const parents = []
+    for (let i = 0; i + 1 < level.length; i += 2) {
+      parents.push(hashPair(level[i], level[i + 1]))
+    }
+    if (level.length % 2) {
+      parents.push(level[level.length - 1])
+    }
+    levels.push(parents)
+  }
+  return levels
+}
+
+function proofFor(levels, index) {
+  const proof = []
+  for (const level of levels.slice(0, -1)) {
+    const sibling = index ^ 1
+    if (sibling < level.length) {
+      proof.push(level[sibling])
+    }
+    index = Math.floor(index / 2)
+  }
+  return proof
+}
+
+describe("MarketplaceEscrow product anchoring", function () {
+  let marketplace, owner, other, productHashes, levels, root
+
+  beforeEach(async function () {
+    ;[owner, other] = await ethers.getSigners()
+    const ReputationNFT = await ethers.getContractFactory("ReputationNFT")
+    const reputationNFT = await ReputationNFT.deploy()
+    const MarketplaceEscrow = await ethers.getContractFactory("MarketplaceEscrow")
+    marketplace = await MarketplaceEscrow.deploy(owner.address, await reputationNFT.getAddress())
+
+    productHashes = Array.from({ length: 5 }, (_, i) => ethers.sha256(ethers.toUtf8Bytes(`product-${i}`)))
+    levels = buildTree(productHashes)
+    root = levels[levels.length - 1][0]
+  })
+
+  it("anchors a root once and records its timestamp", async function () {
+    expect(await marketplace.productRoots(root)).to.equal(0)
+
+    await expect(marketplace.anchorProductRoot(root, productHashes.length))
+      .to.emit(marketplace, "ProductRootAnchored")
+      .withArgs(root, productHashes.length)
+    expect(await marketplace.productRoots(root)).to.be.greaterThan(0)
+
+    await expect(marketplace.anchorProductRoot(root, productHashes.length)).to.be.revertedWith("Root already anchored")
+  })
+
+  it("only lets the owner anchor non-zero roots", async function () {
+    await expect(marketplace.connect(other).anchorProductRoot(root, 1)).to.be.revertedWithCustomError(
+      marketplace,
+      "OwnableUnauthorizedAccount"
+    )
+    await expect(marketplace.anchorProductRoot(ethers.ZeroHash, 1)).to.be.revertedWith("Invalid root")
+  })
+
+  it("verifies every product in an anchored batch, including the carried-up odd leaf", async function () {
+    await marketplace.anchorProductRoot(root, productHashes.length)
+
+    for (let i = 0; i < productHashes.length; i++) {
+      expect(await marketplace.verifyProductHash(productHashes[i], proofFor(levels, i), root)).to.equal(true)
+    }
+  })
+
+  it("rejects unknown hashes, wrong proofs and roots that were never anchored", async function () {
+    const stranger = ethers.sha256(ethers.toUtf8Bytes("not listed"))
+    expect(await marketplace.verifyProductHash(productHashes[0], proofFor(levels, 0), root)).to.equal(false)
+
+    await marketplace.anchorProductRoot(root, productHashes.length)
+    expect(await marketplace.verifyProductHash(stranger, proofFor(levels, 0), root)).to.equal(false)
+    expect(await marketplace.verifyProductHash(productHashes[0], proofFor(levels, 1), root)).to.equal(false)
+  })
+})
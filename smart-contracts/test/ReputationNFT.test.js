@@ -0,0 +1,33 @@
+const { expect } = require("chai")
+const { ethers } = require("hardhat")
+
+describe("ReputationNFT", function () {
+  let reputationNFT, owner, seller, other
+
+  beforeEach(async function () {
+    ;[owner, seller, other] = await ethers.getSigners()
+    const ReputationNFT = await ethers.getContractFactory("ReputationNFT")
+    reputationNFT = await ReputationNFT.deploy()
+  })
+
+  it("counts a transaction for every single update", async function () {
+    await reputationNFT.updateReputation(seller.address, 120)
+    await reputationNFT.updateReputation(seller.address, 130)
+
+    const rep = await reputationNFT.getUserReputation(seller.address)
+    expect(rep.score).to.equal(130)
+    expect(rep.totalTransactions).to.equal(2)
+  })
+
+  it("sets scores in a batch without counting transactions", async function () {
+    await reputationNFT.updateReputation(seller.address, 50)
+    await reputationNFT.batchUpdateReputation([seller.address, other.address], [300, 90])
+    await reputationNFT.batchUpdateReputation([seller.address], [310])
+
+    const rep = await reputationNFT.getUserReputation(seller.address)
+    expect(rep.score).to.equal(310)
+    expect(rep.level).to.equal(2) // GOLD
+    expect(rep.totalTransactions).to.equal(1)
+    expect((await reputationNFT.getUserReputation(other.address)).totalTransactions).to.equal(0)
+  })
+})